@@ -0,0 +1,31 @@
+from job_enrichment_pipeline.schema.taxonomy import render_coded_taxonomy
+
+# Titles are sent as "row_index,title" lines and the model answers with codes
+# that are decoded locally against the taxonomy.
+RESPONSE_FORMAT = "coded"
+
+PROMPT = render_coded_taxonomy() + """
+
+--
+INSTRUCTIONS
+
+1. Using the codes above, classify each job title with exactly one seniority_code and one function_code.
+2. If you're unsure, make the best possible guess. Only use codes from the lists above.
+3. Each input line is `row_index,title`. Answer with one CSV row per input line:
+row_index,seniority_code,function_code
+4. Output raw CSV only, starting with the header line above. No backticks, explanations or titles.
+5. You MUST answer every row_index exactly once.
+
+Example input:
+0,Talent Executive
+1,Software Engineer
+
+Example output:
+row_index,seniority_code,function_code
+0,8,611
+1,9,715
+
+--
+Classify the following job titles:
+$job_titles
+"""
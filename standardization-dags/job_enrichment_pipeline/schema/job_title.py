@@ -7,3 +7,9 @@ class JobTitleEnrichment(BaseModel):
     seniority_level: str
     department: str
     function: str
+
+
+class JobTitleCodes(BaseModel):
+    row_index: int
+    seniority_code: int
+    function_code: int
@@ -0,0 +1,454 @@
+"""
+Job title taxonomy with stable numeric codes.
+
+Codes are part of the coded prompt's contract with the model and of cached
+responses, so existing codes must never be renumbered or reused: append new
+entries with fresh codes instead. Function codes are ``department * 100 +
+n`` and therefore also identify the department.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+import polars as pl
+
+logger = logging.getLogger("taxonomy")
+
+SENIORITY_LEVELS = {
+    1: "Owner",
+    2: "Founder",
+    3: "C-suite",
+    4: "Partner",
+    5: "VP",
+    6: "Head",
+    7: "Director",
+    8: "Manager",
+    9: "Senior",
+    10: "Entry",
+    11: "Intern",
+}
+
+DEPARTMENTS = {
+    1: "C-Suite",
+    2: "Engineering & Technical",
+    3: "Design",
+    4: "Education",
+    5: "Finance",
+    6: "Human Resources",
+    7: "Information Technology",
+    8: "Legal",
+    9: "Marketing",
+    10: "Medical & Health",
+    11: "Operations",
+    12: "Sales",
+    13: "Consulting",
+}
+
+FUNCTIONS = {
+    101: (1, "Executive"),
+    102: (1, "Finance Executive"),
+    103: (1, "Founder"),
+    104: (1, "Human Resources Executive"),
+    105: (1, "Information Technology Executive"),
+    106: (1, "Legal Executive"),
+    107: (1, "Marketing Executive"),
+    108: (1, "Medical & Health Executive"),
+    109: (1, "Operations Executive"),
+    110: (1, "Sales Leader"),
+    201: (2, "Artificial Intelligence / Machine Learning"),
+    202: (2, "Bioengineering"),
+    203: (2, "Biometrics"),
+    204: (2, "Business Intelligence"),
+    205: (2, "Chemical Engineering"),
+    206: (2, "Cloud / Mobility"),
+    207: (2, "Data Science"),
+    208: (2, "DevOps"),
+    209: (2, "Digital Transformation"),
+    210: (2, "Emerging Technology / Innovation"),
+    211: (2, "Engineering & Technical"),
+    212: (2, "Industrial Engineering"),
+    213: (2, "Mechanic"),
+    214: (2, "Mobile Development"),
+    215: (2, "Product Development"),
+    216: (2, "Product Management"),
+    217: (2, "Project Management"),
+    218: (2, "Research & Development"),
+    219: (2, "Scrum Master / Agile Coach"),
+    220: (2, "Software Development"),
+    221: (2, "Support / Technical Services"),
+    222: (2, "Technician"),
+    223: (2, "Technology Operations"),
+    224: (2, "Test / Quality Assurance"),
+    225: (2, "UI / UX"),
+    226: (2, "Web Development"),
+    301: (3, "All Design"),
+    302: (3, "Product or UI/UX Design"),
+    303: (3, "Graphic / Visual / Brand Design"),
+    401: (4, "Teacher"),
+    402: (4, "Principal"),
+    403: (4, "Superintendent"),
+    404: (4, "Professor"),
+    501: (5, "Accounting"),
+    502: (5, "Finance"),
+    503: (5, "Financial Planning & Analysis"),
+    504: (5, "Financial Reporting"),
+    505: (5, "Financial Strategy"),
+    506: (5, "Financial Systems"),
+    507: (5, "Internal Audit & Control"),
+    508: (5, "Investor Relations"),
+    509: (5, "Mergers & Acquisitions"),
+    510: (5, "Real Estate Finance"),
+    511: (5, "Financial Risk"),
+    512: (5, "Shared Services"),
+    513: (5, "Sourcing / Procurement"),
+    514: (5, "Tax"),
+    515: (5, "Treasury"),
+    601: (6, "Compensation & Benefits"),
+    602: (6, "Culture, Diversity & Inclusion"),
+    603: (6, "Employee & Labor Relations"),
+    604: (6, "Health & Safety"),
+    605: (6, "Human Resource Information System"),
+    606: (6, "Human Resources"),
+    607: (6, "HR Business Partner"),
+    608: (6, "Learning & Development"),
+    609: (6, "Organizational Development"),
+    610: (6, "Recruiting & Talent Acquisition"),
+    611: (6, "Talent Management"),
+    612: (6, "Workforce Management"),
+    613: (6, "People Operations"),
+    701: (7, "Application Development"),
+    702: (7, "Business Service Management / ITSM"),
+    703: (7, "Collaboration & Web App"),
+    704: (7, "Data Center"),
+    705: (7, "Data Warehouse"),
+    706: (7, "Database Administration"),
+    707: (7, "eCommerce Development"),
+    708: (7, "Enterprise Architecture"),
+    709: (7, "Help Desk / Desktop Services"),
+    710: (7, "Information Security"),
+    711: (7, "Information Technology"),
+    712: (7, "Infrastructure"),
+    713: (7, "Network Engineering"),
+    714: (7, "Program Management"),
+    715: (7, "Software Engineering"),
+    716: (7, "Systems Administration"),
+    717: (7, "Systems Analysis"),
+    718: (7, "Technical Support"),
+    719: (7, "Technology Architecture"),
+    720: (7, "Technology Compliance"),
+    721: (7, "Technology Strategy"),
+    722: (7, "Telecommunications"),
+    801: (8, "Compliance"),
+    802: (8, "Contract Management"),
+    803: (8, "Corporate Counsel"),
+    804: (8, "Intellectual Property"),
+    805: (8, "Legal"),
+    806: (8, "Paralegal"),
+    807: (8, "Privacy"),
+    808: (8, "Regulatory Affairs"),
+    901: (9, "Brand Management"),
+    902: (9, "Communications"),
+    903: (9, "Content Marketing"),
+    904: (9, "Creative Services"),
+    905: (9, "Digital Marketing"),
+    906: (9, "Event Marketing"),
+    907: (9, "Field Marketing"),
+    908: (9, "Growth Marketing"),
+    909: (9, "Influencer Marketing"),
+    910: (9, "Marketing"),
+    911: (9, "Marketing Analytics"),
+    912: (9, "Marketing Operations"),
+    913: (9, "Marketing Strategy"),
+    914: (9, "Product Marketing"),
+    915: (9, "Public Relations"),
+    916: (9, "Social Media Marketing"),
+    1001: (10, "Biotech"),
+    1002: (10, "Clinical"),
+    1003: (10, "Clinical Operations"),
+    1004: (10, "Clinical Research"),
+    1005: (10, "Healthcare"),
+    1006: (10, "Medical Affairs"),
+    1007: (10, "Medical Devices"),
+    1008: (10, "Medical Writing"),
+    1009: (10, "Nursing"),
+    1010: (10, "Pharmaceutical"),
+    1011: (10, "Pharmacy"),
+    1012: (10, "Physician"),
+    1013: (10, "Research & Development"),
+    1014: (10, "Scientific Affairs"),
+    1101: (11, "Administration"),
+    1102: (11, "Business Operations"),
+    1103: (11, "Customer Service"),
+    1104: (11, "Facilities"),
+    1105: (11, "Field Operations"),
+    1106: (11, "Fulfillment"),
+    1107: (11, "General Management"),
+    1108: (11, "Logistics"),
+    1109: (11, "Operations"),
+    1110: (11, "Physical Security"),
+    1111: (11, "Project Development"),
+    1112: (11, "Quality Management"),
+    1113: (11, "Real Estate"),
+    1114: (11, "Safety"),
+    1115: (11, "Store Operations"),
+    1116: (11, "Supply Chain"),
+    1201: (12, "Account Management"),
+    1202: (12, "Business Development"),
+    1203: (12, "Channel Sales"),
+    1204: (12, "Customer Retention & Development"),
+    1205: (12, "Customer Success"),
+    1206: (12, "Field / Outside Sales"),
+    1207: (12, "Inside Sales"),
+    1208: (12, "Partnerships"),
+    1209: (12, "Revenue Operations"),
+    1210: (12, "Sales"),
+    1211: (12, "Sales Enablement"),
+    1212: (12, "Sales Engineering"),
+    1213: (12, "Sales Operations"),
+    1214: (12, "Sales Training"),
+    1301: (13, "Business Strategy Consulting"),
+    1302: (13, "Change Management Consulting"),
+    1303: (13, "Customer Experience Consulting"),
+    1304: (13, "Data Analytics Consulting"),
+    1305: (13, "Digital Transformation Consulting"),
+    1306: (13, "Environmental Consulting"),
+    1307: (13, "Financial Advisory Consulting"),
+    1308: (13, "Healthcare Consulting"),
+    1309: (13, "Human Resources Consulting"),
+    1310: (13, "Information Technology Consulting"),
+    1311: (13, "Management Consulting"),
+    1312: (13, "Marketing Consulting"),
+    1313: (13, "Mergers & Acquisitions Consulting"),
+    1314: (13, "Organizational Development Consulting"),
+    1315: (13, "Process Improvement Consulting"),
+    1316: (13, "Risk Management Consulting"),
+    1317: (13, "Sales Strategy Consulting"),
+    1318: (13, "Supply Chain Consulting"),
+    1319: (13, "Sustainability Consulting"),
+    1320: (13, "Tax Consulting"),
+    1321: (13, "Technology Implementation Consulting"),
+    1322: (13, "Training & Development Consulting"),
+}
+
+SENIORITY_LABELS = frozenset(SENIORITY_LEVELS.values())
+DEPARTMENT_LABELS = frozenset(DEPARTMENTS.values())
+FUNCTION_LABELS = frozenset(function for _, function in FUNCTIONS.values())
+DEPARTMENT_FUNCTION_PAIRS = frozenset(
+    f"{DEPARTMENTS[dep]}\x1f{function}" for dep, function in FUNCTIONS.values()
+)
+
+# Near-miss answers seen from the model, mapped to the canonical label. Keys
+# are compared after case folding and punctuation folding (see
+# fold_label_expr), so "Vice-President" and "vice president" share one entry
+# and canonical labels need no entry of their own.
+LABEL_ALIASES = {
+    "seniority_level": {
+        "C-Level": "C-suite",
+        "CXO": "C-suite",
+        "Chief": "C-suite",
+        "Executive": "C-suite",
+        "Co-Founder": "Founder",
+        "Cofounder": "Founder",
+        "Vice President": "VP",
+        "SVP": "VP",
+        "EVP": "VP",
+        "AVP": "VP",
+        "Head of": "Head",
+        "Mgr": "Manager",
+        "Lead": "Senior",
+        "Principal": "Senior",
+        "Sr": "Senior",
+        "Mid": "Entry",
+        "Junior": "Entry",
+        "Entry Level": "Entry",
+        "Entry-Level": "Entry",
+        "Internship": "Intern",
+        "Trainee": "Intern",
+    },
+    "department": {
+        "C-Level": "C-Suite",
+        "Executive": "C-Suite",
+        "Engineering": "Engineering & Technical",
+        "Technical": "Engineering & Technical",
+        "HR": "Human Resources",
+        "IT": "Information Technology",
+        "Medical": "Medical & Health",
+        "Healthcare": "Medical & Health",
+        "Health": "Medical & Health",
+        "Ops": "Operations",
+        "Accounting": "Finance",
+    },
+    "function": {
+        "AI / ML": "Artificial Intelligence / Machine Learning",
+        "Machine Learning": "Artificial Intelligence / Machine Learning",
+        "QA": "Test / Quality Assurance",
+        "Quality Assurance": "Test / Quality Assurance",
+        "UX / UI": "UI / UX",
+        "R&D": "Research & Development",
+    },
+}
+
+ALLOWED_LABELS = {
+    "seniority_level": SENIORITY_LABELS,
+    "department": DEPARTMENT_LABELS,
+    "function": FUNCTION_LABELS,
+}
+
+
+def fold_label_expr(expr: pl.Expr) -> pl.Expr:
+    """Case- and punctuation-insensitive form of a label ("&" reads as "and")."""
+    return (
+        expr.str.to_lowercase()
+        .str.replace_all("&", " and ", literal=True)
+        .str.replace_all(r"[^a-z0-9]+", " ")
+        .str.strip_chars()
+    )
+
+
+@lru_cache(maxsize=None)
+def label_repair_map(column: str) -> Dict[str, str]:
+    """
+    Folded label or alias -> canonical label for one label column. A canonical
+    label always repairs to itself, so an alias that folds to the same key as
+    a label is ignored.
+    """
+
+    def fold(labels: Iterable[str]) -> List[str]:
+        return (
+            pl.Series("label", list(labels), dtype=pl.Utf8)
+            .to_frame()
+            .select(fold_label_expr(pl.col("label")))
+            .get_column("label")
+            .to_list()
+        )
+
+    aliases = LABEL_ALIASES[column]
+    repair_map = dict(zip(fold(aliases), aliases.values()))
+    repair_map.update(zip(fold(ALLOWED_LABELS[column]), ALLOWED_LABELS[column]))
+    return repair_map
+
+
+@lru_cache(maxsize=None)
+def function_departments() -> Dict[str, str]:
+    """Department of every function name that belongs to exactly one department."""
+    departments: Dict[str, set] = {}
+    for dep, function in FUNCTIONS.values():
+        departments.setdefault(function, set()).add(DEPARTMENTS[dep])
+    return {
+        function: next(iter(deps))
+        for function, deps in departments.items()
+        if len(deps) == 1
+    }
+
+
+def repair_labels(df: pl.DataFrame) -> Tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Split ``df`` into rows whose seniority_level, department and function are
+    taxonomy values (after repairing near misses through the case-fold and
+    alias maps, and taking the department from the function where the
+    function implies it) and rows that could not be repaired.
+    """
+    repaired = [
+        pl.when(pl.col(column).is_in(ALLOWED_LABELS[column]))
+        .then(pl.col(column))
+        .otherwise(
+            fold_label_expr(pl.col(column)).replace_strict(
+                label_repair_map(column), default=None, return_dtype=pl.Utf8
+            )
+        )
+        .alias(column)
+        for column in ALLOWED_LABELS
+    ]
+
+    df_checked = (
+        df.with_columns(
+            [pl.col(column).alias(f"_{column}_raw") for column in ALLOWED_LABELS]
+        )
+        .with_columns(repaired)
+        .with_columns(
+            pl.coalesce(
+                pl.col("function").replace_strict(
+                    function_departments(), default=None, return_dtype=pl.Utf8
+                ),
+                pl.col("department"),
+            ).alias("department")
+        )
+        .with_columns(
+            (pl.col("department") + "\x1f" + pl.col("function"))
+            .is_in(DEPARTMENT_FUNCTION_PAIRS)
+            .fill_null(False)
+            .alias("_valid"),
+            pl.any_horizontal(
+                pl.col(column).ne_missing(pl.col(f"_{column}_raw"))
+                for column in ALLOWED_LABELS
+            ).alias("_repaired"),
+        )
+        .with_columns(pl.col("_valid") & pl.col("seniority_level").is_not_null())
+    )
+
+    df_valid = df_checked.filter(pl.col("_valid"))
+    df_invalid = df_checked.filter(~pl.col("_valid"))
+    repaired_count = df_valid.get_column("_repaired").sum()
+
+    if repaired_count or df_invalid.height:
+        logger.info(
+            f"Taxonomy check: {df_valid.height - repaired_count} valid, "
+            f"{repaired_count} repaired, {df_invalid.height} invalid"
+        )
+    if df_invalid.height:
+        logger.debug(
+            "Sample invalid labels:\n"
+            f"{df_invalid.select([f'_{c}_raw' for c in ALLOWED_LABELS]).head(5)}"
+        )
+
+    # Invalid rows keep the labels the model gave, for logging by callers.
+    df_invalid = df_invalid.with_columns(
+        [pl.col(f"_{column}_raw").alias(column) for column in ALLOWED_LABELS]
+    )
+    helper_columns = [f"_{column}_raw" for column in ALLOWED_LABELS]
+    helper_columns += ["_valid", "_repaired"]
+    return df_valid.drop(helper_columns), df_invalid.drop(helper_columns)
+
+
+@lru_cache(maxsize=None)
+def seniority_lookup() -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "seniority_code": list(SENIORITY_LEVELS),
+            "seniority_level": list(SENIORITY_LEVELS.values()),
+        },
+        schema={"seniority_code": pl.Int64, "seniority_level": pl.Utf8},
+    )
+
+
+@lru_cache(maxsize=None)
+def function_lookup() -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "function_code": list(FUNCTIONS),
+            "department": [DEPARTMENTS[dep] for dep, _ in FUNCTIONS.values()],
+            "function": [function for _, function in FUNCTIONS.values()],
+        },
+        schema={
+            "function_code": pl.Int64,
+            "department": pl.Utf8,
+            "function": pl.Utf8,
+        },
+    )
+
+
+def render_coded_taxonomy() -> str:
+    lines = ["Seniority levels (seniority_code: label):"]
+    lines += [f"{code}: {label}" for code, label in SENIORITY_LEVELS.items()]
+
+    lines += ["", "Departments and functions (function_code: function):"]
+    for dep_code, department in DEPARTMENTS.items():
+        lines.append(f"{department}:")
+        lines += [
+            f"{code}: {function}"
+            for code, (dep, function) in FUNCTIONS.items()
+            if dep == dep_code
+        ]
+
+    return "\n".join(lines)
@@ -1,13 +1,32 @@
 import logging
 from airflow.decorators import task
 from airflow.models import Variable
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Union
 import os
+from lib.enrichment_pipeline_helpers.batch_size_controller import BatchStatsStore
+from lib.enrichment_pipeline_helpers.enrichment_metrics import EnrichmentMetrics
+from lib.enrichment_pipeline_helpers.metrics_exporters import create_metrics_exporter
+from lib.llm_clients.response_cache import create_response_cache
 from job_enrichment_pipeline.utils.enrich_utils_csv import process_batch_from_gcs
+from job_enrichment_pipeline.utils.enrich_utils_async import process_batches_async
 
 logger = logging.getLogger(__name__)
 
 
+def _create_response_cache(llm_config: Dict[str, Any]):
+    blob_storage_base_path = Variable.get(
+        "GCS_ENRICHMENT_BASE", default_var=None
+    ) or os.environ.get("GCS_ENRICHMENT_BASE")
+    return create_response_cache(
+        llm_config.get("cache", {}),
+        default_uri=(
+            f"{blob_storage_base_path.rstrip('/')}/cache/llm_responses"
+            if blob_storage_base_path
+            else None
+        ),
+    )
+
+
 @task(
     executor_config={
         "KubernetesExecutor": {
@@ -21,23 +40,95 @@ logger = logging.getLogger(__name__)
     retries=0,
 )
 def enrich_job_title_batch(
-    batch_paths: [str], config: Dict[str, Any] = None, **context
-) -> str:
-    batch_path = batch_paths[0]
-    logger.info(f"Enriching job title batch: {batch_path}")
-
+    batches: List[Union[str, int]],
+    config: Dict[str, Any] = None,
+    manifest_uri: Optional[str] = None,
+    **context,
+) -> Union[str, List[str]]:
+    """
+    Enrich ``batches``: parquet paths, or batch indices into ``manifest_uri``.
+    """
     llm_config = config.get("llm", {}) if config else {}
+    enrich_config = config.get("enrich", {}) if config else {}
     default_prompt_version = llm_config.get("default_prompt_version", "v1")
     prompt_version = Variable.get(
         "JOB_TITLE_PROMPT_VERSION", default_var=None
     ) or os.environ.get("JOB_TITLE_PROMPT_VERSION", default_prompt_version)
     logger.info(f"Using job title prompt version: {prompt_version}")
+    timestamp = context["execution_date"].strftime("%Y%m%dT%H%M%S")
+
+    blob_storage_base_path = Variable.get(
+        "GCS_ENRICHMENT_BASE", default_var=None
+    ) or os.environ.get("GCS_ENRICHMENT_BASE")
+    response_cache = _create_response_cache(llm_config)
+
+    stats_store = None
+    pipeline_config = config.get("pipeline", {}) if config else {}
+    if pipeline_config.get("batch_sizing", "static") == "adaptive":
+        stats_store = BatchStatsStore(
+            f"{blob_storage_base_path.rstrip('/')}/state/batch_stats"
+        )
+
+    metrics = None
+    metrics_config = config.get("metrics", {}) if config else {}
+    if metrics_config.get("enabled", False):
+        metrics = EnrichmentMetrics(
+            f"{blob_storage_base_path.rstrip('/')}/metrics",
+            run_id=timestamp,
+            exporter=create_metrics_exporter(metrics_config),
+            pricing=metrics_config.get("pricing", {}),
+        )
+
+    if enrich_config.get("mode", "per_batch") == "async":
+        logger.info(f"Enriching {len(batches)} job title batches concurrently")
+        return process_batches_async(
+            batch_paths=batches,
+            manifest_uri=manifest_uri,
+            prompt_type="job_enrichment_pipeline.prompt",
+            prompt_version=prompt_version,
+            timestamp=timestamp,
+            output_prefix="enriched/job_titles",
+            config=llm_config,
+            max_in_flight=enrich_config.get("max_in_flight", 8),
+            max_retries=enrich_config.get("max_retries", 5),
+            response_cache=response_cache,
+            max_recovery_rounds=enrich_config.get("max_recovery_rounds", 2),
+            recovery_split=enrich_config.get("recovery_split", 4),
+            stats_store=stats_store,
+            metrics=metrics,
+        )
+
+    batch_path = batches[0]
+    logger.info(f"Enriching job title batch: {batch_path}")
 
     return process_batch_from_gcs(
         batch_path=batch_path,
+        manifest_uri=manifest_uri,
         prompt_type="job_enrichment_pipeline.prompt",
         prompt_version=prompt_version,
-        timestamp=context["execution_date"].strftime("%Y%m%dT%H%M%S"),
+        timestamp=timestamp,
         output_prefix="enriched/job_titles",
         config=llm_config,
+        response_cache=response_cache,
+        max_recovery_rounds=enrich_config.get("max_recovery_rounds", 2),
+        recovery_split=enrich_config.get("recovery_split", 4),
+        stats_store=stats_store,
+        metrics=metrics,
     )
+
+
+@task(trigger_rule="all_done")
+def evict_response_cache(
+    enriched_paths: List[str], config: Dict[str, Any] = None
+) -> None:
+    """
+    Expire and trim the LLM response cache once per run, after every enrich
+    task has finished, instead of listing the whole cache in each of them.
+    """
+    llm_config = config.get("llm", {}) if config else {}
+    response_cache = _create_response_cache(llm_config)
+    if response_cache is None:
+        logger.info("LLM response cache disabled, nothing to evict")
+        return
+
+    response_cache.evict()
@@ -1,7 +1,17 @@
 from airflow.decorators import task
 from airflow.models import Variable
-from lib.enrichment_pipeline_helpers.extract_and_upload import extract_and_upload
-from job_enrichment_pipeline.utils.normalize_utils import normalize_title
+from lib.enrichment_pipeline_helpers.extract_and_upload import (
+    extract_and_upload,
+    extract_and_upload_streaming,
+    extract_grouped_and_upload,
+    extract_partitioned_and_upload,
+)
+from lib.enrichment_pipeline_helpers.watermark import ExtractionWatermark
+from job_enrichment_pipeline.utils.watermark_utils import title_extraction_watermark
+from job_enrichment_pipeline.utils.normalize_utils import (
+    normalize_title_expr,
+    normalize_title_sql,
+)
 import logging
 import os
 from typing import Dict, Any, Optional
@@ -23,7 +33,9 @@ def extract_job_titles_to_gcs(config: Dict[str, Any], **context) -> Optional[str
     logger.info("Starting job title extraction task...")
 
     pipeline_config = config.get("pipeline", {}) if config else {}
+    extraction_config = config.get("extraction", {}) if config else {}
     limit = pipeline_config.get("batch_size_per_dag_run")
+    mode = extraction_config.get("mode", "full")
     timestamp = context["execution_date"].strftime("%Y%m%dT%H%M%S")
 
     db_uri = Variable.get("POSTGRES_URI", default_var=None) or os.environ.get(
@@ -38,13 +50,128 @@ def extract_job_titles_to_gcs(config: Dict[str, Any], **context) -> Optional[str
             "Missing required environment variables: POSTGRES_URI or GCS_ENRICHMENT_BASE"
         )
 
-    base_query = """
-        SELECT id, title
+    cursor_column = extraction_config.get("cursor_column", "id")
+    watermark = title_extraction_watermark(blob_storage_base_path, extraction_config)
+    cursor_filter = "TRUE"
+
+    if watermark:
+        watermark.load()
+        cursor_filter = watermark.filter_sql()
+        logger.info(f"Incremental extraction from watermark: {cursor_filter}")
+
+    # Edited titles are selected wherever they sit relative to the cursor;
+    # the cursor only skips rows that were never standardized.
+    select_columns = (
+        "id, title" if cursor_column == "id" else f"id, title, {cursor_column}"
+    )
+    base_query = f"""
+        SELECT {select_columns}
         FROM member_experience
-        WHERE standardized_job_id IS NULL OR title <> previous_title
+        WHERE (standardized_job_id IS NULL AND {cursor_filter})
+           OR title <> previous_title
     """
 
-    query = f"{base_query} LIMIT {limit}" if limit else base_query
+    output_path = _run_extraction(
+        mode=mode,
+        base_query=base_query,
+        db_uri=db_uri,
+        blob_storage_base_path=blob_storage_base_path,
+        timestamp=timestamp,
+        limit=limit,
+        extraction_config=extraction_config,
+        watermark=watermark,
+    )
+
+    # Committed by the load task once this run's rows are in the database.
+    if watermark:
+        watermark.stage(run_id=timestamp)
+
+    return output_path
+
+
+def _run_extraction(
+    mode: str,
+    base_query: str,
+    db_uri: str,
+    blob_storage_base_path: str,
+    timestamp: str,
+    limit: Optional[int],
+    extraction_config: Dict[str, Any],
+    watermark: Optional[ExtractionWatermark],
+) -> Optional[str]:
+    key_column = watermark.column if watermark else "id"
+
+    if mode == "streaming":
+        page_size = extraction_config.get("page_size", 50000)
+        max_rows = extraction_config.get("max_rows") or None
+        logger.info(
+            f"Running streaming extraction: page_size={page_size}, max_rows={max_rows or 'unbounded'}"
+        )
+
+        return extract_and_upload_streaming(
+            db_uri=db_uri,
+            query=base_query,
+            blob_storage_base_path=blob_storage_base_path,
+            timestamp=timestamp,
+            prefix="titles",
+            clean_column="title",
+            key_column=key_column,
+            page_size=page_size,
+            max_rows=max_rows,
+            normalize_expr=normalize_title_expr,
+            watermark=watermark,
+        )
+
+    if mode == "partitioned":
+        partitions = extraction_config.get("partitions", 8)
+        max_connections = extraction_config.get("max_connections", 4)
+        logger.info(
+            f"Running partitioned extraction: partitions={partitions}, max_connections={max_connections}"
+        )
+
+        return extract_partitioned_and_upload(
+            db_uri=db_uri,
+            query=base_query,
+            blob_storage_base_path=blob_storage_base_path,
+            timestamp=timestamp,
+            prefix="titles",
+            clean_column="title",
+            key_column="id",
+            partitions=partitions,
+            max_connections=max_connections,
+            normalize_expr=normalize_title_expr,
+            watermark=watermark,
+        )
+
+    query = base_query
+    if watermark:
+        query = f"{query} ORDER BY {key_column}"
+    query = f"{query} LIMIT {limit}" if limit else query
+
+    if mode == "grouped":
+        logger.info(
+            f"Running grouped extraction: {'LIMIT ' + str(limit) if limit else 'No LIMIT'}"
+        )
+        extra_aggregates = None
+        if watermark and key_column != "id":
+            extra_aggregates = [f"max({key_column}) AS {key_column}"]
+
+        return extract_grouped_and_upload(
+            db_uri=db_uri,
+            query=query,
+            blob_storage_base_path=blob_storage_base_path,
+            timestamp=timestamp,
+            prefix="titles",
+            clean_column="title",
+            agg_column="id",
+            group_sql=normalize_title_sql("title"),
+            extra_aggregates=extra_aggregates,
+            watermark=watermark,
+        )
+
+    if mode != "full":
+        raise ValueError(f"Unknown extraction mode: {mode}")
+
     logger.info(
         f"Running extraction with query: {'LIMIT ' + str(limit) if limit else 'No LIMIT'}"
     )
@@ -56,5 +183,6 @@ def extract_job_titles_to_gcs(config: Dict[str, Any], **context) -> Optional[str
         timestamp=timestamp,
         prefix="titles",
         clean_column="title",
-        custom_normalize=normalize_title,
+        normalize_expr=normalize_title_expr,
+        watermark=watermark,
     )
@@ -1,12 +1,18 @@
 from airflow.decorators import task
 from airflow.models import Variable
-from google.cloud import storage
-import polars as pl
-import io
 import logging
+from lib.enrichment_pipeline_helpers.batch_size_controller import (
+    BatchStatsStore,
+    choose_batch_size,
+)
+from lib.enrichment_pipeline_helpers.gcs_utils import download_parquet_as_dataframe
 from lib.enrichment_pipeline_helpers.group_and_batch import group_and_batch
+from job_enrichment_pipeline.utils.enrich_utils_csv import (
+    get_response_format,
+    output_tokens_expr,
+)
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 logger = logging.getLogger("group_and_batch_titles")
 
@@ -19,34 +25,72 @@ logger = logging.getLogger("group_and_batch_titles")
             "limit_memory": "2Gi",
             "limit_cpu": "1",
         }
-    }
+    },
+    multiple_outputs=True,
 )
 def group_and_batch_titles(
-    parquet_gcs_path: str, config: Dict[str, Any] = None, **context
-) -> list[list[str]]:
+    parquet_gcs_path: Optional[str], config: Dict[str, Any] = None, **context
+) -> Dict[str, Any]:
+    """
+    Returns ``batches``, the batch groups to map enrich tasks over, and
+    ``manifest_uri`` when they are indices into a batch manifest.
+    """
+    if not parquet_gcs_path:
+        logger.warning("No titles left to batch.")
+        return {"manifest_uri": None, "batches": []}
+
     try:
         logger.info(f"Reading parquet from GCS: {parquet_gcs_path}")
         timestamp = context["execution_date"].strftime("%Y%m%dT%H%M%S")
-        bucket, blob = parquet_gcs_path.replace("gs://", "").split("/", 1)
 
         pipeline_config = config.get("pipeline", {}) if config else {}
         batch_size = pipeline_config.get("batch_size", 1000)
+
+        output_dir = Variable.get(
+            "GCS_ENRICHMENT_BASE", default_var=None
+        ) or os.environ.get("GCS_ENRICHMENT_BASE")
+
+        if pipeline_config.get("batch_sizing", "static") == "adaptive":
+            adaptive_config = pipeline_config.get("adaptive_batching", {})
+            stats_store = BatchStatsStore(f"{output_dir.rstrip('/')}/state/batch_stats")
+            batch_size = choose_batch_size(
+                stats_store.load_recent(adaptive_config.get("history_runs", 5)),
+                default_size=batch_size,
+                min_size=adaptive_config.get("min_batch_size", 100),
+                max_size=adaptive_config.get("max_batch_size", 2000),
+                target_loss_rate=adaptive_config.get("target_loss_rate", 0.05),
+                growth_factor=adaptive_config.get("growth_factor", 1.25),
+            )
         logger.info(f"Using batch size: {batch_size}")
 
-        buf = io.BytesIO()
-        storage.Client().bucket(bucket).blob(blob).download_to_file(buf)
-        buf.seek(0)
+        token_budget = None
+        cost_expr = None
+        if pipeline_config.get("batching_mode", "count") == "token_budget":
+            llm_config = config.get("llm", {})
+            prompt_version = Variable.get(
+                "JOB_TITLE_PROMPT_VERSION", default_var=None
+            ) or os.environ.get(
+                "JOB_TITLE_PROMPT_VERSION",
+                llm_config.get("default_prompt_version", "v1"),
+            )
+            token_budget = pipeline_config.get("max_output_tokens_per_batch", 48000)
+            cost_expr = output_tokens_expr(
+                llm_config.get("token_estimation", {}),
+                get_response_format("job_enrichment_pipeline.prompt", prompt_version),
+            )
+            logger.info(f"Packing batches up to {token_budget} output tokens")
+
+        manifest_shards = None
+        if pipeline_config.get("batch_output", "files") == "manifest":
+            manifest_shards = pipeline_config.get("manifest_shards", 4)
+            logger.info(f"Writing batches into {manifest_shards} manifest shards")
 
-        df = pl.read_parquet(buf)
+        df = download_parquet_as_dataframe(parquet_gcs_path)
         if df.is_empty():
             logger.warning("Empty dataframe after reading parquet.")
-            return []
+            return {"manifest_uri": None, "batches": []}
 
-        output_dir = Variable.get(
-            "GCS_ENRICHMENT_BASE", default_var=None
-        ) or os.environ.get("GCS_ENRICHMENT_BASE")
-
-        paths = group_and_batch(
+        manifest_uri, batches = group_and_batch(
             df=df,
             group_by_cols=["title"],
             agg_cols=["id"],
@@ -54,9 +98,22 @@ def group_and_batch_titles(
             batch_size=batch_size,
             timestamp=timestamp,
             prefix="batched_titles",
+            token_budget=token_budget,
+            cost_expr=cost_expr,
+            manifest_shards=manifest_shards,
         )
 
-        return [[path] for path in paths]
+        enrich_config = config.get("enrich", {}) if config else {}
+        if enrich_config.get("mode", "per_batch") == "async":
+            per_task = enrich_config.get("batches_per_task", 8)
+            return {
+                "manifest_uri": manifest_uri,
+                "batches": [
+                    batches[i : i + per_task] for i in range(0, len(batches), per_task)
+                ],
+            }
+
+        return {"manifest_uri": manifest_uri, "batches": [[batch] for batch in batches]}
 
     except Exception as e:
         logger.error(f"Failed to group and batch titles: {e}", exc_info=True)
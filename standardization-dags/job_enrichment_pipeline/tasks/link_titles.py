@@ -1,10 +1,14 @@
 import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from airflow.decorators import task
 from airflow.models import Variable
 
-from job_enrichment_pipeline.utils.link_titles_utils import link_pre_enriched_titles
+from lib.enrichment_pipeline_helpers.mapping_snapshot import MappingSnapshot
+from job_enrichment_pipeline.utils.link_titles_utils import (
+    link_pre_enriched_titles,
+    link_pre_enriched_titles_in_database,
+)
 
 logger = logging.getLogger("task.link_titles")
 
@@ -19,7 +23,13 @@ logger = logging.getLogger("task.link_titles")
         }
     }
 )
-def link_titles(file_path: str, config: Dict[str, Any] = None, **context) -> str:
+def link_titles(
+    file_path: Optional[str], config: Dict[str, Any] = None, **context
+) -> Optional[str]:
+    if not file_path:
+        logger.warning("No extracted titles to link.")
+        return None
+
     logger.info(f"Starting pre-enrichment link step for: {file_path}")
 
     db_uri = Variable.get("POSTGRES_URI", default_var=None) or os.environ.get(
@@ -28,4 +38,63 @@ def link_titles(file_path: str, config: Dict[str, Any] = None, **context) -> str
     if not db_uri:
         raise ValueError("POSTGRES_URI environment variable not set")
 
-    return link_pre_enriched_titles(input_path=file_path, db_uri=db_uri)
+    link_config = config.get("link", {}) if config else {}
+    pipeline_config = config.get("pipeline", {}) if config else {}
+    fuzzy_config = link_config.get("fuzzy", {})
+    mode = link_config.get("mode", "database")
+    chunk_size = pipeline_config.get("update_chunk_size", 5000)
+    mapping_snapshot = None
+
+    blob_storage_base_path = Variable.get(
+        "GCS_ENRICHMENT_BASE", default_var=None
+    ) or os.environ.get("GCS_ENRICHMENT_BASE")
+    state_path = (
+        f"{blob_storage_base_path.rstrip('/')}/state"
+        if blob_storage_base_path
+        else None
+    )
+
+    fuzzy_threshold = None
+    fuzzy_index_uri = None
+    if fuzzy_config.get("enabled", False):
+        fuzzy_threshold = fuzzy_config.get("threshold", 0.85)
+        fuzzy_index_uri = fuzzy_config.get("index_uri") or (
+            f"{state_path}/fuzzy_title_index" if state_path else None
+        )
+        logger.info(f"Fuzzy linking enabled (threshold={fuzzy_threshold})")
+
+    if mode == "server":
+        logger.info("Linking titles with a server-side join")
+        return link_pre_enriched_titles_in_database(
+            input_path=file_path,
+            db_uri=db_uri,
+            chunk_size=chunk_size,
+            fuzzy_threshold=fuzzy_threshold,
+            fuzzy_index_uri=fuzzy_index_uri,
+        )
+
+    if mode == "snapshot":
+        snapshot_config = link_config.get("snapshot", {})
+        mapping_snapshot = MappingSnapshot(
+            db_uri=db_uri,
+            table="standardized_job_mappings",
+            key_column="job_title",
+            value_column="standardized_job_id",
+            cursor_column=snapshot_config.get("cursor_column", "id"),
+            local_dir=snapshot_config.get("local_dir", "/tmp/enrichment_cache"),
+            remote_uri=f"{state_path}/mapping_snapshot" if state_path else None,
+            full_refresh_every=snapshot_config.get("full_refresh_every", 24),
+        )
+    elif mode != "database":
+        raise ValueError(f"Unknown link mode: {mode}")
+
+    logger.info(f"Linking titles using '{mode}' mappings")
+    return link_pre_enriched_titles(
+        input_path=file_path,
+        db_uri=db_uri,
+        mapping_snapshot=mapping_snapshot,
+        chunk_size=chunk_size,
+        fuzzy_threshold=fuzzy_threshold,
+        fuzzy_index_uri=fuzzy_index_uri,
+        fuzzy_evaluation_sample=fuzzy_config.get("evaluation_sample", 0),
+    )
@@ -4,7 +4,11 @@ import logging
 import os
 from typing import List, Dict, Any
 
-from job_enrichment_pipeline.utils.load_utils import load_enriched_to_postgres
+from job_enrichment_pipeline.utils.load_utils import (
+    load_enriched_to_postgres,
+    load_enriched_via_staging,
+)
+from job_enrichment_pipeline.utils.watermark_utils import title_extraction_watermark
 
 logger = logging.getLogger("airflow.task.load_postgres")
 
@@ -17,16 +21,40 @@ logger = logging.getLogger("airflow.task.load_postgres")
             "limit_memory": "2Gi",
             "limit_cpu": "1",
         }
-    }
+    },
+    # Runs when extraction or batching produced nothing and the enrich tasks
+    # were skipped, so the staged watermark is still committed.
+    trigger_rule="none_failed",
 )
 def load_to_postgres(
     enriched_paths: List[str],
     config: Dict[str, Any] = None,
+    **context,
 ) -> None:
-    if not enriched_paths:
+    enriched_paths = [
+        path
+        for entry in enriched_paths or []
+        for path in (entry if isinstance(entry, list) else [entry])
+    ]
+    stats = {}
+    if enriched_paths:
+        stats = _load(enriched_paths, config)
+    else:
         logger.warning("No enriched file paths provided to load.")
-        return
 
+    extraction_config = config.get("extraction", {}) if config else {}
+    blob_storage_base_path = Variable.get(
+        "GCS_ENRICHMENT_BASE", default_var=None
+    ) or os.environ.get("GCS_ENRICHMENT_BASE")
+    watermark = title_extraction_watermark(blob_storage_base_path, extraction_config)
+    if watermark:
+        watermark.commit(
+            run_id=context["execution_date"].strftime("%Y%m%dT%H%M%S"),
+            unloaded_ids=stats.get("unloaded_ids", []),
+        )
+
+
+def _load(enriched_paths: List[str], config: Dict[str, Any]) -> Dict[str, Any]:
     db_uri = Variable.get("POSTGRES_URI", default_var=None) or os.environ.get(
         "POSTGRES_URI"
     )
@@ -38,7 +66,17 @@ def load_to_postgres(
     prompt_version = config.get("prompt_version") if config else None
 
     logger.info(f"Starting load task for {len(enriched_paths)} enriched file(s)")
-    load_enriched_to_postgres(
+    pipeline_config = config.get("pipeline", {}) if config else {}
+    load_config = config.get("load", {}) if config else {}
+    if load_config.get("mode", "rows") == "staging":
+        return load_enriched_via_staging(
+            enriched_paths=enriched_paths,
+            db_uri=db_uri,
+            stage_table=load_config.get("stage_table", "enriched_load_stage"),
+        )
+
+    return load_enriched_to_postgres(
         enriched_paths=enriched_paths,
         db_uri=db_uri,
+        chunk_size=pipeline_config.get("update_chunk_size", 5000),
     )
@@ -0,0 +1,33 @@
+from airflow.decorators import task
+from airflow.models import Variable
+import logging
+import os
+from typing import Any, Dict, List
+
+from lib.enrichment_pipeline_helpers.enrichment_metrics import rollup_run_metrics
+from lib.enrichment_pipeline_helpers.metrics_exporters import create_metrics_exporter
+
+logger = logging.getLogger("airflow.task.enrichment_metrics")
+
+
+@task(trigger_rule="all_done")
+def summarize_enrichment_metrics(
+    enriched_paths: List[str], config: Dict[str, Any] = None, **context
+) -> None:
+    metrics_config = config.get("metrics", {}) if config else {}
+    if not metrics_config.get("enabled", False):
+        logger.info("Enrichment metrics disabled, nothing to summarize")
+        return
+
+    blob_storage_base_path = Variable.get(
+        "GCS_ENRICHMENT_BASE", default_var=None
+    ) or os.environ.get("GCS_ENRICHMENT_BASE")
+    if not blob_storage_base_path:
+        raise ValueError("GCS_ENRICHMENT_BASE is not set")
+
+    rollup_run_metrics(
+        f"{blob_storage_base_path.rstrip('/')}/metrics",
+        run_id=context["execution_date"].strftime("%Y%m%dT%H%M%S"),
+        exporter=create_metrics_exporter(metrics_config),
+        pricing=metrics_config.get("pricing", {}),
+    )
@@ -0,0 +1,432 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar, Union
+
+import polars as pl
+
+from lib.llm_clients.base import LLMClient, pop_call_info
+from lib.llm_clients.gemini_client import TruncatedResponseError
+from lib.llm_clients.rate_limiter import AIMDRateLimiter, is_rate_limit_error
+from lib.enrichment_pipeline_helpers.batch_manifest import read_batch
+from lib.enrichment_pipeline_helpers.gcs_utils import split_gcs_uri
+from job_enrichment_pipeline.utils.enrich_utils_csv import (
+    RecoveryPlanner,
+    StreamedRowCollector,
+    build_request_prompt,
+    build_response_cache_namespace,
+    create_enrichment_client,
+    empty_labels_frame,
+    enrich_batch_from_labels,
+    get_response_format,
+    log_token_prediction,
+    lookup_cached_labels,
+    response_schema,
+    salvage_response_rows,
+    save_enriched_batch,
+    store_labels_in_cache,
+    with_row_keys,
+)
+
+logger = logging.getLogger("enrichment_helper.async")
+
+T = TypeVar("T")
+
+
+async def request_with_backoff(
+    request: Callable[[], Awaitable[T]],
+    limiter: AIMDRateLimiter,
+    max_retries: int = 5,
+    base_delay: float = 2.0,
+) -> T:
+    for attempt in range(max_retries + 1):
+        try:
+            async with limiter.slot():
+                return await request()
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == max_retries:
+                raise
+
+        delay = base_delay * 2**attempt
+        logger.warning(
+            f"Rate limited, retrying in {delay:.0f}s (attempt {attempt + 1})"
+        )
+        await asyncio.sleep(delay)
+
+
+async def astream_response_rows(
+    model_client: LLMClient,
+    prompt: str,
+    df_sub: pl.DataFrame,
+    response_format: str = "labels",
+    cacheable_prefix: Optional[str] = None,
+) -> pl.DataFrame:
+    collector = StreamedRowCollector(response_format)
+    truncated = False
+    try:
+        async for chunk in model_client.aprocess_stream(
+            prompt=prompt, cacheable_prefix=cacheable_prefix
+        ):
+            collector.feed(chunk)
+    except TruncatedResponseError as e:
+        logger.warning(f"{str(e)}, keeping {len(collector.rows)} rows parsed so far")
+        truncated = True
+
+    return collector.finish(df_sub, truncated)
+
+
+async def _request_sub_batch(
+    df_sub: pl.DataFrame,
+    batch_name: str,
+    model_client: LLMClient,
+    limiter: AIMDRateLimiter,
+    prompt_type: str,
+    prompt_version: str,
+    max_retries: int,
+    streaming: bool,
+    response_format: str,
+    prompt_caching: bool,
+    round_index: int = 0,
+    metrics: Optional[Any] = None,
+    output_mode: str = "csv",
+    estimation_config: Optional[Dict[str, Any]] = None,
+) -> pl.DataFrame:
+    prompt, cacheable_prefix = build_request_prompt(
+        df_sub, prompt_type, prompt_version, prompt_caching, output_mode
+    )
+    schema = response_schema(response_format) if output_mode == "json" else None
+    attempts = 0
+
+    async def request() -> pl.DataFrame:
+        nonlocal attempts
+        attempts += 1
+        pop_call_info()
+        if streaming and output_mode == "csv":
+            return await astream_response_rows(
+                model_client,
+                prompt,
+                df_sub,
+                response_format,
+                cacheable_prefix=cacheable_prefix,
+            )
+        try:
+            response = await model_client.aprocess(
+                prompt=prompt, schema=schema, cacheable_prefix=cacheable_prefix
+            )
+        except TruncatedResponseError as e:
+            logger.warning(f"{str(e)}, keeping the complete rows received")
+            return salvage_response_rows(
+                e.text, df_sub, response_format, output_mode, truncated=True
+            )
+        return salvage_response_rows(response, df_sub, response_format, output_mode)
+
+    started = time.perf_counter()
+    call_started = time.time()
+    try:
+        df_rows = await request_with_backoff(request, limiter, max_retries=max_retries)
+    except Exception as e:
+        logger.warning(
+            f"Batch {batch_name}: request for {df_sub.height} titles failed: {e}"
+        )
+        if metrics is not None:
+            metrics.record_call(
+                batch_name,
+                round_index,
+                call_started,
+                df_sub.height,
+                0,
+                retries=max(attempts - 1, 0),
+                error=type(e).__name__,
+                call_info=pop_call_info(),
+            )
+        return empty_labels_frame()
+
+    call_info = pop_call_info()
+    if metrics is not None:
+        metrics.record_call(
+            batch_name,
+            round_index,
+            call_started,
+            df_sub.height,
+            df_rows.height,
+            retries=attempts - 1,
+            call_info=call_info,
+        )
+    log_token_prediction(
+        df_sub,
+        (cacheable_prefix or "") + prompt,
+        call_info,
+        estimation_config or {},
+        response_format,
+    )
+
+    logger.info(
+        f"Batch {batch_name}: {df_sub.height} titles answered in "
+        f"{time.perf_counter() - started:.1f}s"
+    )
+    return df_rows
+
+
+async def request_labels_with_recovery(
+    df_pending: pl.DataFrame,
+    batch_name: str,
+    model_client: LLMClient,
+    limiter: AIMDRateLimiter,
+    prompt_type: str,
+    prompt_version: str,
+    max_retries: int,
+    max_recovery_rounds: int,
+    recovery_split: int,
+    streaming: bool = False,
+    prompt_caching: bool = False,
+    metrics: Optional[Any] = None,
+    output_mode: str = "csv",
+    estimation_config: Optional[Dict[str, Any]] = None,
+) -> tuple[pl.DataFrame, Dict[str, int]]:
+    """
+    Async transport for ``RecoveryPlanner``: the sub-batches of each round
+    are requested concurrently, bounded by ``limiter``.
+    """
+    response_format = get_response_format(prompt_type, prompt_version)
+    planner = RecoveryPlanner(
+        df_pending, batch_name, max_recovery_rounds, recovery_split
+    )
+    while (sub_batches := planner.next_round()) is not None:
+        planner.record_round(
+            await asyncio.gather(
+                *[
+                    _request_sub_batch(
+                        df_sub,
+                        batch_name,
+                        model_client,
+                        limiter,
+                        prompt_type,
+                        prompt_version,
+                        max_retries,
+                        streaming,
+                        response_format,
+                        prompt_caching,
+                        planner.round_index,
+                        metrics,
+                        output_mode,
+                        estimation_config,
+                    )
+                    for df_sub in sub_batches
+                ]
+            )
+        )
+
+    return planner.finish()
+
+
+async def _process_batch(
+    batch_path: Union[str, int],
+    model_client: LLMClient,
+    limiter: AIMDRateLimiter,
+    prompt_type: str,
+    prompt_version: str,
+    timestamp: str,
+    output_prefix: str,
+    max_retries: int,
+    response_cache: Optional[Any],
+    cache_namespace: Optional[str],
+    max_recovery_rounds: int,
+    recovery_split: int,
+    streaming: bool,
+    prompt_caching: bool,
+    stats_store: Optional[Any],
+    metrics: Optional[Any],
+    output_mode: str,
+    manifest_uri: Optional[str],
+    estimation_config: Dict[str, Any],
+) -> Dict[str, Any]:
+    bucket_name = split_gcs_uri(manifest_uri or batch_path)[0]
+    df_batch, batch_name = await asyncio.to_thread(read_batch, batch_path, manifest_uri)
+    df_batch = with_row_keys(df_batch)
+
+    frames = []
+    df_missing = df_batch
+    if response_cache is not None:
+        df_cached = await asyncio.to_thread(
+            lookup_cached_labels, df_batch, response_cache, cache_namespace
+        )
+        frames.append(df_cached)
+        df_missing = df_batch.filter(
+            ~pl.col("title").is_in(df_cached.get_column("title").implode())
+        )
+
+    stats = {"requested": 0, "first_pass": 0, "recovered": 0, "abandoned": 0}
+    if not df_missing.is_empty():
+        df_labels, stats = await request_labels_with_recovery(
+            df_missing.select(["row_key", "title"]),
+            batch_name,
+            model_client,
+            limiter,
+            prompt_type,
+            prompt_version,
+            max_retries,
+            max_recovery_rounds,
+            recovery_split,
+            streaming,
+            prompt_caching,
+            metrics,
+            output_mode,
+            estimation_config,
+        )
+        frames.append(df_labels)
+
+        if response_cache is not None:
+            await asyncio.to_thread(
+                store_labels_in_cache, df_labels, response_cache, cache_namespace
+            )
+        if stats_store is not None:
+            await asyncio.to_thread(
+                stats_store.record,
+                timestamp,
+                batch_name,
+                {**stats, "batch_size": df_batch.height},
+            )
+        if metrics is not None:
+            await asyncio.to_thread(metrics.write_batch, batch_name)
+
+    df_enriched = enrich_batch_from_labels(pl.concat(frames), df_batch)
+    output_path = await asyncio.to_thread(
+        save_enriched_batch,
+        df_enriched,
+        bucket_name,
+        output_prefix,
+        timestamp,
+        batch_name,
+    )
+    return {"path": output_path, "titles": df_batch.height, **stats}
+
+
+async def _process_batches(
+    batch_paths: List[Union[str, int]],
+    prompt_type: str,
+    prompt_version: str,
+    timestamp: str,
+    output_prefix: str,
+    config: Dict[str, Any],
+    max_in_flight: int,
+    max_retries: int,
+    response_cache: Optional[Any],
+    max_recovery_rounds: int,
+    recovery_split: int,
+    stats_store: Optional[Any],
+    metrics: Optional[Any],
+    manifest_uri: Optional[str],
+) -> List[Any]:
+    model_client = create_enrichment_client(config)
+    limiter = AIMDRateLimiter(max_in_flight=max_in_flight)
+    cache_namespace = (
+        build_response_cache_namespace(model_client, prompt_type, prompt_version)
+        if response_cache is not None
+        else None
+    )
+
+    return await asyncio.gather(
+        *[
+            _process_batch(
+                batch_path,
+                model_client,
+                limiter,
+                prompt_type,
+                prompt_version,
+                timestamp,
+                output_prefix,
+                max_retries,
+                response_cache,
+                cache_namespace,
+                max_recovery_rounds,
+                recovery_split,
+                config.get("streaming", False),
+                config.get("prompt_cache", {}).get("enabled", False),
+                stats_store,
+                metrics,
+                config.get("output_mode", "csv"),
+                manifest_uri,
+                config.get("token_estimation", {}),
+            )
+            for batch_path in batch_paths
+        ],
+        return_exceptions=True,
+    )
+
+
+def process_batches_async(
+    batch_paths: List[Union[str, int]],
+    prompt_type: str,
+    prompt_version: str,
+    timestamp: Optional[str] = None,
+    output_prefix: str = "enriched",
+    config: Optional[Dict[str, Any]] = None,
+    max_in_flight: int = 8,
+    max_retries: int = 5,
+    response_cache: Optional[Any] = None,
+    max_recovery_rounds: int = 2,
+    recovery_split: int = 4,
+    stats_store: Optional[Any] = None,
+    metrics: Optional[Any] = None,
+    manifest_uri: Optional[str] = None,
+) -> List[str]:
+    """
+    Enrich several batches in one worker with up to ``max_in_flight``
+    concurrent LLM requests (adapted with AIMD on rate-limit errors) while
+    batch downloads and uploads run on threads. Every batch is attempted;
+    if any of them failed the call raises after logging each failure, so its
+    titles are not silently left out of the load.
+    """
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+    config = config or {}
+    logger.info(f"Processing {len(batch_paths)} batches, max {max_in_flight} in flight")
+
+    started = time.perf_counter()
+    results = asyncio.run(
+        _process_batches(
+            batch_paths,
+            prompt_type,
+            prompt_version,
+            timestamp,
+            output_prefix,
+            config,
+            max_in_flight,
+            max_retries,
+            response_cache,
+            max_recovery_rounds,
+            recovery_split,
+            stats_store,
+            metrics,
+            manifest_uri,
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    output_paths = []
+    failed = []
+    titles = 0
+    recovered = 0
+    abandoned = 0
+    for batch_path, result in zip(batch_paths, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error processing batch {batch_path}: {result}")
+            failed.append(batch_path)
+            continue
+        output_paths.append(result["path"])
+        titles += result["titles"]
+        recovered += result["recovered"]
+        abandoned += result["abandoned"]
+
+    logger.info(
+        f"Enriched {titles} titles from {len(output_paths)}/{len(batch_paths)} batches "
+        f"in {elapsed:.1f}s ({titles / elapsed if elapsed else 0:.1f} titles/s), "
+        f"{recovered} recovered, {abandoned} abandoned"
+    )
+
+    if failed:
+        raise RuntimeError(
+            f"{len(failed)} of {len(batch_paths)} batches failed: {failed}"
+        )
+
+    return output_paths
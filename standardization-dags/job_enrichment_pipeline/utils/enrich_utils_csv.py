@@ -1,96 +1,777 @@
+import hashlib
 import logging
-import os
-import io
+import math
+import time
 import polars as pl
-from typing import Dict, List, Any, Optional
-from google.cloud import storage
+from typing import Dict, List, Any, Optional, Tuple, Type, Union
 from datetime import datetime
 
-from lib.llm_clients.gemini_client import GeminiClient
-from lib.enrichment_pipeline_helpers.gcs_utils import upload_dataframe_as_parquet
-from lib.prompt_management.prompt_loader import load_prompt_with_params
+from lib.llm_clients.base import LLMClient, pop_call_info
+from lib.resources.registry import get_llm_client
+from lib.llm_clients.gemini_client import TruncatedResponseError
+from lib.llm_clients.response_cache import build_cache_key, build_cache_namespace
+from lib.enrichment_pipeline_helpers.batch_manifest import read_batch
+from lib.enrichment_pipeline_helpers.gcs_utils import (
+    split_gcs_uri,
+    upload_dataframe_as_parquet,
+)
+from lib.prompt_management.prompt_loader import (
+    load_prompt_attribute,
+    load_prompt_parts,
+)
+from lib.enrichment_pipeline_helpers.token_estimation import (
+    DEFAULT_CHARS_PER_TOKEN,
+    DEFAULT_CODED_OUTPUT_TOKENS,
+    DEFAULT_OUTPUT_OVERHEAD_TOKENS,
+    estimate_output_tokens_expr,
+    estimate_text_tokens,
+)
+from lib.enrichment_pipeline_helpers.incremental_csv_parser import (
+    IncrementalCsvParser,
+)
 from lib.enrichment_pipeline_helpers.parse_llm_csv_response import (
     parse_llm_csv_response,
 )
+from lib.enrichment_pipeline_helpers.parse_llm_json_response import (
+    parse_llm_json_response,
+)
+from job_enrichment_pipeline.utils.fake_job_title_responder import (
+    fake_job_title_response,
+)
 from job_enrichment_pipeline.utils.log_title_enrichment_quality import (
     log_title_enrichment_quality,
 )
-from job_enrichment_pipeline.utils.normalize_utils import normalize_title
+from job_enrichment_pipeline.schema.job_title import JobTitleCodes, JobTitleEnrichment
+from job_enrichment_pipeline.schema.taxonomy import (
+    function_lookup,
+    repair_labels,
+    seniority_lookup,
+)
+from job_enrichment_pipeline.utils.normalize_utils import normalize_title_expr
 
 logger = logging.getLogger("enrichment_helper")
 
+LABEL_COLUMNS = ["seniority_level", "department", "function"]
+
+# Columns the model answers with, keyed by the prompt module's RESPONSE_FORMAT.
+RESPONSE_COLUMNS = {
+    "labels": ["title", *LABEL_COLUMNS],
+    "coded": ["row_index", "seniority_code", "function_code"],
+}
+
+# Provider-side response schema per RESPONSE_FORMAT for output_mode "json".
+RESPONSE_MODELS = {"labels": JobTitleEnrichment, "coded": JobTitleCodes}
+
+
+def create_enrichment_client(config: Dict[str, Any]) -> LLMClient:
+    return get_llm_client(config, responder=fake_job_title_response)
+
+
+def output_tokens_expr(
+    estimation_config: Dict[str, Any], response_format: str = "labels"
+) -> pl.Expr:
+    """Predicted output tokens of each title for the prompt's response format."""
+    if response_format == "coded":
+        return estimate_output_tokens_expr(
+            pl.col("title"),
+            overhead_tokens=estimation_config.get(
+                "coded_output_tokens_per_title", DEFAULT_CODED_OUTPUT_TOKENS
+            ),
+            echoes_title=False,
+        )
+    return estimate_output_tokens_expr(
+        pl.col("title"),
+        chars_per_token=estimation_config.get(
+            "chars_per_token", DEFAULT_CHARS_PER_TOKEN
+        ),
+        overhead_tokens=estimation_config.get(
+            "output_overhead_tokens_per_title", DEFAULT_OUTPUT_OVERHEAD_TOKENS
+        ),
+    )
+
+
+def log_token_prediction(
+    df_batch: pl.DataFrame,
+    prompt: str,
+    call_info: Dict[str, Any],
+    estimation_config: Dict[str, Any],
+    response_format: str = "labels",
+) -> None:
+    """Log predicted against actual tokens of one call, from its ``pop_call_info``."""
+    predicted_output = df_batch.select(
+        output_tokens_expr(estimation_config, response_format).sum()
+    ).item()
+    predicted_input = estimate_text_tokens(
+        prompt, estimation_config.get("chars_per_token", DEFAULT_CHARS_PER_TOKEN)
+    )
+
+    actual_input = call_info.get("prompt_tokens")
+    actual_output = call_info.get("output_tokens")
+    logger.info(
+        f"Tokens for {df_batch.height} titles: input predicted {predicted_input} / "
+        f"actual {actual_input}, output predicted {predicted_output} / actual {actual_output}"
+    )
+
+
+def get_response_format(prompt_type: str, prompt_version: str) -> str:
+    return load_prompt_attribute(
+        prompt_type, prompt_version, "RESPONSE_FORMAT", default="labels"
+    )
+
+
+def build_batch_prompt_parts(
+    titles: List[str],
+    prompt_type: str,
+    prompt_version: str,
+    row_keys: Optional[List[int]] = None,
+) -> Tuple[str, str]:
+    if get_response_format(prompt_type, prompt_version) == "coded":
+        row_keys = row_keys if row_keys is not None else range(len(titles))
+        titles = [f"{row_key},{title}" for row_key, title in zip(row_keys, titles)]
+
+    parts = load_prompt_parts(
+        prompt_type=prompt_type,
+        version=prompt_version,
+        params={"job_titles": "\n".join(titles)},
+        variable_param="job_titles",
+    )
+
+    if not parts:
+        raise ValueError(
+            f"Failed to load or format prompt {prompt_type} v{prompt_version}"
+        )
+
+    return parts
+
+
+def build_batch_prompt(
+    titles: List[str],
+    prompt_type: str,
+    prompt_version: str,
+    row_keys: Optional[List[int]] = None,
+) -> str:
+    return "".join(
+        build_batch_prompt_parts(titles, prompt_type, prompt_version, row_keys)
+    )
+
+
+def response_schema(response_format: str) -> Type:
+    return list[RESPONSE_MODELS[response_format]]
+
+
+def response_frame_schema(response_format: str) -> Dict[str, pl.DataType]:
+    dtype = pl.Int64 if response_format == "coded" else pl.Utf8
+    return {column: dtype for column in RESPONSE_COLUMNS[response_format]}
+
 
-def match_titles_with_ids(
-    enriched_df: pl.DataFrame, batch_df: pl.DataFrame
+def build_request_prompt(
+    df_sub: pl.DataFrame,
+    prompt_type: str,
+    prompt_version: str,
+    prompt_caching: bool = False,
+    output_mode: str = "csv",
+) -> Tuple[str, Optional[str]]:
+    """
+    Prompt for the ``df_sub`` rows as ``(prompt, cacheable_prefix)``. With
+    ``prompt_caching`` the static taxonomy preamble is returned separately so
+    the client can serve it from the provider's context cache. In ``json``
+    output mode the prompt ends with a note that the answer follows the
+    response schema instead of the prompt's CSV layout.
+    """
+    prefix, suffix = build_batch_prompt_parts(
+        df_sub.get_column("title").to_list(),
+        prompt_type,
+        prompt_version,
+        row_keys=df_sub.get_column("row_key").to_list(),
+    )
+
+    if output_mode == "json":
+        columns = RESPONSE_COLUMNS[get_response_format(prompt_type, prompt_version)]
+        suffix += (
+            "\nAnswer with a JSON array instead of CSV: one object per input "
+            f"line with the keys {', '.join(columns)}.\n"
+        )
+
+    if prompt_caching:
+        return suffix, prefix
+    return prefix + suffix, None
+
+
+def build_response_cache_namespace(
+    model_client: LLMClient, prompt_type: str, prompt_version: str
+) -> str:
+    # Fingerprint the rendered template rather than the prompt module source,
+    # so edits to the taxonomy it renders also start a fresh namespace.
+    fingerprint = hashlib.sha256(
+        "".join(build_batch_prompt_parts([], prompt_type, prompt_version)).encode(
+            "utf-8"
+        )
+    ).hexdigest()
+
+    return build_cache_namespace(
+        fingerprint, model_client.model, model_client.generation_config
+    )
+
+
+def with_row_keys(df_batch: pl.DataFrame) -> pl.DataFrame:
+    return df_batch.with_columns(
+        pl.int_range(pl.len(), dtype=pl.Int64).alias("row_key")
+    )
+
+
+def lookup_cached_labels(
+    df_batch: pl.DataFrame, response_cache: Any, namespace: str
 ) -> pl.DataFrame:
+    titles = df_batch.get_column("title").unique().to_list()
+    keys = {build_cache_key(namespace, title): title for title in titles}
+    hits = response_cache.get_many(keys)
+
+    logger.info(f"Response cache hits: {len(hits)}/{len(titles)} titles")
+
+    df_hits = pl.DataFrame(
+        [{"title": keys[key], **value} for key, value in hits.items()],
+        schema={"title": pl.Utf8, **{column: pl.Utf8 for column in LABEL_COLUMNS}},
+    )
+    return df_batch.select(["row_key", "title"]).join(df_hits, on="title")
+
+
+def store_labels_in_cache(
+    df_labels: pl.DataFrame, response_cache: Any, namespace: str
+) -> None:
+    response_cache.put_many(
+        {
+            build_cache_key(namespace, row["title"]): {
+                column: row[column] for column in LABEL_COLUMNS
+            }
+            for row in df_labels.iter_rows(named=True)
+        }
+    )
+    logger.info(f"Stored {df_labels.height} titles in response cache")
+
+
+def empty_labels_frame() -> pl.DataFrame:
+    return pl.DataFrame(
+        schema={
+            "row_key": pl.Int64,
+            "title": pl.Utf8,
+            **{column: pl.Utf8 for column in LABEL_COLUMNS},
+        }
+    )
+
+
+def salvage_response_rows(
+    response: str,
+    df_sub: pl.DataFrame,
+    response_format: str = "labels",
+    output_mode: str = "csv",
+    truncated: bool = False,
+) -> pl.DataFrame:
+    """
+    Keep every row of a (possibly truncated or partly malformed) response that
+    answers one of the requested titles (``df_sub`` rows of row_key, title)
+    with all labels present. A response that cannot be parsed at all yields an
+    empty frame. When the response was ``truncated`` its unterminated last
+    CSV line is dropped, as it may hold a cut-off label.
+    """
+    if truncated and output_mode == "csv":
+        response = response[: response.rfind("\n") + 1]
+
+    try:
+        if output_mode == "json":
+            df_response = parse_llm_json_response(
+                response, schema=response_frame_schema(response_format)
+            )
+        else:
+            df_response = parse_llm_csv_response(
+                response, expected_columns=RESPONSE_COLUMNS[response_format]
+            )
+    except Exception as e:
+        logger.warning(f"Discarding unparseable response: {str(e)}")
+        return empty_labels_frame()
+
+    return select_valid_rows(df_response, df_sub, response_format)
+
+
+def decode_coded_rows(df_response: pl.DataFrame, df_sub: pl.DataFrame) -> pl.DataFrame:
+    """
+    Align ``row_index,seniority_code,function_code`` rows to the request by
+    integer row key and decode the codes to taxonomy labels. Rows with an
+    unrequested key or unknown code are dropped.
+    """
+    df_codes = df_response.select(
+        [
+            pl.col(column).cast(pl.Int64, strict=False)
+            for column in RESPONSE_COLUMNS["coded"]
+        ]
+    ).rename({"row_index": "row_key"})
+
+    df_decoded = (
+        df_codes.join(df_sub, on="row_key", how="inner")
+        .join(seniority_lookup(), on="seniority_code", how="inner")
+        .join(function_lookup(), on="function_code", how="inner")
+    )
+
+    if df_decoded.height < df_codes.height:
+        logger.warning(
+            f"Dropped {df_codes.height - df_decoded.height} rows with unknown "
+            "row_index or taxonomy codes"
+        )
+
+    return df_decoded
+
+
+def align_rows_by_title(
+    df_response: pl.DataFrame, df_sub: pl.DataFrame
+) -> pl.DataFrame:
+    """Match echoed titles back to the request by normalized title string."""
+    return df_response.with_columns(
+        normalize_title_expr(pl.col("title").cast(pl.Utf8)).alias("title")
+    ).join(df_sub, on="title", how="inner")
+
+
+def select_valid_rows(
+    df_response: pl.DataFrame, df_sub: pl.DataFrame, response_format: str = "labels"
+) -> pl.DataFrame:
+    started = time.perf_counter()
+    if response_format == "coded":
+        df_aligned = decode_coded_rows(df_response, df_sub)
+    else:
+        df_aligned = align_rows_by_title(df_response, df_sub)
+
+    # Rows whose labels are not taxonomy values and cannot be repaired are
+    # dropped here, which leaves them pending for the recovery rounds.
+    df_valid, _ = repair_labels(
+        df_aligned.select(
+            pl.col("row_key"),
+            pl.col("title"),
+            *[pl.col(column).cast(pl.Utf8) for column in LABEL_COLUMNS],
+        )
+    )
+    df_valid = df_valid.unique(subset="row_key", keep="first", maintain_order=True)
+
     logger.info(
-        "Matching titles with IDs (batch is normalized, enriched needs normalization)"
+        f"Aligned {df_valid.height}/{df_sub.height} titles "
+        f"({df_valid.height / max(df_sub.height, 1):.1%}) by "
+        f"{'row key' if response_format == 'coded' else 'title'} in "
+        f"{(time.perf_counter() - started) * 1000:.1f}ms"
+    )
+    return df_valid
+
+
+def labelled_rows(
+    rows: List[Dict[str, Any]], columns: List[str]
+) -> List[Dict[str, Any]]:
+    return [
+        {column: row.get(column) for column in columns}
+        for row in rows
+        if all(row.get(column) for column in columns)
+    ]
+
+
+class StreamedRowCollector:
+    """
+    Parses a streamed CSV response chunk by chunk, keeping only fully
+    labelled rows; shared by the sync and async streaming requests.
+    """
+
+    def __init__(self, response_format: str = "labels"):
+        self.response_format = response_format
+        self.columns = RESPONSE_COLUMNS[response_format]
+        self.parser = IncrementalCsvParser(expected_columns=self.columns)
+        self.rows: List[Dict[str, Any]] = []
+
+    def feed(self, chunk: str) -> None:
+        self.rows.extend(labelled_rows(self.parser.feed(chunk), self.columns))
+
+    def finish(self, df_sub: pl.DataFrame, truncated: bool = False) -> pl.DataFrame:
+        """
+        Valid rows answering the ``df_sub`` request. The unterminated last
+        line of a ``truncated`` stream is dropped.
+        """
+        self.rows.extend(
+            labelled_rows(self.parser.close(truncated=truncated), self.columns)
+        )
+        if self.parser.malformed:
+            logger.warning(f"Dropped {self.parser.malformed} malformed response lines")
+
+        return select_valid_rows(
+            pl.DataFrame(
+                self.rows, schema={column: pl.Utf8 for column in self.columns}
+            ),
+            df_sub,
+            self.response_format,
+        )
+
+
+def stream_response_rows(
+    model_client: LLMClient,
+    prompt: str,
+    df_sub: pl.DataFrame,
+    response_format: str = "labels",
+    cacheable_prefix: Optional[str] = None,
+) -> pl.DataFrame:
+    """
+    Stream the response through a ``StreamedRowCollector``, so the raw
+    response body is never held or logged. A stream that stops early keeps
+    every complete row received before it.
+    """
+    collector = StreamedRowCollector(response_format)
+    truncated = False
+    try:
+        for chunk in model_client.process_stream(
+            prompt=prompt, cacheable_prefix=cacheable_prefix
+        ):
+            collector.feed(chunk)
+    except TruncatedResponseError as e:
+        logger.warning(f"{str(e)}, keeping {len(collector.rows)} rows parsed so far")
+        truncated = True
+
+    return collector.finish(df_sub, truncated)
+
+
+def plan_recovery_sub_batches(
+    pending: List[int], round_index: int, recovery_split: int
+) -> List[List[int]]:
+    if round_index == 0:
+        return [pending]
+
+    size = max(1, math.ceil(len(pending) / recovery_split))
+    return [pending[i : i + size] for i in range(0, len(pending), size)]
+
+
+def looks_truncated(requested: List[int], answered: set[int]) -> bool:
+    """
+    A first pass looks truncated when the rows it answered are exactly a
+    leading run of the request: the model stopped rather than skipped rows.
+    """
+    positions = [i for i, row_key in enumerate(requested) if row_key in answered]
+    return 0 < len(positions) < len(requested) and positions[-1] == len(positions) - 1
+
+
+def summarize_recovery(
+    batch_name: str,
+    requested: int,
+    first_pass: int,
+    abandoned: int,
+    first_pass_seconds: float = 0.0,
+    truncated: bool = False,
+) -> Dict[str, Any]:
+    stats = {
+        "requested": requested,
+        "first_pass": first_pass,
+        "recovered": requested - first_pass - abandoned,
+        "abandoned": abandoned,
+        "first_pass_seconds": first_pass_seconds,
+        "truncated": truncated,
+    }
+    logger.info(
+        f"Batch {batch_name}: {stats['first_pass']}/{requested} titles answered "
+        f"on first pass in {first_pass_seconds:.1f}s"
+        f"{' (truncated)' if truncated else ''}, {stats['recovered']} recovered, "
+        f"{stats['abandoned']} abandoned"
+    )
+    return stats
+
+
+class RecoveryPlanner:
+    """
+    Rounds of the recovery loop, independent of how requests are sent: each
+    round re-requests only the ``df_pending`` rows (row_key, title) still
+    missing, split into ``recovery_split`` smaller requests after the first
+    pass, for up to ``max_recovery_rounds`` rounds.
+
+        while (sub_batches := planner.next_round()) is not None:
+            planner.record_round([request(df_sub) for df_sub in sub_batches])
+        df_labels, stats = planner.finish()
+    """
+
+    def __init__(
+        self,
+        df_pending: pl.DataFrame,
+        batch_name: str,
+        max_recovery_rounds: int = 2,
+        recovery_split: int = 4,
+    ):
+        self.df_pending = df_pending
+        self.batch_name = batch_name
+        self.max_recovery_rounds = max_recovery_rounds
+        self.recovery_split = recovery_split
+        self.round_index = -1
+        self.pending = df_pending.get_column("row_key").to_list()
+        self.frames = []
+        self.first_pass = 0
+        self.first_pass_seconds = 0.0
+        self.truncated = False
+        self._round_started = 0.0
+
+    def next_round(self) -> Optional[List[pl.DataFrame]]:
+        """Sub-batches to request in the next round, or None when done."""
+        if not self.pending or self.round_index >= self.max_recovery_rounds:
+            return None
+
+        self.round_index += 1
+        if self.round_index > 0:
+            logger.info(
+                f"Batch {self.batch_name}: re-requesting {len(self.pending)} "
+                f"missing titles (round {self.round_index})"
+            )
+        self._round_started = time.perf_counter()
+        return [
+            self.df_pending.filter(pl.col("row_key").is_in(sub_batch))
+            for sub_batch in plan_recovery_sub_batches(
+                self.pending, self.round_index, self.recovery_split
+            )
+        ]
+
+    def record_round(self, round_frames: List[pl.DataFrame]) -> None:
+        """Record the label rows returned for each sub-batch of the round."""
+        answered = set()
+        for df_rows in round_frames:
+            answered.update(df_rows.get_column("row_key").to_list())
+        self.frames.extend(round_frames)
+
+        if self.round_index == 0:
+            self.first_pass = len(answered)
+            self.first_pass_seconds = time.perf_counter() - self._round_started
+            self.truncated = looks_truncated(self.pending, answered)
+        self.pending = [row_key for row_key in self.pending if row_key not in answered]
+
+    def finish(self) -> Tuple[pl.DataFrame, Dict[str, int]]:
+        df_labels = pl.concat([empty_labels_frame(), *self.frames])
+        log_title_enrichment_quality(
+            df_labels,
+            original_titles=set(self.df_pending.get_column("title").to_list()),
+        )
+
+        return df_labels, summarize_recovery(
+            self.batch_name,
+            self.df_pending.height,
+            self.first_pass,
+            len(self.pending),
+            self.first_pass_seconds,
+            self.truncated,
+        )
+
+
+def request_sub_batch(
+    df_sub: pl.DataFrame,
+    batch_name: str,
+    round_index: int,
+    model_client: LLMClient,
+    prompt_type: str,
+    prompt_version: str,
+    config: Dict[str, Any],
+    metrics: Optional[Any] = None,
+) -> pl.DataFrame:
+    """
+    Request labels for one sub-batch, returning the valid rows of the
+    response. A failed request is logged and yields an empty frame, leaving
+    its titles to the next recovery round.
+    """
+    response_format = get_response_format(prompt_type, prompt_version)
+    prompt_caching = config.get("prompt_cache", {}).get("enabled", False)
+    output_mode = config.get("output_mode", "csv")
+    schema = response_schema(response_format) if output_mode == "json" else None
+    streaming = config.get("streaming", False) and output_mode == "csv"
+
+    prompt, cacheable_prefix = build_request_prompt(
+        df_sub, prompt_type, prompt_version, prompt_caching, output_mode
     )
+    pop_call_info()
+    call_started = time.time()
+    try:
+        if streaming:
+            df_rows = stream_response_rows(
+                model_client,
+                prompt,
+                df_sub,
+                response_format,
+                cacheable_prefix=cacheable_prefix,
+            )
+        else:
+            try:
+                response = model_client.process(
+                    prompt=prompt, schema=schema, cacheable_prefix=cacheable_prefix
+                )
+                truncated = False
+            except TruncatedResponseError as e:
+                logger.warning(f"{str(e)}, keeping the complete rows received")
+                response, truncated = e.text, True
+            df_rows = salvage_response_rows(
+                response, df_sub, response_format, output_mode, truncated
+            )
+    except Exception as e:
+        logger.warning(
+            f"Batch {batch_name}: request for {df_sub.height} titles "
+            f"failed: {str(e)}"
+        )
+        if metrics is not None:
+            metrics.record_call(
+                batch_name,
+                round_index,
+                call_started,
+                df_sub.height,
+                0,
+                error=type(e).__name__,
+                call_info=pop_call_info(),
+            )
+        return empty_labels_frame()
 
-    enriched_df = enriched_df.with_columns(
-        [pl.col("title").map_elements(normalize_title).alias("title")]
+    call_info = pop_call_info()
+    if metrics is not None:
+        metrics.record_call(
+            batch_name,
+            round_index,
+            call_started,
+            df_sub.height,
+            df_rows.height,
+            call_info=call_info,
+        )
+    log_token_prediction(
+        df_sub,
+        (cacheable_prefix or "") + prompt,
+        call_info,
+        config.get("token_estimation", {}),
+        response_format,
     )
+    return df_rows
 
-    return batch_df.join(enriched_df, on="title", how="left")
+
+def request_labels_with_recovery(
+    df_pending: pl.DataFrame,
+    batch_name: str,
+    model_client: LLMClient,
+    prompt_type: str,
+    prompt_version: str,
+    config: Dict[str, Any],
+    max_recovery_rounds: int = 2,
+    recovery_split: int = 4,
+    metrics: Optional[Any] = None,
+) -> tuple[pl.DataFrame, Dict[str, int]]:
+    """
+    Request labels for the ``df_pending`` rows (row_key, title) one request
+    at a time, keeping whatever each response got right and re-submitting
+    only the rows still missing (see ``RecoveryPlanner``). Each request is
+    recorded in ``metrics`` when given.
+    """
+    planner = RecoveryPlanner(
+        df_pending, batch_name, max_recovery_rounds, recovery_split
+    )
+    while (sub_batches := planner.next_round()) is not None:
+        planner.record_round(
+            [
+                request_sub_batch(
+                    df_sub,
+                    batch_name,
+                    planner.round_index,
+                    model_client,
+                    prompt_type,
+                    prompt_version,
+                    config,
+                    metrics,
+                )
+                for df_sub in sub_batches
+            ]
+        )
+
+    return planner.finish()
+
+
+def enrich_batch_from_labels(
+    df_labels: pl.DataFrame, df_batch: pl.DataFrame
+) -> pl.DataFrame:
+    """Attach labels to the keyed batch rows with an integer join on row_key."""
+    if df_labels.is_empty():
+        raise ValueError("No enriched titles found in the response")
+
+    return df_batch.join(
+        df_labels.select(["row_key", *LABEL_COLUMNS]), on="row_key", how="left"
+    ).drop("row_key")
+
+
+def save_enriched_batch(
+    df_enriched: pl.DataFrame,
+    bucket_name: str,
+    output_prefix: str,
+    timestamp: str,
+    batch_name: str,
+) -> str:
+    output_path = f"{output_prefix}/{timestamp}/{batch_name}.parquet"
+
+    blob_path = f"gs://{bucket_name}/{output_path}"
+    upload_dataframe_as_parquet(df_enriched, blob_path)
+
+    logger.info(f"Saved {df_enriched.height} enriched titles to: {output_path}")
+    return blob_path
 
 
 def process_batch_from_gcs(
-    batch_path: str,
+    batch_path: Union[str, int],
     prompt_type: str,
     prompt_version: str,
     timestamp: Optional[str] = None,
     output_prefix: str = "enriched",
     config: Optional[Dict[str, Any]] = None,
+    response_cache: Optional[Any] = None,
+    max_recovery_rounds: int = 2,
+    recovery_split: int = 4,
+    stats_store: Optional[Any] = None,
+    metrics: Optional[Any] = None,
+    manifest_uri: Optional[str] = None,
 ) -> str:
     logger.info(f"Processing batch: {batch_path}")
 
     timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
     config = config or {}
-    model_client = GeminiClient(config)
+    model_client = create_enrichment_client(config)
 
     try:
-        bucket_name, blob_path = batch_path.replace("gs://", "").split("/", 1)
-        storage_client = storage.Client()
-        blob = storage_client.bucket(bucket_name).blob(blob_path)
+        bucket_name = split_gcs_uri(manifest_uri or batch_path)[0]
+        df_batch, batch_name = read_batch(batch_path, manifest_uri)
+        df_batch = with_row_keys(df_batch)
 
-        batch_content = blob.download_as_bytes()
-        df_batch = pl.read_parquet(io.BytesIO(batch_content))
-
-        titles = df_batch.get_column("title").to_list()
-        logger.info(f"Sending {len(titles)} titles to Gemini")
-
-        prompt = load_prompt_with_params(
-            prompt_type=prompt_type,
-            version=prompt_version,
-            params={"job_titles": "\n".join(titles)},
-        )
-
-        if not prompt:
-            raise ValueError(
-                f"Failed to load or format prompt {prompt_type} v{prompt_version}"
+        frames = []
+        df_missing = df_batch
+        if response_cache is not None:
+            namespace = build_response_cache_namespace(
+                model_client, prompt_type, prompt_version
+            )
+            df_cached = lookup_cached_labels(df_batch, response_cache, namespace)
+            frames.append(df_cached)
+            df_missing = df_batch.filter(
+                ~pl.col("title").is_in(df_cached.get_column("title").implode())
             )
 
-        response = model_client.process(prompt=prompt)
-        df_response = parse_llm_csv_response(
-            response,
-            expected_columns=["title", "seniority_level", "department", "function"],
-        )
-
-        log_title_enrichment_quality(df_response, original_titles=set(titles))
-
-        df_enriched = match_titles_with_ids(df_response, df_batch)
+        if not df_missing.is_empty():
+            logger.info(f"Sending {df_missing.height} titles to Gemini")
 
-        if df_enriched.is_empty():
-            raise ValueError("No enriched titles found in the response")
+            df_labels, stats = request_labels_with_recovery(
+                df_missing.select(["row_key", "title"]),
+                batch_name,
+                model_client,
+                prompt_type,
+                prompt_version,
+                config,
+                max_recovery_rounds=max_recovery_rounds,
+                recovery_split=recovery_split,
+                metrics=metrics,
+            )
+            frames.append(df_labels)
 
-        base_filename = os.path.basename(blob_path).split(".")[0]
-        output_path = f"{output_prefix}/{timestamp}/{base_filename}.parquet"
+            if response_cache is not None:
+                store_labels_in_cache(df_labels, response_cache, namespace)
+            if stats_store is not None:
+                stats_store.record(
+                    timestamp, batch_name, {**stats, "batch_size": df_batch.height}
+                )
+            if metrics is not None:
+                metrics.write_batch(batch_name)
 
-        blob_path  = f"gs://{bucket_name}/{output_path}"
-        upload_dataframe_as_parquet(df_enriched, blob_path)
+        df_enriched = enrich_batch_from_labels(pl.concat(frames), df_batch)
 
-        logger.info(f"Saved {df_enriched.height} enriched titles to: {output_path}")
-        return blob_path
+        return save_enriched_batch(
+            df_enriched, bucket_name, output_prefix, timestamp, batch_name
+        )
 
     except Exception as e:
         logger.error(f"Error processing batch {batch_path}: {str(e)}", exc_info=True)
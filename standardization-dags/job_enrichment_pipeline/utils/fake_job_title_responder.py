@@ -0,0 +1,58 @@
+import csv
+import io
+import re
+import zlib
+
+from job_enrichment_pipeline.schema.taxonomy import (
+    DEPARTMENTS,
+    FUNCTIONS,
+    SENIORITY_LEVELS,
+)
+
+_TITLES_HEADER = re.compile(r"job titles:\n", re.IGNORECASE)
+_CODED_LINE = re.compile(r"^(\d+),(.*)$")
+
+
+def fake_job_title_response(prompt: str) -> str:
+    """
+    Well-formed answer to a job title prompt, for the fake LLM backend. Labels
+    are picked from the taxonomy by a hash of the title, so the same title
+    always gets the same labels. Handles both the echoed-title (v1) and the
+    coded (v2) response formats.
+    """
+    # Titles run from the header to the first blank line; anything after it
+    # (e.g. the JSON output note) is instructions.
+    titles_block = _TITLES_HEADER.split(prompt)[-1].split("\n\n")[0]
+    lines = [line for line in titles_block.splitlines() if line.strip()]
+    coded = bool(lines) and all(_CODED_LINE.match(line) for line in lines)
+
+    seniority_codes = list(SENIORITY_LEVELS)
+    function_codes = list(FUNCTIONS)
+
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    if coded:
+        writer.writerow(["row_index", "seniority_code", "function_code"])
+    else:
+        writer.writerow(["title", "seniority_level", "department", "function"])
+
+    for line in lines:
+        row_index, title = _CODED_LINE.match(line).groups() if coded else (None, line)
+        digest = zlib.crc32(title.encode("utf-8"))
+        seniority_code = seniority_codes[digest % len(seniority_codes)]
+        function_code = function_codes[(digest >> 8) % len(function_codes)]
+
+        if coded:
+            writer.writerow([row_index, seniority_code, function_code])
+        else:
+            department_code, function = FUNCTIONS[function_code]
+            writer.writerow(
+                [
+                    title,
+                    SENIORITY_LEVELS[seniority_code],
+                    DEPARTMENTS[department_code],
+                    function,
+                ]
+            )
+
+    return output.getvalue()
@@ -2,31 +2,54 @@ import io
 import logging
 import polars as pl
 from google.cloud import storage
-import psycopg2
-from psycopg2.extras import execute_values
+from lib.resources.registry import get_gcs_client, pg_connection
+from typing import Optional
+from lib.enrichment_pipeline_helpers.fuzzy_index import FuzzyTitleIndex
+from lib.enrichment_pipeline_helpers.bulk_update import chunked_bulk_update
+from lib.enrichment_pipeline_helpers.gcs_utils import download_parquet_as_dataframe
+from lib.enrichment_pipeline_helpers.mapping_snapshot import MappingSnapshot
+from lib.enrichment_pipeline_helpers.postgres_utils import (
+    copy_dataframe_to_table,
+    copy_query_to_dataframe,
+)
+from job_enrichment_pipeline.utils.normalize_utils import (
+    canonical_title_expr,
+    title_level_expr,
+)
 
 logger = logging.getLogger("utils.link_pre_enrich")
 
 
-def link_pre_enriched_titles(input_path: str, db_uri: str) -> str:
+def link_pre_enriched_titles(
+    input_path: str,
+    db_uri: str,
+    mapping_snapshot: Optional[MappingSnapshot] = None,
+    chunk_size: int = 5000,
+    fuzzy_threshold: Optional[float] = None,
+    fuzzy_index_uri: Optional[str] = None,
+    fuzzy_evaluation_sample: int = 0,
+) -> str:
     logger.info(f"Linking pre-enriched titles from: {input_path}")
 
     try:
-        storage_client = storage.Client()
-        bucket_name, blob_path = input_path.replace("gs://", "").split("/", 1)
-
-        buf = io.BytesIO()
-        storage_client.bucket(bucket_name).blob(blob_path).download_to_file(buf)
-        buf.seek(0)
-        df = pl.read_parquet(buf)
+        storage_client = get_gcs_client()
+        df = download_parquet_as_dataframe(input_path)
 
         if df.is_empty():
             logger.warning("No titles to link.")
             return input_path
 
-        query = "SELECT job_title, standardized_job_id FROM standardized_job_mappings"
-        mapping_df = pl.read_database_uri(query=query, uri=db_uri)
-        logger.info(f"Fetched {len(mapping_df)} existing title mappings from DB")
+        if mapping_snapshot:
+            mapping_df = mapping_snapshot.refresh().select(
+                ["job_title", "standardized_job_id"]
+            )
+            logger.info(f"Loaded {len(mapping_df)} title mappings from snapshot")
+        else:
+            query = (
+                "SELECT job_title, standardized_job_id FROM standardized_job_mappings"
+            )
+            mapping_df = pl.read_database_uri(query=query, uri=db_uri)
+            logger.info(f"Fetched {len(mapping_df)} existing title mappings from DB")
 
         matched_df = df.join(
             mapping_df, left_on="title", right_on="job_title", how="inner"
@@ -37,7 +60,16 @@ def link_pre_enriched_titles(input_path: str, db_uri: str) -> str:
 
         logger.info(f"Matched {matched_df.height} out of {df.height} total titles")
 
-        update_matched_titles(matched_df, db_uri)
+        update_matched_titles(matched_df, db_uri, chunk_size=chunk_size)
+
+        if fuzzy_threshold is not None:
+            fuzzy_index = load_or_build_fuzzy_index(
+                fuzzy_index_uri, mapping_df, fuzzy_evaluation_sample, fuzzy_threshold
+            )
+            unmatched_df = link_fuzzy_matches(
+                unmatched_df, fuzzy_index, fuzzy_threshold, db_uri, chunk_size
+            )
+
         return save_unmatched_titles(unmatched_df, input_path, storage_client)
 
     except Exception as e:
@@ -45,35 +77,202 @@ def link_pre_enriched_titles(input_path: str, db_uri: str) -> str:
         raise
 
 
-def update_matched_titles(matched_df: pl.DataFrame, db_uri: str) -> None:
-    logger.info("Updating matched titles in DB")
+def link_pre_enriched_titles_in_database(
+    input_path: str,
+    db_uri: str,
+    chunk_size: int = 5000,
+    fuzzy_threshold: Optional[float] = None,
+    fuzzy_index_uri: Optional[str] = None,
+) -> str:
+    """
+    Match titles inside Postgres: COPY the extracted (id, title) pairs into a
+    temp table, apply every match with one UPDATE ... FROM, and only bring
+    back the titles that have no mapping yet.
+    """
+    logger.info(f"Linking pre-enriched titles in the database from: {input_path}")
 
-    if matched_df.is_empty():
-        logger.info("No matched titles to update.")
-        return
+    try:
+        storage_client = get_gcs_client()
+        df = download_parquet_as_dataframe(input_path)
 
-    update_data = [
-        (row["standardized_job_id"], row["id"]) for row in matched_df.to_dicts()
-    ]
+        if df.is_empty():
+            logger.warning("No titles to link.")
+            return input_path
 
-    logger.info(f"Updating {len(update_data)} member_experience rows directly")
-    logger.debug(f"Sample ids of updated rows: {update_data[0:10]}")
+        stage_df = df.select(["id", "title"])
+        if stage_df.schema["id"] == pl.List:
+            stage_df = stage_df.explode("id")
 
-    try:
-        with psycopg2.connect(db_uri) as conn:
+        with pg_connection(db_uri) as conn:
             with conn.cursor() as cursor:
-                execute_values(
+                cursor.execute("""
+                    CREATE TEMP TABLE link_titles_stage (id bigint, title text)
+                    ON COMMIT DROP
+                    """)
+                copy_dataframe_to_table(cursor, stage_df, "link_titles_stage")
+                cursor.execute("ANALYZE link_titles_stage")
+
+                cursor.execute("""
+                    UPDATE member_experience
+                    SET standardized_job_id = m.standardized_job_id
+                    FROM link_titles_stage s
+                    JOIN standardized_job_mappings m ON m.job_title = s.title
+                    WHERE member_experience.id = s.id
+                    """)
+                updated = cursor.rowcount
+
+                unmatched_titles = copy_query_to_dataframe(
                     cursor,
                     """
-                    UPDATE member_experience
-                    SET standardized_job_id = data.standardized_job_id
-                    FROM (VALUES %s) AS data(standardized_job_id, id)
-                    WHERE member_experience.id = data.id
+                    SELECT DISTINCT s.title
+                    FROM link_titles_stage s
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM standardized_job_mappings m
+                        WHERE m.job_title = s.title
+                    )
                     """,
-                    update_data,
-                    template="(%s, %s)",
+                    schema_overrides={"title": pl.String},
                 )
                 conn.commit()
+
+        logger.info(
+            f"Updated {updated} of {stage_df.height} member_experience rows in the database"
+        )
+
+        unmatched_df = df.join(unmatched_titles, on="title", how="semi")
+        logger.info(f"{unmatched_df.height} titles left for enrichment")
+
+        if fuzzy_threshold is not None:
+            fuzzy_index = (
+                FuzzyTitleIndex.load(fuzzy_index_uri) if fuzzy_index_uri else None
+            )
+            if fuzzy_index is None:
+                logger.warning(
+                    "Fuzzy linking is enabled but no saved index was found, skipping it"
+                )
+            else:
+                unmatched_df = link_fuzzy_matches(
+                    unmatched_df, fuzzy_index, fuzzy_threshold, db_uri, chunk_size
+                )
+
+        return save_unmatched_titles(unmatched_df, input_path, storage_client)
+
+    except Exception as e:
+        logger.error(
+            f"Error linking pre-enriched titles in database: {e}", exc_info=True
+        )
+        raise
+
+
+def load_or_build_fuzzy_index(
+    index_uri: Optional[str],
+    mapping_df: pl.DataFrame,
+    evaluation_sample: int = 0,
+    threshold: float = 0.85,
+) -> FuzzyTitleIndex:
+    labelled = mapping_df.with_columns(
+        canonical_title_expr(pl.col("job_title")).alias("canonical_title")
+    ).with_columns(title_level_expr(pl.col("canonical_title")).alias("title_level"))
+    columns = {
+        "key_column": "canonical_title",
+        "value_column": "standardized_job_id",
+        "block_column": "title_level",
+    }
+
+    fuzzy_index = FuzzyTitleIndex.load(index_uri) if index_uri else None
+    if fuzzy_index is not None and "block" in fuzzy_index.entries.columns:
+        # Only titles mapped since the last run need signatures; the full
+        # build and its held-out evaluation run when there is no index yet.
+        if fuzzy_index.update(labelled, **columns) and index_uri:
+            fuzzy_index.save(index_uri)
+        return fuzzy_index
+
+    fuzzy_index = FuzzyTitleIndex.build(labelled, **columns)
+    if index_uri:
+        fuzzy_index.save(index_uri)
+
+    if evaluation_sample:
+        # Evaluate on titles held out of a second index, as unmatched titles
+        # are never in the mapping table the production index is built from.
+        held_out = labelled.sample(min(evaluation_sample, labelled.height), seed=0)
+        FuzzyTitleIndex.build(
+            labelled.join(held_out, on="job_title", how="anti"), **columns
+        ).evaluate(held_out, threshold=threshold, **columns)
+
+    return fuzzy_index
+
+
+def link_fuzzy_matches(
+    unmatched_df: pl.DataFrame,
+    fuzzy_index: FuzzyTitleIndex,
+    threshold: float,
+    db_uri: str,
+    chunk_size: int = 5000,
+) -> pl.DataFrame:
+    if unmatched_df.is_empty():
+        return unmatched_df
+
+    keyed = unmatched_df.with_columns(
+        canonical_title_expr(pl.col("title")).alias("canonical_title")
+    )
+    links = fuzzy_index.query(
+        keyed.get_column("canonical_title"),
+        threshold=threshold,
+        blocks=keyed.select(title_level_expr(pl.col("canonical_title"))).to_series(),
+    ).select(
+        [
+            pl.col("key").alias("canonical_title"),
+            pl.col("value").alias("standardized_job_id"),
+            "similarity",
+        ]
+    )
+
+    fuzzy_matched = keyed.join(links, on="canonical_title", how="inner")
+    residual = keyed.join(links, on="canonical_title", how="anti").drop(
+        "canonical_title"
+    )
+
+    hit_rate = fuzzy_matched.height / keyed.height
+    logger.info(
+        f"Fuzzy linked {fuzzy_matched.height} of {keyed.height} unmatched titles "
+        f"(hit rate {hit_rate:.1%}, threshold {threshold})"
+    )
+    if not fuzzy_matched.is_empty():
+        logger.debug(
+            "Sample fuzzy links:\n"
+            f"{fuzzy_matched.select(['title', 'canonical_title', 'similarity']).head(10)}"
+        )
+
+    update_matched_titles(fuzzy_matched, db_uri, chunk_size=chunk_size)
+    return residual
+
+
+def update_matched_titles(
+    matched_df: pl.DataFrame, db_uri: str, chunk_size: int = 5000
+) -> None:
+    logger.info("Updating matched titles in DB")
+
+    if matched_df.is_empty():
+        logger.info("No matched titles to update.")
+        return
+
+    update_df = matched_df.select(["id", "standardized_job_id"])
+    if update_df.schema["id"] == pl.List:
+        update_df = update_df.explode("id")
+
+    logger.info(f"Updating {update_df.height} member_experience rows directly")
+    logger.debug(f"Sample ids of updated rows: {update_df.head(10).rows()}")
+
+    try:
+        with pg_connection(db_uri) as conn:
+            chunked_bulk_update(
+                conn,
+                update_df,
+                target_table="member_experience",
+                key_column="id",
+                set_clause="standardized_job_id = s.standardized_job_id",
+                chunk_size=chunk_size,
+            )
     except Exception as e:
         logger.error(f"Error while updating matched titles: {e}", exc_info=True)
         raise
@@ -90,6 +289,8 @@ def save_unmatched_titles(
             return original_path
 
         output_path = original_path.replace("titles/", "titles_to_enrich/")
+        if output_path.endswith("/"):
+            output_path = f"{output_path.rstrip('/')}.parquet"
         output_buf = io.BytesIO()
         unmatched_df.write_parquet(output_buf)
         output_buf.seek(0)
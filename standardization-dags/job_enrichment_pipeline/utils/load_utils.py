@@ -1,68 +1,92 @@
-import os
-import io
 import logging
-import psycopg2
-from datetime import datetime
-from typing import List, Dict, Tuple, Any
+from typing import Any, Dict, List, Tuple
 import polars as pl
 from psycopg2.extras import execute_values
+from lib.resources.registry import pg_connection
+from lib.enrichment_pipeline_helpers.bulk_update import chunked_bulk_update
 from lib.enrichment_pipeline_helpers.gcs_utils import download_parquet_as_dataframe
+from lib.enrichment_pipeline_helpers.postgres_utils import copy_dataframe_to_table
 
 logger = logging.getLogger("enrichment_loader")
 
+JOB_KEY_COLUMNS = ["department", "function", "seniority_level"]
 
-def gather_valid_rows(enriched_paths: List[str]) -> List[Dict[str, Any]]:
+
+def _log_summary(stats: Dict[str, Any]) -> Dict[str, Any]:
+    return {**stats, "unloaded_ids": len(stats.get("unloaded_ids", []))}
+
+
+def read_valid_rows(path: str) -> Tuple[pl.DataFrame, List[int]]:
+    """
+    Rows of ``path`` with every label present, and the member ids of the rows
+    left out (titles the enrichment could not label).
+    """
+    logger.info(f"Reading file: {path}")
+    df = download_parquet_as_dataframe(path).filter(pl.col("id").is_not_null())
+    is_valid = pl.all_horizontal(
+        [
+            pl.col("title").is_not_null(),
+            pl.col("department").is_not_null(),
+            pl.col("function").is_not_null(),
+            pl.col("seniority_level").is_not_null(),
+        ]
+    )
+
+    valid = df.filter(is_valid)
+    unloaded = df.filter(~is_valid).select("id")
+    if unloaded.schema["id"] == pl.List:
+        unloaded = unloaded.explode("id")
+    unloaded_ids = unloaded.get_column("id").drop_nulls().to_list()
+
+    logger.info(
+        f"Valid rows in {path}: {valid.height}, unlabelled ids: {len(unloaded_ids)}"
+    )
+    return valid.select(["id", "title"] + JOB_KEY_COLUMNS), unloaded_ids
+
+
+def gather_valid_rows(
+    enriched_paths: List[str],
+) -> Tuple[pl.DataFrame, List[int]]:
     logger.info(f"Gathering valid rows from {len(enriched_paths)} enriched file(s)")
-    rows = []
+    frames = []
+    unloaded_ids = []
 
     try:
         for path in enriched_paths:
-            logger.info(f"Reading file: {path}")
-            df = download_parquet_as_dataframe(path).filter(
-                pl.all_horizontal(
-                    [
-                        pl.col("title").is_not_null(),
-                        pl.col("department").is_not_null(),
-                        pl.col("function").is_not_null(),
-                        pl.col("seniority_level").is_not_null(),
-                        pl.col("id").is_not_null(),
-                    ]
-                )
-            )
-
-            logger.info(f"Valid rows in {path}: {df.height}")
-            rows.extend(df.to_dicts())
+            valid, path_unloaded_ids = read_valid_rows(path)
+            frames.append(valid)
+            unloaded_ids.extend(path_unloaded_ids)
 
-        logger.info(f"Total valid rows gathered: {len(rows)}")
-        return rows
+        rows = pl.concat(frames, how="vertical_relaxed") if frames else pl.DataFrame()
+        logger.info(f"Total valid rows gathered: {rows.height}")
+        return rows, sorted(set(unloaded_ids))
 
     except Exception as e:
         logger.error(f"Failed to gather valid rows: {e}", exc_info=True)
         raise
 
 
-def load_enriched_to_postgres(enriched_paths: List[str], db_uri: str) -> None:
+def load_enriched_to_postgres(
+    enriched_paths: List[str], db_uri: str, chunk_size: int = 5000
+) -> Dict[str, Any]:
+    """
+    Load the labelled rows and return load stats, including
+    ``unloaded_ids``: the member ids left unlabelled.
+    """
     logger.info("Starting load of enriched data to PostgreSQL")
 
-    job_set = set()
-    mapping_list = []
-    update_list = []
     stats = {"jobs": 0, "mappings": 0, "member_updates": 0}
 
     try:
-        with psycopg2.connect(db_uri) as conn:
-            with conn.cursor() as cursor:
-                enriched_rows = gather_valid_rows(enriched_paths)
+        enriched, stats["unloaded_ids"] = gather_valid_rows(enriched_paths)
+        if enriched.is_empty():
+            logger.warning("No valid enriched rows to load.")
+            return stats
 
-                for row in enriched_rows:
-                    job_key = (
-                        row["department"],
-                        row["function"],
-                        row["seniority_level"],
-                    )
-                    job_set.add(job_key)
-
-                logger.info(f"Inserting {len(job_set)} unique standardized job(s)")
+        with pg_connection(db_uri) as conn:
+            with conn.cursor() as cursor:
+                jobs = enriched.select(JOB_KEY_COLUMNS).unique()
+                logger.info(f"Inserting {jobs.height} unique standardized job(s)")
 
                 execute_values(
                     cursor,
@@ -71,7 +95,7 @@ def load_enriched_to_postgres(enriched_paths: List[str], db_uri: str) -> None:
                     VALUES %s
                     ON CONFLICT (department, function, seniority) DO NOTHING
                     """,
-                    list(job_set),
+                    jobs.rows(),
                 )
                 cursor.execute(
                     """
@@ -79,41 +103,41 @@ def load_enriched_to_postgres(enriched_paths: List[str], db_uri: str) -> None:
                     FROM standardized_jobs
                     WHERE (department, function, seniority) IN %s
                     """,
-                    (tuple(job_set),),
+                    (tuple(jobs.rows()),),
                 )
 
-                job_map: Dict[Tuple[str, str, str], int] = {
-                    (dept, func, senior): job_id
-                    for job_id, dept, func, senior in cursor.fetchall()
-                }
+                job_map = pl.DataFrame(
+                    cursor.fetchall(),
+                    schema={
+                        "standardized_job_id": pl.Int64,
+                        "department": pl.String,
+                        "function": pl.String,
+                        "seniority_level": pl.String,
+                    },
+                    orient="row",
+                )
 
-                stats["jobs"] = len(job_map)
+                stats["jobs"] = job_map.height
 
                 logger.info(f"Fetched {stats['jobs']} job IDs")
 
-                for row in enriched_rows:
-                    job_key = (
-                        row["department"],
-                        row["function"],
-                        row["seniority_level"],
+                enriched = enriched.join(job_map, on=JOB_KEY_COLUMNS, how="left")
+                missing = enriched.filter(pl.col("standardized_job_id").is_null())
+                if not missing.is_empty():
+                    logger.warning(
+                        f"Missing job_id for {missing.height} row(s), sample: "
+                        f"{missing.head(5).rows()}"
                     )
-                    job_id = job_map.get(job_key)
-
-                    if not job_id:
-                        logger.warning(f"Missing job_id for row: {row}")
-                        continue
-
-                    mapping_list.append((row["title"], job_id))
-                    update_list.append(
-                        (
-                            job_id,
-                            datetime.utcnow(),
-                            row["id"][0] if isinstance(row["id"], list) else row["id"],
-                        )
+                    enriched = enriched.filter(
+                        pl.col("standardized_job_id").is_not_null()
                     )
 
-                if mapping_list:
-                    logger.info(f"Inserting {len(mapping_list)} job title mapping(s)")
+                mappings = enriched.select(["title", "standardized_job_id"]).unique(
+                    subset=["title"], keep="last", maintain_order=True
+                )
+
+                if not mappings.is_empty():
+                    logger.info(f"Inserting {mappings.height} job title mapping(s)")
 
                     execute_values(
                         cursor,
@@ -123,31 +147,152 @@ def load_enriched_to_postgres(enriched_paths: List[str], db_uri: str) -> None:
                         ON CONFLICT (job_title) DO UPDATE
                         SET standardized_job_id = EXCLUDED.standardized_job_id
                         """,
-                        mapping_list,
+                        mappings.rows(),
                     )
 
-                    stats["mappings"] = len(mapping_list)
+                    stats["mappings"] = mappings.height
 
-                if update_list:
-                    logger.info(f"Updating {len(update_list)} member_experience row(s)")
+                conn.commit()
 
-                    execute_values(
-                        cursor,
-                        """
-                        UPDATE member_experience
-                        SET standardized_job_id = data.standardized_job_id,
-                            last_standardized_at = data.updated_at,
-                            previous_title = title
-                        FROM (VALUES %s) AS data(standardized_job_id, updated_at, member_id)
-                        WHERE member_experience.id = data.member_id
-                        """,
-                        update_list,
-                    )
-                    stats["member_updates"] = len(update_list)
+            updates = enriched.select(["id", "standardized_job_id"])
+            if updates.schema["id"] == pl.List:
+                updates = updates.explode("id")
 
-                conn.commit()
-                logger.info(f"Load completed: {stats}")
+            if not updates.is_empty():
+                logger.info(f"Updating {updates.height} member_experience row(s)")
+
+                chunk_stats = chunked_bulk_update(
+                    conn,
+                    updates,
+                    target_table="member_experience",
+                    key_column="id",
+                    set_clause="""
+                        standardized_job_id = s.standardized_job_id,
+                        last_standardized_at = timezone('utc', now()),
+                        previous_title = member_experience.title
+                    """,
+                    chunk_size=chunk_size,
+                )
+                stats["member_updates"] = sum(chunk["rows"] for chunk in chunk_stats)
+
+            logger.info(f"Load completed: {_log_summary(stats)}")
+            return stats
 
     except Exception as e:
         logger.error(f"Load failed: {e}", exc_info=True)
         raise
+
+
+def load_enriched_via_staging(
+    enriched_paths: List[str],
+    db_uri: str,
+    stage_table: str = "enriched_load_stage",
+) -> Dict[str, Any]:
+    """
+    COPY each enriched file into a temp staging table, one file in memory at
+    a time, then apply the dimension insert, the mapping upsert and the
+    member_experience update as one set-based statement each, joined against
+    the staging table. The temp table is private to the connection, so
+    concurrent loads cannot collide on it, and is dropped at the end.
+    """
+    logger.info(f"Starting staged load of {len(enriched_paths)} enriched file(s)")
+
+    stats = {
+        "staged": 0,
+        "jobs": 0,
+        "mappings": 0,
+        "member_updates": 0,
+        "unloaded_ids": [],
+    }
+
+    try:
+        with pg_connection(db_uri) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {stage_table}")
+                cursor.execute(f"""
+                    CREATE TEMP TABLE {stage_table} (
+                        load_seq bigserial,
+                        id bigint,
+                        title text,
+                        department text,
+                        function text,
+                        seniority_level text
+                    )
+                    """)
+                conn.commit()
+
+                try:
+                    for path in enriched_paths:
+                        df, path_unloaded_ids = read_valid_rows(path)
+                        stats["unloaded_ids"].extend(path_unloaded_ids)
+                        if df.schema["id"] == pl.List:
+                            df = df.explode("id")
+                        stats["staged"] += copy_dataframe_to_table(
+                            cursor, df, stage_table
+                        )
+                    stats["unloaded_ids"] = sorted(set(stats["unloaded_ids"]))
+
+                    if not stats["staged"]:
+                        logger.warning("No valid enriched rows to load.")
+                        return stats
+
+                    cursor.execute(f"ANALYZE {stage_table}")
+                    logger.info(f"Staged {stats['staged']} row(s) in {stage_table}")
+
+                    cursor.execute(f"""
+                        INSERT INTO standardized_jobs (department, function, seniority)
+                        SELECT DISTINCT department, function, seniority_level
+                        FROM {stage_table}
+                        ON CONFLICT (department, function, seniority) DO NOTHING
+                        """)
+                    stats["jobs"] = cursor.rowcount
+
+                    # Later files win when a title was enriched more than once,
+                    # as in the row-based load.
+                    cursor.execute(f"""
+                        INSERT INTO standardized_job_mappings (job_title, standardized_job_id)
+                        SELECT DISTINCT ON (s.title) s.title, j.id
+                        FROM {stage_table} s
+                        JOIN standardized_jobs j
+                          ON j.department = s.department
+                         AND j.function = s.function
+                         AND j.seniority = s.seniority_level
+                        ORDER BY s.title, s.load_seq DESC
+                        ON CONFLICT (job_title) DO UPDATE
+                        SET standardized_job_id = EXCLUDED.standardized_job_id
+                        """)
+                    stats["mappings"] = cursor.rowcount
+                    conn.commit()
+
+                    # A member id staged more than once would make the UPDATE
+                    # pick an arbitrary row; keep the latest, as above.
+                    cursor.execute(f"""
+                        UPDATE member_experience
+                        SET standardized_job_id = u.standardized_job_id,
+                            last_standardized_at = timezone('utc', now()),
+                            previous_title = member_experience.title
+                        FROM (
+                            SELECT DISTINCT ON (s.id) s.id, j.id AS standardized_job_id
+                            FROM {stage_table} s
+                            JOIN standardized_jobs j
+                              ON j.department = s.department
+                             AND j.function = s.function
+                             AND j.seniority = s.seniority_level
+                            ORDER BY s.id, s.load_seq DESC
+                        ) u
+                        WHERE member_experience.id = u.id
+                        """)
+                    stats["member_updates"] = cursor.rowcount
+                    conn.commit()
+
+                finally:
+                    conn.rollback()
+                    cursor.execute(f"DROP TABLE IF EXISTS {stage_table}")
+                    conn.commit()
+
+        logger.info(f"Staged load completed: {_log_summary(stats)}")
+        return stats
+
+    except Exception as e:
+        logger.error(f"Staged load failed: {e}", exc_info=True)
+        raise
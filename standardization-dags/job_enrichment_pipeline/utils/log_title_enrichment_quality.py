@@ -4,6 +4,7 @@ from typing import Optional
 from lib.enrichment_pipeline_helpers.log_enrichment_quality import (
     log_enrichment_quality,
 )
+from job_enrichment_pipeline.schema.taxonomy import ALLOWED_LABELS
 
 logger = logging.getLogger("enrichment_quality")
 
@@ -11,6 +12,14 @@ logger = logging.getLogger("enrichment_quality")
 def log_title_enrichment_quality(
     df: pl.DataFrame, original_titles: Optional[set[str]] = None, sample_limit: int = 5
 ):
+    for column, allowed in ALLOWED_LABELS.items():
+        if column in df.columns:
+            invalid = df.filter(
+                pl.col(column).is_not_null() & ~pl.col(column).is_in(allowed)
+            ).height
+            if invalid:
+                logger.warning(f"Values outside taxonomy in '{column}': {invalid}")
+
     return log_enrichment_quality(
         df,
         expected_columns=["title", "department", "function", "seniority_level"],
@@ -1,4 +1,9 @@
 import re
+import polars as pl
+
+# Python's str-pattern ``\s`` also treats the ASCII separators \x1c-\x1f as
+# whitespace, while the Rust regex engine behind polars does not.
+_WHITESPACE_RUN = r"[\s\x1c-\x1f]+"
 
 
 def normalize_title(title: str) -> str:
@@ -6,3 +11,86 @@ def normalize_title(title: str) -> str:
     title = title.replace(",", "")
     title = re.sub(r"\s+", " ", title)
     return title.strip("\"'").strip().lower()
+
+
+def normalize_title_expr(expr: pl.Expr) -> pl.Expr:
+    """
+    Vectorized equivalent of ``normalize_title`` for use in polars queries.
+    Polars lowercases with its own Unicode tables, so letters newer than
+    Python's ``unicodedata`` (e.g. U+1C89) are lowercased here but left as is
+    by ``normalize_title``; every code point Python knows maps the same way.
+    """
+    return (
+        expr.str.replace_all(r"[\n\r\t]", " ")
+        .str.replace_all(",", "", literal=True)
+        .str.replace_all(_WHITESPACE_RUN, " ")
+        .str.strip_chars("\"'")
+        .str.strip_chars()
+        .str.to_lowercase()
+    )
+
+
+def normalize_title_sql(column: str = "title") -> str:
+    """Postgres expression mirroring ``normalize_title`` for database-side grouping."""
+    return (
+        "lower(btrim(btrim(regexp_replace(replace(regexp_replace("
+        f"{column}, '[\\n\\r\\t]', ' ', 'g'), ',', ''), '\\s+', ' ', 'g'), "
+        "'\"'''), ' '))"
+    )
+
+
+# Only abbreviations that stand for a single word in job titles. Ones that can
+# swap the role (tech: technician/technology, dev: developer/development, eng:
+# engineer/engineering, admin, acct: accountant/account) stay as written so
+# canonical keys never merge different titles.
+TITLE_ABBREVIATIONS = {
+    "sr": "senior",
+    "snr": "senior",
+    "jr": "junior",
+    "jnr": "junior",
+    "mgr": "manager",
+    "mngr": "manager",
+    "engr": "engineer",
+    "asst": "assistant",
+    "assoc": "associate",
+    "exec": "executive",
+    "dir": "director",
+    "mktg": "marketing",
+    "ops": "operations",
+    "coord": "coordinator",
+    "spec": "specialist",
+}
+
+
+def canonical_title_expr(expr: pl.Expr) -> pl.Expr:
+    """
+    Order-insensitive key for fuzzy matching a normalized title: punctuation
+    dropped, common abbreviations expanded, tokens de-duplicated and sorted.
+    """
+    return (
+        expr.str.replace_all(r"[^\w\s]", " ")
+        .str.split(" ")
+        .list.eval(
+            pl.element()
+            .filter(pl.element() != "")
+            .replace(TITLE_ABBREVIATIONS)
+            .unique()
+            .sort()
+        )
+        .list.join(" ")
+    )
+
+
+# Tokens that set the level of a title within its role. Titles that differ
+# only in these ("software engineer i" / "software engineer ii") are close in
+# trigram similarity but are different jobs.
+_LEVEL_TOKEN = r"^(?:\d+|[ivx]+|senior|sr|snr|junior|jr|jnr|lead|principal|staff|head)$"
+
+
+def title_level_expr(canonical: pl.Expr) -> pl.Expr:
+    """Sorted level tokens of a ``canonical_title_expr`` key, "" when there are none."""
+    return (
+        canonical.str.split(" ")
+        .list.eval(pl.element().filter(pl.element().str.contains(_LEVEL_TOKEN)))
+        .list.join(" ")
+    )
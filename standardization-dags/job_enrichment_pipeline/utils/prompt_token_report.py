@@ -0,0 +1,138 @@
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import polars as pl
+
+from lib.enrichment_pipeline_helpers.token_estimation import estimate_text_tokens
+from job_enrichment_pipeline.schema.taxonomy import (
+    DEPARTMENTS,
+    FUNCTIONS,
+    SENIORITY_LEVELS,
+)
+from job_enrichment_pipeline.utils.enrich_utils_csv import (
+    RESPONSE_COLUMNS,
+    build_batch_prompt,
+    build_request_prompt,
+    get_response_format,
+    response_schema,
+    salvage_response_rows,
+    with_row_keys,
+)
+
+logger = logging.getLogger("prompt_token_report")
+
+
+def build_reference_response(
+    titles: List[str], response_format: str, output_mode: str = "csv"
+) -> str:
+    """Well-formed answer for ``titles`` in the given format, for token counts."""
+    seniority_code, seniority_level = next(iter(SENIORITY_LEVELS.items()))
+    function_code, (department_code, function) = max(
+        FUNCTIONS.items(), key=lambda item: len(item[1][1])
+    )
+
+    if response_format == "coded":
+        rows = [
+            (row_index, seniority_code, function_code)
+            for row_index in range(len(titles))
+        ]
+    else:
+        department = DEPARTMENTS[department_code]
+        rows = [(title, seniority_level, department, function) for title in titles]
+
+    if output_mode == "json":
+        return json.dumps(
+            [dict(zip(RESPONSE_COLUMNS[response_format], row)) for row in rows]
+        )
+
+    rows = [",".join(str(value) for value in row) for row in rows]
+    return "\n".join([",".join(RESPONSE_COLUMNS[response_format]), *rows])
+
+
+def compare_prompt_tokens(
+    titles: List[str],
+    prompt_type: str,
+    versions: List[str],
+    count_tokens: Optional[Callable[[str], int]] = None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Input and output tokens per title for each prompt version on the same
+    titles. ``count_tokens`` defaults to the character-based estimate; pass
+    the model's token counter for exact numbers.
+    """
+    count_tokens = count_tokens or estimate_text_tokens
+    report = {}
+
+    for version in versions:
+        response_format = get_response_format(prompt_type, version)
+        input_tokens = count_tokens(build_batch_prompt(titles, prompt_type, version))
+        output_tokens = count_tokens(build_reference_response(titles, response_format))
+
+        report[version] = {
+            "input_tokens_per_title": input_tokens / len(titles),
+            "output_tokens_per_title": output_tokens / len(titles),
+        }
+        logger.info(
+            f"Prompt {version} ({response_format}): "
+            f"{report[version]['input_tokens_per_title']:.1f} input and "
+            f"{report[version]['output_tokens_per_title']:.1f} output tokens per title"
+        )
+
+    return report
+
+
+def compare_output_modes(
+    titles: List[str],
+    prompt_type: str,
+    version: str,
+    modes: List[str] = ("csv", "json"),
+    model_client: Optional[Any] = None,
+    count_tokens: Optional[Callable[[str], int]] = None,
+    repeats: int = 5,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Parse time, drop rate and output tokens per title for each output mode on
+    the same titles. Without ``model_client`` the reference response is
+    parsed (drop rate 0, estimated tokens); with one, each mode is requested
+    once and its actual answer and usage are measured.
+    """
+    count_tokens = count_tokens or estimate_text_tokens
+    response_format = get_response_format(prompt_type, version)
+    df_sub = with_row_keys(pl.DataFrame({"title": titles}, schema={"title": pl.Utf8}))
+    report = {}
+
+    for mode in modes:
+        if model_client is None:
+            response = build_reference_response(titles, response_format, mode)
+            output_tokens = count_tokens(response)
+        else:
+            prompt, _ = build_request_prompt(
+                df_sub, prompt_type, version, output_mode=mode
+            )
+            response = model_client.process(
+                prompt=prompt,
+                schema=response_schema(response_format) if mode == "json" else None,
+            )
+            usage = model_client.last_usage_metadata
+            output_tokens = getattr(usage, "candidates_token_count", None)
+            output_tokens = output_tokens or count_tokens(response)
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            df_rows = salvage_response_rows(response, df_sub, response_format, mode)
+        parse_ms = (time.perf_counter() - started) * 1000 / repeats
+
+        report[mode] = {
+            "parse_ms": parse_ms,
+            "drop_rate": 1 - df_rows.height / len(titles),
+            "output_tokens_per_title": output_tokens / len(titles),
+        }
+        logger.info(
+            f"Output mode {mode} ({response_format}): parsed in {parse_ms:.1f}ms, "
+            f"{report[mode]['drop_rate']:.1%} dropped, "
+            f"{report[mode]['output_tokens_per_title']:.1f} output tokens per title"
+        )
+
+    return report
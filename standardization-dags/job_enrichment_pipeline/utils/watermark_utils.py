@@ -0,0 +1,17 @@
+from typing import Any, Dict, Optional
+
+from lib.enrichment_pipeline_helpers.watermark import ExtractionWatermark
+
+
+def title_extraction_watermark(
+    blob_storage_base_path: str, extraction_config: Dict[str, Any]
+) -> Optional[ExtractionWatermark]:
+    """Watermark of the incremental title extraction, or None when it is off."""
+    if not extraction_config.get("incremental", False):
+        return None
+
+    return ExtractionWatermark(
+        state_uri=f"{blob_storage_base_path.rstrip('/')}/state/title_extraction_watermark.json",
+        column=extraction_config.get("cursor_column", "id"),
+        max_attempts=extraction_config.get("max_attempts", 3),
+    )
@@ -4,15 +4,19 @@ from airflow.decorators import task
 from datetime import timedelta
 from job_enrichment_pipeline.tasks.extract import extract_job_titles_to_gcs
 from job_enrichment_pipeline.tasks.group_batch import group_and_batch_titles
-from job_enrichment_pipeline.tasks.enrich import enrich_job_title_batch
+from job_enrichment_pipeline.tasks.enrich import (
+    enrich_job_title_batch,
+    evict_response_cache,
+)
 from job_enrichment_pipeline.tasks.load import load_to_postgres
 from job_enrichment_pipeline.tasks.link_titles import link_titles
+from job_enrichment_pipeline.tasks.metrics import summarize_enrichment_metrics
 from airflow.models import Variable
 import logging
 import os
 import json
 from lib.config.config_loader import load_config
-
+from lib.resources.registry import configure_resources
 
 logger = logging.getLogger("job_title_enrichment")
 
@@ -20,6 +24,7 @@ config_path = os.path.join(
     os.path.dirname(__file__), "job_enrichment_pipeline/config/pipeline_config.toml"
 )
 config = load_config(config_path)
+configure_resources(config.get("resources", {}))
 
 logger.info(f"Loaded configuration from {config_path}")
 
@@ -43,15 +48,26 @@ with DAG(
 
     link_titles_path = link_titles(file_path=extract_path, config=config)
 
-    batch_paths = group_and_batch_titles(
+    batch_plan = group_and_batch_titles(
         parquet_gcs_path=link_titles_path, config=config
     )
 
     enriched_paths = enrich_job_title_batch.partial(
         config=config,
+        manifest_uri=batch_plan["manifest_uri"],
         max_active_tis_per_dag=3,
-    ).expand(batch_paths=batch_paths)
+    ).expand(batches=batch_plan["batches"])
 
     load_task = load_to_postgres(enriched_paths=enriched_paths, config=config)
 
-    extract_path >> link_titles_path >> batch_paths >> enriched_paths >> load_task
+    metrics_task = summarize_enrichment_metrics(
+        enriched_paths=enriched_paths, config=config
+    )
+
+    evict_cache_task = evict_response_cache(
+        enriched_paths=enriched_paths, config=config
+    )
+
+    extract_path >> link_titles_path >> batch_plan >> enriched_paths >> load_task
+    enriched_paths >> metrics_task
+    enriched_paths >> evict_cache_task
@@ -0,0 +1,137 @@
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
+import polars as pl
+import pyarrow.parquet as pq
+from lib.resources.registry import get_gcs_client
+from lib.enrichment_pipeline_helpers.gcs_utils import (
+    download_json,
+    split_gcs_uri,
+    upload_json,
+    upload_local_file,
+)
+
+logger = logging.getLogger("batch_manifest")
+
+
+def write_sharded_batches(
+    batches: List[pl.DataFrame],
+    output_dir: str,
+    timestamp: str,
+    prefix: str = "batch",
+    shards: int = 4,
+) -> Tuple[str, List[int]]:
+    """
+    Write ``batches`` as row groups of at most ``shards`` parquet files plus a
+    JSON manifest locating each batch (shard, row-group range). Returns the
+    manifest URI and the batch indices to map tasks over.
+    """
+    base_uri = f"{output_dir.rstrip('/')}/{prefix}/{timestamp}"
+    manifest_uri = f"{base_uri}/manifest.json"
+    shards = max(1, min(shards, len(batches)))
+    per_shard = -(-len(batches) // shards)
+
+    entries: List[Dict[str, Any]] = []
+    shard_uris: List[str] = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        local_files = []
+        for shard in range(shards):
+            shard_batches = batches[shard * per_shard : (shard + 1) * per_shard]
+            if not shard_batches:
+                break
+
+            filename = f"{prefix}_{timestamp}_shard{shard:02}.parquet"
+            local_path = os.path.join(tmp_dir, filename)
+            writer = None
+
+            for batch in shard_batches:
+                table = batch.to_arrow()
+                if writer is None:
+                    writer = pq.ParquetWriter(local_path, table.schema)
+                writer.write_table(
+                    table.cast(writer.schema), row_group_size=max(1, batch.height)
+                )
+            writer.close()
+
+            metadata = pq.ParquetFile(local_path).metadata
+            row_group_sizes = [
+                metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)
+            ]
+            row_group = 0
+            for batch in shard_batches:
+                start, covered = row_group, 0
+                while covered < batch.height:
+                    covered += row_group_sizes[row_group]
+                    row_group += 1
+
+                index = len(entries)
+                entries.append(
+                    {
+                        "index": index,
+                        "name": f"{prefix}_{timestamp}_{index:03}",
+                        "shard": shard,
+                        "row_groups": [start, row_group],
+                        "rows": batch.height,
+                    }
+                )
+
+            shard_uris.append(f"{base_uri}/{filename}")
+            local_files.append(local_path)
+
+        with ThreadPoolExecutor(max_workers=len(local_files)) as executor:
+            list(executor.map(upload_local_file, local_files, shard_uris))
+
+    upload_json({"shards": shard_uris, "batches": entries}, manifest_uri)
+    logger.info(
+        f"Wrote {len(entries)} batches into {len(shard_uris)} shards, manifest: {manifest_uri}"
+    )
+
+    return manifest_uri, [entry["index"] for entry in entries]
+
+
+@lru_cache(maxsize=8)
+def load_manifest(manifest_uri: str) -> Dict[str, Any]:
+    manifest = download_json(manifest_uri)
+    if manifest is None:
+        raise FileNotFoundError(f"Batch manifest not found: {manifest_uri}")
+    return manifest
+
+
+def read_batch(
+    batch: Union[str, int], manifest_uri: Optional[str] = None
+) -> Tuple[pl.DataFrame, str]:
+    """
+    Load one batch and its name: a plain parquet blob path, or with
+    ``manifest_uri`` the index of a batch in that manifest, read with ranged
+    requests on its row groups.
+    """
+    if manifest_uri is None:
+        bucket_name, blob_path = split_gcs_uri(batch)
+        content = (
+            get_gcs_client().bucket(bucket_name).blob(blob_path).download_as_bytes()
+        )
+        return (
+            pl.read_parquet(io.BytesIO(content)),
+            os.path.basename(blob_path).split(".")[0],
+        )
+
+    manifest = load_manifest(manifest_uri)
+    entry = manifest["batches"][int(batch)]
+    shard_uri = manifest["shards"][entry["shard"]]
+    start, end = entry["row_groups"]
+
+    bucket_name, blob_path = split_gcs_uri(shard_uri)
+    blob = get_gcs_client().bucket(bucket_name).blob(blob_path)
+    with blob.open("rb") as f:
+        table = pq.ParquetFile(f).read_row_groups(list(range(start, end)))
+
+    logger.info(
+        f"Read batch {entry['name']} ({entry['rows']} rows) from row groups "
+        f"[{start}, {end}) of {shard_uri}"
+    )
+    return pl.from_arrow(table), entry["name"]
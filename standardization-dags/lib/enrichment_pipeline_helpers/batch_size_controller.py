@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from lib.resources.registry import get_gcs_client
+from lib.enrichment_pipeline_helpers.gcs_utils import (
+    download_json,
+    split_gcs_uri,
+    upload_json,
+)
+
+logger = logging.getLogger("batch_size_controller")
+
+
+class BatchStatsStore:
+    """
+    Per-batch enrichment stats kept as ``{uri}/{run_id}/{batch_name}.json``
+    in a local directory or under a gs:// prefix.
+    """
+
+    def __init__(self, uri: str):
+        self.uri = uri.rstrip("/")
+
+    def record(self, run_id: str, batch_name: str, stats: Dict[str, Any]) -> None:
+        stats_uri = f"{self.uri}/{run_id}/{batch_name}.json"
+        if stats_uri.startswith("gs://"):
+            upload_json(stats, stats_uri)
+            return
+
+        os.makedirs(os.path.dirname(stats_uri), exist_ok=True)
+        with open(stats_uri, "w") as f:
+            json.dump(stats, f)
+
+    def _list(self) -> Dict[str, List[str]]:
+        runs = defaultdict(list)
+        if self.uri.startswith("gs://"):
+            bucket_name, prefix = split_gcs_uri(f"{self.uri}/")
+            for blob in get_gcs_client().list_blobs(bucket_name, prefix=prefix):
+                run_id = blob.name[len(prefix) :].split("/")[0]
+                runs[run_id].append(f"gs://{bucket_name}/{blob.name}")
+        elif os.path.isdir(self.uri):
+            for run_id in os.listdir(self.uri):
+                run_dir = os.path.join(self.uri, run_id)
+                runs[run_id] = [
+                    os.path.join(run_dir, name) for name in os.listdir(run_dir)
+                ]
+        return runs
+
+    def _read(self, stats_uri: str) -> Dict[str, Any]:
+        if stats_uri.startswith("gs://"):
+            return download_json(stats_uri)
+        with open(stats_uri) as f:
+            return json.load(f)
+
+    def load_recent(self, max_runs: int = 5) -> List[Dict[str, Any]]:
+        runs = self._list()
+        uris = [uri for run_id in sorted(runs)[-max_runs:] for uri in runs[run_id]]
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            records = [record for record in executor.map(self._read, uris) if record]
+
+        logger.info(
+            f"Loaded {len(records)} batch stats from {min(len(runs), max_runs)} runs"
+        )
+        return records
+
+
+def choose_batch_size(
+    records: List[Dict[str, Any]],
+    default_size: int,
+    min_size: int = 100,
+    max_size: int = 2000,
+    target_loss_rate: float = 0.05,
+    growth_factor: float = 1.25,
+    min_samples: int = 3,
+    bucket_width: int = 50,
+) -> int:
+    """
+    Pick the next batch size from past batches, grouped by the batch size they
+    were cut to (titles sent to the model are fewer after cache hits). Loss is
+    the share of the sent titles not answered by the first request (dropped,
+    truncated or failed), and throughput is first-pass titles per minute of
+    request latency. Among sizes
+    whose loss is within ``target_loss_rate`` the fastest wins; when that is
+    also the largest size tried, probe ``growth_factor`` larger. When every
+    size misses the target, halve the smallest one.
+    """
+    buckets = defaultdict(
+        lambda: {"batches": 0, "requested": 0, "answered": 0, "seconds": 0.0}
+    )
+    for record in records:
+        if not record.get("requested") or not record.get("first_pass_seconds"):
+            continue
+        # Records written before batch_size was stored only have requested.
+        batch_size = record.get("batch_size", record["requested"])
+        bucket = buckets[round(batch_size / bucket_width) * bucket_width]
+        bucket["batches"] += 1
+        bucket["requested"] += record["requested"]
+        bucket["answered"] += record["first_pass"]
+        bucket["seconds"] += record["first_pass_seconds"]
+
+    sampled = {size: b for size, b in buckets.items() if b["batches"] >= min_samples}
+    if not sampled:
+        logger.info(f"Not enough batch stats yet, keeping batch size {default_size}")
+        return default_size
+
+    summary = {
+        size: {
+            "loss_rate": 1 - b["answered"] / b["requested"],
+            "titles_per_minute": b["answered"] / b["seconds"] * 60,
+        }
+        for size, b in sampled.items()
+    }
+    for size, s in sorted(summary.items()):
+        logger.info(
+            f"Batch size {size}: {s['titles_per_minute']:.0f} titles/min, "
+            f"{s['loss_rate']:.1%} lost on first pass ({sampled[size]['batches']} batches)"
+        )
+
+    within_target = [
+        size for size, s in summary.items() if s["loss_rate"] <= target_loss_rate
+    ]
+    if not within_target:
+        next_size = min(summary) // 2
+    else:
+        best = max(within_target, key=lambda size: summary[size]["titles_per_minute"])
+        next_size = int(best * growth_factor) if best == max(summary) else best
+
+    next_size = max(min_size, min(max_size, next_size))
+    logger.info(f"Chose batch size {next_size}")
+    return next_size
@@ -0,0 +1,122 @@
+import logging
+import time
+from typing import Any, Dict, List
+import polars as pl
+from lib.enrichment_pipeline_helpers.postgres_utils import copy_dataframe_to_table
+
+logger = logging.getLogger("bulk_update")
+
+_PG_TYPES = {
+    pl.Int8: "smallint",
+    pl.Int16: "smallint",
+    pl.Int32: "integer",
+    pl.Int64: "bigint",
+    pl.UInt32: "bigint",
+    pl.Float32: "real",
+    pl.Float64: "double precision",
+    pl.Boolean: "boolean",
+    pl.String: "text",
+    pl.Date: "date",
+    pl.Datetime: "timestamp",
+}
+
+
+def _pg_type(dtype: pl.DataType) -> str:
+    for pl_type, pg_type in _PG_TYPES.items():
+        if dtype == pl_type:
+            return pg_type
+    raise ValueError(f"No Postgres type mapping for polars dtype {dtype}")
+
+
+def chunked_bulk_update(
+    conn,
+    df: pl.DataFrame,
+    target_table: str,
+    key_column: str,
+    set_clause: str,
+    chunk_size: int = 5000,
+    stage_table: str = "bulk_update_stage",
+) -> List[Dict[str, Any]]:
+    """
+    COPY ``df`` into a temp staging table, then apply
+    ``UPDATE target_table SET <set_clause> FROM stage s`` in chunks of
+    ``chunk_size`` keys, committing after each chunk so row locks are only
+    held for one chunk at a time. ``set_clause`` refers to staged values
+    through the alias ``s``. Returns per-chunk timing stats; ``seconds``
+    covers only the chunk's UPDATE and COMMIT, the span its row locks are held.
+    """
+    if df.is_empty():
+        return []
+
+    staged = (
+        df.sort(key_column)
+        .with_row_index("bulk_row")
+        .with_columns(
+            (pl.col("bulk_row") // chunk_size).cast(pl.Int32).alias("chunk_id")
+        )
+        .drop("bulk_row")
+    )
+    chunk_count = staged.get_column("chunk_id").max() + 1
+    column_defs = ", ".join(
+        f"{name} {_pg_type(dtype)}" for name, dtype in staged.schema.items()
+    )
+
+    stats = []
+    with conn.cursor() as cursor:
+        copy_started = time.perf_counter()
+        cursor.execute(f"DROP TABLE IF EXISTS {stage_table}")
+        cursor.execute(f"CREATE TEMP TABLE {stage_table} ({column_defs})")
+        copy_dataframe_to_table(cursor, staged, stage_table)
+        cursor.execute(f"CREATE INDEX ON {stage_table} (chunk_id)")
+        cursor.execute(f"ANALYZE {stage_table}")
+        conn.commit()
+        logger.info(
+            f"Staged {staged.height} rows for {target_table} in "
+            f"{time.perf_counter() - copy_started:.2f}s ({chunk_count} chunks)"
+        )
+
+        try:
+            for chunk_id in range(chunk_count):
+                started = time.perf_counter()
+                cursor.execute(
+                    f"""
+                    UPDATE {target_table}
+                    SET {set_clause}
+                    FROM {stage_table} s
+                    WHERE {target_table}.{key_column} = s.{key_column}
+                      AND s.chunk_id = %s
+                    """,
+                    (chunk_id,),
+                )
+                updated = cursor.rowcount
+                update_seconds = time.perf_counter() - started
+                conn.commit()
+                elapsed = time.perf_counter() - started
+
+                stats.append(
+                    {
+                        "chunk": chunk_id,
+                        "rows": updated,
+                        "seconds": elapsed,
+                        "update_seconds": update_seconds,
+                        "commit_seconds": elapsed - update_seconds,
+                        "rows_per_second": updated / elapsed if elapsed else None,
+                    }
+                )
+                logger.info(
+                    f"Chunk {chunk_id + 1}/{chunk_count}: updated {updated} {target_table} "
+                    f"rows in {elapsed:.2f}s (UPDATE {update_seconds:.2f}s, "
+                    f"COMMIT {elapsed - update_seconds:.2f}s)"
+                )
+        finally:
+            conn.rollback()
+            cursor.execute(f"DROP TABLE IF EXISTS {stage_table}")
+            conn.commit()
+
+    total_rows = sum(chunk["rows"] for chunk in stats)
+    total_seconds = sum(chunk["seconds"] for chunk in stats)
+    logger.info(
+        f"Bulk update of {target_table} done: {total_rows} rows in {total_seconds:.2f}s "
+        f"across {len(stats)} chunks"
+    )
+    return stats
@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import polars as pl
+from lib.enrichment_pipeline_helpers.gcs_utils import (
+    download_parquet_as_dataframe,
+    upload_dataframe_as_parquet,
+)
+
+logger = logging.getLogger("enrichment_metrics")
+
+CALL_SCHEMA = {
+    "run_id": pl.Utf8,
+    "batch_name": pl.Utf8,
+    "round": pl.Int64,
+    "started_at": pl.Float64,
+    "latency_seconds": pl.Float64,
+    "retries": pl.Int64,
+    "titles_in": pl.Int64,
+    "titles_out": pl.Int64,
+    "prompt_tokens": pl.Int64,
+    "cached_tokens": pl.Int64,
+    "output_tokens": pl.Int64,
+    "finish_reason": pl.Utf8,
+    "error": pl.Utf8,
+}
+
+
+def summarize_calls(
+    df_calls: pl.DataFrame,
+    group_by: Optional[List[str]] = None,
+    pricing: Optional[Dict[str, float]] = None,
+) -> pl.DataFrame:
+    """
+    Roll call rows up per ``group_by`` (the whole frame when None). Cost is
+    priced per million tokens, with cached prompt tokens billed at the
+    cached rate instead of the input rate.
+    """
+    pricing = pricing or {}
+    aggregates = [
+        pl.len().alias("calls"),
+        pl.col("error").is_not_null().sum().alias("failed_calls"),
+        (pl.col("finish_reason").fill_null("") == "MAX_TOKENS")
+        .sum()
+        .alias("truncated_calls"),
+        pl.col("retries").sum().alias("retries"),
+        pl.col("titles_in").sum().alias("titles_in"),
+        pl.col("titles_out").sum().alias("titles_out"),
+        pl.col("prompt_tokens").sum().alias("prompt_tokens"),
+        pl.col("cached_tokens").sum().alias("cached_tokens"),
+        pl.col("output_tokens").sum().alias("output_tokens"),
+        pl.col("latency_seconds").sum().alias("latency_seconds"),
+        pl.col("latency_seconds").quantile(0.95).alias("latency_p95_seconds"),
+        (
+            pl.max_horizontal(
+                (pl.col("started_at") + pl.col("latency_seconds")).max()
+                - pl.col("started_at").min(),
+                pl.lit(0.0),
+            )
+        ).alias("wall_seconds"),
+    ]
+
+    df = df_calls.group_by(group_by) if group_by else df_calls
+    df_summary = df.agg(aggregates) if group_by else df.select(aggregates)
+
+    return df_summary.with_columns(
+        (
+            (pl.col("prompt_tokens") - pl.col("cached_tokens"))
+            * pricing.get("input_per_million", 0.0)
+            + pl.col("cached_tokens") * pricing.get("cached_input_per_million", 0.0)
+            + pl.col("output_tokens") * pricing.get("output_per_million", 0.0)
+        )
+        .truediv(1_000_000)
+        .alias("cost_usd"),
+        (
+            pl.col("titles_out") / pl.col("wall_seconds").clip(lower_bound=1e-9) * 60
+        ).alias("titles_per_minute"),
+    )
+
+
+class EnrichmentMetrics:
+    """
+    Collects one row per LLM call and writes them per batch to
+    ``{uri}/{run_id}/calls/{batch_name}.parquet``.
+    """
+
+    def __init__(self, uri: str, run_id: str, exporter: Any = None, pricing=None):
+        self.uri = uri.rstrip("/")
+        self.run_id = run_id
+        self.exporter = exporter
+        self.pricing = pricing or {}
+        self._calls: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def record_call(
+        self,
+        batch_name: str,
+        round_index: int,
+        started: float,
+        titles_in: int,
+        titles_out: int,
+        retries: int = 0,
+        error: Optional[str] = None,
+        call_info: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        call_info = call_info or {}
+        row = {
+            "run_id": self.run_id,
+            "batch_name": batch_name,
+            "round": round_index,
+            "started_at": started,
+            "latency_seconds": time.time() - started,
+            "retries": retries,
+            "titles_in": titles_in,
+            "titles_out": titles_out,
+            "prompt_tokens": call_info.get("prompt_tokens"),
+            "cached_tokens": call_info.get("cached_tokens"),
+            "output_tokens": call_info.get("output_tokens"),
+            "finish_reason": call_info.get("finish_reason"),
+            "error": error,
+        }
+        with self._lock:
+            self._calls.setdefault(batch_name, []).append(row)
+
+    def write_batch(self, batch_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            rows = self._calls.pop(batch_name, [])
+        if not rows:
+            return None
+
+        df_calls = pl.DataFrame(rows, schema=CALL_SCHEMA)
+        upload_dataframe_as_parquet(
+            df_calls, f"{self.uri}/{self.run_id}/calls/{batch_name}.parquet"
+        )
+
+        summary = summarize_calls(df_calls, pricing=self.pricing).row(0, named=True)
+        logger.info(
+            f"Batch {batch_name}: {summary['calls']} calls, "
+            f"{summary['prompt_tokens']} prompt ({summary['cached_tokens']} cached) / "
+            f"{summary['output_tokens']} output tokens, ${summary['cost_usd']:.4f}"
+        )
+        if self.exporter is not None:
+            self.exporter.export("batch", summary, {"batch": batch_name})
+        return summary
+
+
+def rollup_run_metrics(
+    uri: str,
+    run_id: str,
+    exporter: Any = None,
+    pricing: Optional[Dict[str, float]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Combine a run's call files into ``batches.parquet`` (one row per batch)
+    and ``run.parquet`` (one row for the run) next to them.
+    """
+    run_uri = f"{uri.rstrip('/')}/{run_id}"
+    df_calls = download_parquet_as_dataframe(f"{run_uri}/calls/")
+    if df_calls.is_empty():
+        logger.warning(f"No call metrics found under {run_uri}/calls/")
+        return None
+
+    df_batches = summarize_calls(df_calls, group_by=["batch_name"], pricing=pricing)
+    df_run = summarize_calls(df_calls, pricing=pricing).with_columns(
+        pl.lit(run_id).alias("run_id"),
+        pl.lit(df_batches.height).alias("batches"),
+    )
+
+    upload_dataframe_as_parquet(df_batches, f"{run_uri}/batches.parquet")
+    upload_dataframe_as_parquet(df_run, f"{run_uri}/run.parquet")
+
+    summary = df_run.row(0, named=True)
+    logger.info(
+        f"Run {run_id}: {summary['batches']} batches, {summary['calls']} calls, "
+        f"{summary['titles_out']}/{summary['titles_in']} titles answered, "
+        f"{summary['titles_per_minute']:.0f} titles/min, ${summary['cost_usd']:.2f}"
+    )
+    if exporter is not None:
+        exporter.export("run", summary, {"run_id": run_id})
+    return summary
@@ -1,11 +1,55 @@
+import os
+import tempfile
 import polars as pl
+import pyarrow.parquet as pq
 import logging
-from typing import Optional, Callable
-from lib.enrichment_pipeline_helpers.gcs_utils import upload_dataframe_as_parquet
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, Callable
+from lib.enrichment_pipeline_helpers.gcs_utils import (
+    upload_dataframe_as_parquet,
+    upload_local_file,
+)
+from lib.enrichment_pipeline_helpers.watermark import ExtractionWatermark, sql_literal
+from lib.resources.registry import pg_connection
 
 logger = logging.getLogger("gcs_extractor")
 
 
+def clean_extracted_column(
+    df: pl.DataFrame,
+    clean_column: str,
+    min_length: int = 2,
+    custom_normalize: Optional[Callable[[str], str]] = None,
+    normalize_expr: Optional[Callable[[pl.Expr], pl.Expr]] = None,
+) -> pl.DataFrame:
+    df = df.with_columns(
+        [pl.col(clean_column).str.strip_chars().alias(clean_column)]
+    ).filter(
+        pl.col(clean_column).is_not_null()
+        & (pl.col(clean_column).str.len_chars() >= min_length)
+        & (pl.col(clean_column).str.contains(r"[a-zA-Z0-9]"))
+    )
+
+    if normalize_expr:
+        df = df.with_columns([normalize_expr(pl.col(clean_column)).alias(clean_column)])
+    elif custom_normalize:
+        df = df.with_columns(
+            [
+                pl.col(clean_column)
+                .map_elements(custom_normalize, return_dtype=pl.String)
+                .alias(clean_column)
+            ]
+        )
+
+    return df
+
+
+def build_blob_storage_path(
+    blob_storage_base_path: str, prefix: str, timestamp: str
+) -> str:
+    return f"{blob_storage_base_path.rstrip('/')}/{prefix}/{prefix}_{timestamp}.parquet"
+
+
 def extract_and_upload(
     db_uri: str,
     query: str,
@@ -15,6 +59,8 @@ def extract_and_upload(
     clean_column: str = "title",
     min_length: int = 2,
     custom_normalize: Optional[Callable[[str], str]] = None,
+    normalize_expr: Optional[Callable[[pl.Expr], pl.Expr]] = None,
+    watermark: Optional[ExtractionWatermark] = None,
 ) -> Optional[str]:
     try:
         logger.info(f"Starting extraction from database using query")
@@ -22,32 +68,26 @@ def extract_and_upload(
         df = pl.read_database_uri(query=query, uri=db_uri)
         logger.info(f"Retrieved {df.shape[0]} initial records from database")
 
+        if watermark:
+            watermark.observe(df)
+
         if df.is_empty():
             logger.warning("No records to process. Skipping upload.")
             return None
 
         logger.info(f"Cleaning column '{clean_column}' and applying filters")
-
-        df = df.with_columns(
-            [pl.col(clean_column).str.strip_chars().alias(clean_column)]
-        ).filter(
-            pl.col(clean_column).is_not_null()
-            & (pl.col(clean_column).str.len_chars() >= min_length)
-            & (pl.col(clean_column).str.contains(r"[a-zA-Z0-9]"))
-        )
-
-        if custom_normalize:
+        if normalize_expr:
+            logger.info(
+                f"Applying vectorized normalization expression to column '{clean_column}'"
+            )
+        elif custom_normalize:
             logger.info(
                 f"Applying custom normalization function to column '{clean_column}'"
             )
 
-            df = df.with_columns(
-                [
-                    pl.col(clean_column)
-                    .map_elements(custom_normalize, return_dtype=pl.String)
-                    .alias(clean_column)
-                ]
-            )
+        df = clean_extracted_column(
+            df, clean_column, min_length, custom_normalize, normalize_expr
+        )
 
         if df.is_empty():
             logger.warning(
@@ -56,7 +96,9 @@ def extract_and_upload(
 
             return None
 
-        blob_storage_path = f"{blob_storage_base_path.rstrip('/')}/{prefix}/{prefix}_{timestamp}.parquet"
+        blob_storage_path = build_blob_storage_path(
+            blob_storage_base_path, prefix, timestamp
+        )
         logger.info(
             f"Preparing to upload {df.shape[0]} filtered records to: {blob_storage_path}"
         )
@@ -69,3 +111,286 @@ def extract_and_upload(
     except Exception as e:
         logger.error(f"Extraction failed: {str(e)}", exc_info=True)
         raise
+
+
+def build_keyset_page_query(
+    query: str, key_column: str, last_key: Optional[Any], page_size: int
+) -> str:
+    cursor_filter = (
+        f"WHERE {key_column} > {sql_literal(last_key)}" if last_key is not None else ""
+    )
+    return f"""
+        SELECT * FROM ({query}) AS keyset_source
+        {cursor_filter}
+        ORDER BY {key_column}
+        LIMIT {page_size}
+    """
+
+
+def extract_and_upload_streaming(
+    db_uri: str,
+    query: str,
+    blob_storage_base_path: str,
+    timestamp: str,
+    prefix: str = "title",
+    clean_column: str = "title",
+    key_column: str = "id",
+    page_size: int = 50000,
+    max_rows: Optional[int] = None,
+    start_after: Optional[Any] = None,
+    min_length: int = 2,
+    custom_normalize: Optional[Callable[[str], str]] = None,
+    normalize_expr: Optional[Callable[[pl.Expr], pl.Expr]] = None,
+    watermark: Optional[ExtractionWatermark] = None,
+) -> Optional[str]:
+    """
+    Page through ``query`` with a keyset cursor on ``key_column`` and append
+    every cleaned page to a local parquet file as its own row group, so only
+    one page is held in memory at a time. The finished file is uploaded once.
+    """
+    logger.info(
+        f"Starting streaming extraction (page_size={page_size}, max_rows={max_rows or 'unbounded'})"
+    )
+
+    last_key = start_after
+    rows_read = 0
+    rows_written = 0
+    pages = 0
+    writer = None
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local_path = os.path.join(tmp_dir, f"{prefix}_{timestamp}.parquet")
+
+            while max_rows is None or rows_read < max_rows:
+                limit = page_size
+                if max_rows is not None:
+                    limit = min(page_size, max_rows - rows_read)
+
+                page = pl.read_database_uri(
+                    query=build_keyset_page_query(query, key_column, last_key, limit),
+                    uri=db_uri,
+                )
+                if page.is_empty():
+                    break
+
+                pages += 1
+                page_rows = page.height
+                rows_read += page_rows
+                last_key = page.get_column(key_column).max()
+                if watermark:
+                    watermark.observe(page)
+
+                page = clean_extracted_column(
+                    page, clean_column, min_length, custom_normalize, normalize_expr
+                )
+                logger.info(
+                    f"Page {pages}: kept {page.height} rows, cursor at {key_column}={last_key}"
+                )
+
+                if not page.is_empty():
+                    table = page.to_arrow()
+                    if writer is None:
+                        writer = pq.ParquetWriter(local_path, table.schema)
+                    writer.write_table(table.cast(writer.schema))
+                    rows_written += page.height
+
+                if page_rows < limit:
+                    break
+
+            if writer is None:
+                logger.warning(
+                    f"No records left after streaming {rows_read} rows. Skipping upload."
+                )
+                return None
+
+            writer.close()
+            writer = None
+
+            blob_storage_path = build_blob_storage_path(
+                blob_storage_base_path, prefix, timestamp
+            )
+            logger.info(
+                f"Uploading {rows_written} records ({pages} row groups) to: {blob_storage_path}"
+            )
+            upload_local_file(local_path, blob_storage_path)
+            logger.info(f"Successfully uploaded data to {blob_storage_path}")
+
+            return blob_storage_path
+
+    except Exception as e:
+        logger.error(f"Streaming extraction failed: {str(e)}", exc_info=True)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def build_grouped_query(
+    query: str,
+    clean_column: str = "title",
+    agg_column: str = "id",
+    group_sql: Optional[str] = None,
+    min_length: int = 2,
+    extra_aggregates: Optional[list[str]] = None,
+) -> str:
+    group_sql = group_sql or clean_column
+    aggregates = [f"array_agg({agg_column} ORDER BY {agg_column}) AS {agg_column}"]
+    aggregates.extend(extra_aggregates or [])
+
+    return f"""
+        SELECT {group_sql} AS {clean_column}, {", ".join(aggregates)}
+        FROM ({query}) AS grouped_source
+        WHERE {clean_column} IS NOT NULL
+          AND length(btrim({clean_column})) >= {min_length}
+          AND {clean_column} ~ '[a-zA-Z0-9]'
+        GROUP BY 1
+        HAVING length({group_sql}) > 0
+    """
+
+
+def extract_grouped_and_upload(
+    db_uri: str,
+    query: str,
+    blob_storage_base_path: str,
+    timestamp: str,
+    prefix: str = "title",
+    clean_column: str = "title",
+    agg_column: str = "id",
+    group_sql: Optional[str] = None,
+    min_length: int = 2,
+    extra_aggregates: Optional[list[str]] = None,
+    watermark: Optional[ExtractionWatermark] = None,
+) -> Optional[str]:
+    """
+    Collapse ``query`` to one row per distinct (normalized) ``clean_column``
+    inside the database, with every matching ``agg_column`` value gathered
+    into a list, and upload that pre-grouped frame.
+    """
+    try:
+        grouped_query = build_grouped_query(
+            query, clean_column, agg_column, group_sql, min_length, extra_aggregates
+        )
+        logger.info(f"Starting grouped extraction on '{clean_column}'")
+
+        df = pl.read_database_uri(query=grouped_query, uri=db_uri)
+        if watermark:
+            watermark.observe(df)
+
+        if df.is_empty():
+            logger.warning("No records to process. Skipping upload.")
+            return None
+
+        total_rows = df.get_column(agg_column).list.len().sum()
+        logger.info(
+            f"Retrieved {df.height} distinct values covering {total_rows} records"
+        )
+
+        blob_storage_path = build_blob_storage_path(
+            blob_storage_base_path, prefix, timestamp
+        )
+        upload_dataframe_as_parquet(df, blob_storage_path)
+        logger.info(f"Successfully uploaded grouped data to {blob_storage_path}")
+
+        return blob_storage_path
+
+    except Exception as e:
+        logger.error(f"Grouped extraction failed: {str(e)}", exc_info=True)
+        raise
+
+
+def split_key_ranges(low: int, high: int, partitions: int) -> list[tuple[int, int]]:
+    step = max(1, -(-(high - low + 1) // partitions))
+    return [
+        (start, min(start + step - 1, high)) for start in range(low, high + 1, step)
+    ]
+
+
+def extract_partitioned_and_upload(
+    db_uri: str,
+    query: str,
+    blob_storage_base_path: str,
+    timestamp: str,
+    prefix: str = "title",
+    clean_column: str = "title",
+    key_column: str = "id",
+    partitions: int = 8,
+    max_connections: int = 4,
+    min_length: int = 2,
+    custom_normalize: Optional[Callable[[str], str]] = None,
+    normalize_expr: Optional[Callable[[pl.Expr], pl.Expr]] = None,
+    watermark: Optional[ExtractionWatermark] = None,
+) -> Optional[str]:
+    """
+    Split the integer ``key_column`` space of ``query`` into ``partitions``
+    ranges and read them concurrently over at most ``max_connections``
+    connections from the shared pool. Each range is written as its own part under a
+    dataset prefix, which is returned (with a trailing ``/``).
+    """
+    dataset_path = (
+        f"{blob_storage_base_path.rstrip('/')}/{prefix}/{prefix}_{timestamp}/"
+    )
+
+    def read_range(index: int, low: int, high: int) -> Optional[str]:
+        range_query = f"""
+            SELECT * FROM ({query}) AS partition_source
+            WHERE {key_column} BETWEEN {low} AND {high}
+        """
+        with pg_connection(db_uri) as conn:
+            df = pl.read_database(range_query, connection=conn)
+
+        if watermark:
+            watermark.observe(df)
+
+        rows_read = df.height
+        df = clean_extracted_column(
+            df, clean_column, min_length, custom_normalize, normalize_expr
+        )
+        logger.info(
+            f"Partition {index} [{low}, {high}]: kept {df.height} of {rows_read} rows"
+        )
+        if df.is_empty():
+            return None
+
+        part_path = f"{dataset_path}part-{index:04}.parquet"
+        upload_dataframe_as_parquet(df, part_path)
+        return part_path
+
+    try:
+        with pg_connection(db_uri) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT min({key_column}), max({key_column}) FROM ({query}) AS bounds"
+                )
+                low, high = cursor.fetchone()
+
+        if low is None:
+            logger.warning("No records to process. Skipping upload.")
+            return None
+
+        ranges = split_key_ranges(low, high, partitions)
+        logger.info(
+            f"Extracting {key_column} in [{low}, {high}] as {len(ranges)} partitions "
+            f"over {max_connections} connections"
+        )
+
+        with ThreadPoolExecutor(max_workers=max_connections) as executor:
+            futures = [
+                executor.submit(read_range, index, range_low, range_high)
+                for index, (range_low, range_high) in enumerate(ranges)
+            ]
+            part_paths = [future.result() for future in futures]
+
+        written = [path for path in part_paths if path]
+        if not written:
+            logger.warning(
+                "All records discarded after cleaning and filtering. Skipping upload."
+            )
+            return None
+
+        logger.info(f"Uploaded {len(written)} parts to dataset {dataset_path}")
+        return dataset_path
+
+    except Exception as e:
+        logger.error(f"Partitioned extraction failed: {str(e)}", exc_info=True)
+        raise
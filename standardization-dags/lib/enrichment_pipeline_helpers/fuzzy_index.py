@@ -0,0 +1,404 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import zlib
+from typing import Any, Dict, Optional
+import polars as pl
+from lib.enrichment_pipeline_helpers.gcs_utils import (
+    download_json,
+    download_parquet_as_dataframe,
+    upload_dataframe_as_parquet,
+    upload_json,
+)
+
+logger = logging.getLogger("fuzzy_index")
+
+_HASH_PRIME = 4294967311
+
+
+def _char_ngrams(df: pl.DataFrame, key_column: str, ngram: int) -> pl.DataFrame:
+    padded = pl.concat_str([pl.lit(" "), pl.col(key_column), pl.lit(" ")])
+    return (
+        df.select(["row", padded.alias("padded")])
+        .with_columns(
+            pl.int_ranges(
+                0, (pl.col("padded").str.len_chars() - ngram + 1).clip(lower_bound=1)
+            ).alias("offset")
+        )
+        .explode("offset")
+        .select(
+            ["row", pl.col("padded").str.slice(pl.col("offset"), ngram).alias("gram")]
+        )
+        .unique()
+    )
+
+
+def _hash_grams(grams: pl.DataFrame) -> pl.DataFrame:
+    # crc32 instead of Expr.hash so saved signatures stay valid across polars versions
+    vocabulary = grams.select("gram").unique()
+    vocabulary = vocabulary.with_columns(
+        pl.col("gram")
+        .map_elements(
+            lambda gram: zlib.crc32(gram.encode("utf-8")), return_dtype=pl.UInt64
+        )
+        .alias("gram_hash")
+    )
+    return grams.join(vocabulary, on="gram", how="left")
+
+
+def _source_digest(df: pl.DataFrame, key_column: str, value_column: str) -> str:
+    pairs = (
+        df.select(
+            [pl.col(key_column).alias("key"), pl.col(value_column).alias("value")]
+        )
+        .unique()
+        .sort(["key", "value"], nulls_last=True)
+    )
+    return hashlib.sha256(pairs.write_csv().encode("utf-8")).hexdigest()
+
+
+def _group_entries(
+    df: pl.DataFrame,
+    key_column: str,
+    value_column: str,
+    block_column: Optional[str],
+) -> pl.DataFrame:
+    """One row per key with its block and value, null when source rows disagree."""
+    return (
+        df.select(
+            [
+                pl.col(key_column).alias("key"),
+                pl.col(value_column).alias("value"),
+                (pl.col(block_column) if block_column else pl.lit("")).alias("block"),
+            ]
+        )
+        .filter(pl.col("key").is_not_null() & (pl.col("key").str.len_chars() > 0))
+        .group_by("key")
+        .agg([pl.col("value").unique(), pl.col("block").first()])
+        .with_columns(
+            pl.when(pl.col("value").list.len() == 1)
+            .then(pl.col("value").list.first())
+            .alias("value")
+        )
+        .select(["key", "value", "block"])
+    )
+
+
+class FuzzyTitleIndex:
+    """
+    MinHash/LSH index over character n-grams of a key column, mapping each
+    key to a value. Candidates sharing at least one LSH band are verified
+    with the exact n-gram Jaccard similarity before they are returned.
+
+    Keys whose source rows disagree on the value are kept with a null value
+    and never returned, so a key never links to one of several different
+    values. An optional block column (e.g. the level tokens of a title) must
+    be equal for a query and an entry to be compared at all.
+    """
+
+    def __init__(
+        self,
+        entries: pl.DataFrame,
+        bands: pl.DataFrame,
+        meta: Dict[str, Any],
+    ):
+        self.entries = entries
+        self.bands = bands
+        self.meta = meta
+
+    @property
+    def ngram(self) -> int:
+        return self.meta["ngram"]
+
+    def _permutations(self) -> list[tuple[int, int]]:
+        rng = random.Random(self.meta["seed"])
+        return [
+            (rng.randrange(1, 2**31), rng.randrange(0, 2**31))
+            for _ in range(self.meta["num_perm"])
+        ]
+
+    def _signature_bands(self, keys: pl.DataFrame) -> pl.DataFrame:
+        grams = _hash_grams(_char_ngrams(keys, "key", self.ngram))
+        rows_per_band = self.meta["num_perm"] // self.meta["num_bands"]
+        permutations = self._permutations()
+
+        band_frames = []
+        for band in range(self.meta["num_bands"]):
+            band_perms = permutations[band * rows_per_band : (band + 1) * rows_per_band]
+            minhashes = grams.group_by("row").agg(
+                [
+                    ((pl.col("gram_hash") * a + b) % _HASH_PRIME).min().alias(f"h{i}")
+                    for i, (a, b) in enumerate(band_perms)
+                ]
+            )
+            band_frames.append(
+                minhashes.select(
+                    [
+                        "row",
+                        pl.lit(band, dtype=pl.Int32).alias("band"),
+                        pl.concat_str(
+                            [pl.col(f"h{i}") for i in range(len(band_perms))],
+                            separator=":",
+                        ).alias("band_key"),
+                    ]
+                )
+            )
+
+        return pl.concat(band_frames)
+
+    @classmethod
+    def build(
+        cls,
+        df: pl.DataFrame,
+        key_column: str,
+        value_column: str,
+        block_column: Optional[str] = None,
+        num_perm: int = 32,
+        num_bands: int = 8,
+        ngram: int = 3,
+        seed: int = 7,
+    ) -> "FuzzyTitleIndex":
+        if num_perm % num_bands:
+            raise ValueError("num_perm must be a multiple of num_bands")
+
+        entries = (
+            _group_entries(df, key_column, value_column, block_column)
+            .sort("key")
+            .with_row_index("row")
+        )
+        ambiguous = entries.filter(pl.col("value").is_null())
+        if not ambiguous.is_empty():
+            logger.warning(
+                f"Leaving {ambiguous.height} keys with conflicting values out of "
+                f"the fuzzy index, e.g.:\n{ambiguous.head(5)}"
+            )
+
+        meta = {
+            "num_perm": num_perm,
+            "num_bands": num_bands,
+            "ngram": ngram,
+            "seed": seed,
+            "source_rows": df.height,
+            "source_digest": _source_digest(df, key_column, value_column),
+            "ambiguous_keys": ambiguous.height,
+        }
+        index = cls(entries, pl.DataFrame(), meta)
+        index.bands = index._signature_bands(entries)
+        logger.info(f"Built fuzzy index over {entries.height} distinct keys")
+        return index
+
+    def update(
+        self,
+        df: pl.DataFrame,
+        key_column: str,
+        value_column: str,
+        block_column: Optional[str] = None,
+    ) -> bool:
+        """
+        Bring the index in line with ``df``, computing signatures only for
+        keys it has not seen before. Values of known keys are refreshed in
+        place, keys no longer in ``df`` keep their row with a null value.
+        Returns whether anything changed.
+        """
+        digest = _source_digest(df, key_column, value_column)
+        if self.meta.get("source_digest") == digest:
+            return False
+
+        grouped = _group_entries(df, key_column, value_column, block_column)
+        new_entries = (
+            grouped.join(self.entries, on="key", how="anti")
+            .sort("key")
+            .with_row_index("row", offset=self.entries.height)
+        )
+        known_entries = self.entries.select(["row", "key", "block"]).join(
+            grouped.select(["key", "value"]), on="key", how="left"
+        )
+
+        self.entries = pl.concat(
+            [
+                known_entries.select(["row", "key", "value", "block"]),
+                new_entries.select(["row", "key", "value", "block"]),
+            ],
+            how="vertical_relaxed",
+        )
+        if not new_entries.is_empty():
+            self.bands = pl.concat([self.bands, self._signature_bands(new_entries)])
+
+        self.meta["source_rows"] = df.height
+        self.meta["source_digest"] = digest
+        self.meta["ambiguous_keys"] = grouped.filter(pl.col("value").is_null()).height
+        logger.info(
+            f"Added {new_entries.height} keys to the fuzzy index, "
+            f"now {self.entries.height} keys"
+        )
+        return True
+
+    def query(
+        self,
+        keys: pl.Series,
+        threshold: float = 0.85,
+        blocks: Optional[pl.Series] = None,
+    ) -> pl.DataFrame:
+        """
+        Return the best entry with similarity >= ``threshold`` and the same
+        block for each key as (key, match_key, value, similarity).
+        """
+        empty = pl.DataFrame(
+            schema={
+                "key": pl.String,
+                "match_key": pl.String,
+                "value": self.entries.schema.get("value", pl.Int64),
+                "similarity": pl.Float64,
+            }
+        )
+        queries = (
+            pl.DataFrame({"key": keys, "block": blocks if blocks is not None else ""})
+            .filter(pl.col("key").is_not_null())
+            .unique()
+            .with_row_index("row")
+        )
+        if queries.is_empty() or self.entries.is_empty():
+            return empty
+
+        candidates = (
+            self._signature_bands(queries)
+            .join(self.bands, on=["band", "band_key"], suffix="_entry")
+            .select(["row", pl.col("row_entry").alias("entry_row")])
+            .unique()
+            .join(queries.select(["row", "block"]), on="row")
+            .join(
+                self.entries.filter(pl.col("value").is_not_null()).select(
+                    [pl.col("row").alias("entry_row"), "block"]
+                ),
+                on=["entry_row", "block"],
+            )
+            .select(["row", "entry_row"])
+        )
+        if candidates.is_empty():
+            return empty
+
+        query_grams = _char_ngrams(queries, "key", self.ngram)
+        entry_grams = _char_ngrams(
+            self.entries.join(
+                candidates.select(pl.col("entry_row").alias("row")).unique(), on="row"
+            ),
+            "key",
+            self.ngram,
+        ).rename({"row": "entry_row"})
+
+        shared = (
+            candidates.join(query_grams, on="row")
+            .join(entry_grams, on=["entry_row", "gram"])
+            .group_by(["row", "entry_row"])
+            .agg(pl.len().alias("shared"))
+        )
+        query_sizes = query_grams.group_by("row").agg(pl.len().alias("query_size"))
+        entry_sizes = entry_grams.group_by("entry_row").agg(
+            pl.len().alias("entry_size")
+        )
+
+        scored = (
+            shared.join(query_sizes, on="row")
+            .join(entry_sizes, on="entry_row")
+            .with_columns(
+                (
+                    pl.col("shared")
+                    / (pl.col("query_size") + pl.col("entry_size") - pl.col("shared"))
+                ).alias("similarity")
+            )
+            .filter(pl.col("similarity") >= threshold)
+            .sort(["row", "similarity"], descending=[False, True])
+            .unique(subset=["row"], keep="first")
+        )
+
+        return (
+            scored.join(queries.select(["row", "key"]), on="row")
+            .join(
+                self.entries.select(
+                    [
+                        pl.col("row").alias("entry_row"),
+                        pl.col("key").alias("match_key"),
+                        "value",
+                    ]
+                ),
+                on="entry_row",
+            )
+            .select(["key", "match_key", "value", "similarity"])
+        )
+
+    def evaluate(
+        self,
+        labelled: pl.DataFrame,
+        key_column: str,
+        value_column: str,
+        threshold: float = 0.85,
+        block_column: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Check against labelled keys held out of the index, queried the way
+        unmatched titles are (exact key hits included). Reports how often a
+        link is made (hit rate) and how often the linked value disagrees with
+        the label (false-link rate).
+        """
+        truth = labelled.select(
+            [
+                pl.col(key_column).alias("key"),
+                pl.col(value_column).alias("expected"),
+                (pl.col(block_column) if block_column else pl.lit("")).alias("block"),
+            ]
+        ).unique()
+        links = self.query(
+            truth.get_column("key"),
+            threshold=threshold,
+            blocks=truth.get_column("block"),
+        ).join(truth.drop("block"), on="key")
+
+        queries = truth.height
+        hits = links.height
+        false_links = links.filter(pl.col("value") != pl.col("expected")).height
+        report = {
+            "queries": queries,
+            "hits": hits,
+            "hit_rate": hits / queries if queries else 0.0,
+            "false_links": false_links,
+            "false_link_rate": false_links / hits if hits else 0.0,
+            "threshold": threshold,
+        }
+        logger.info(f"Fuzzy index evaluation: {report}")
+        return report
+
+    def save(self, uri: str) -> None:
+        uri = uri.rstrip("/")
+        if uri.startswith("gs://"):
+            upload_dataframe_as_parquet(self.entries, f"{uri}/entries.parquet")
+            upload_dataframe_as_parquet(self.bands, f"{uri}/bands.parquet")
+            upload_json(self.meta, f"{uri}/meta.json")
+        else:
+            os.makedirs(uri, exist_ok=True)
+            self.entries.write_parquet(f"{uri}/entries.parquet")
+            self.bands.write_parquet(f"{uri}/bands.parquet")
+            with open(f"{uri}/meta.json", "w") as f:
+                json.dump(self.meta, f)
+        logger.info(f"Saved fuzzy index to {uri}")
+
+    @classmethod
+    def load(cls, uri: str) -> Optional["FuzzyTitleIndex"]:
+        uri = uri.rstrip("/")
+        if uri.startswith("gs://"):
+            meta = download_json(f"{uri}/meta.json")
+            if not meta:
+                return None
+            entries = download_parquet_as_dataframe(f"{uri}/entries.parquet")
+            bands = download_parquet_as_dataframe(f"{uri}/bands.parquet")
+        else:
+            if not os.path.exists(f"{uri}/meta.json"):
+                return None
+            with open(f"{uri}/meta.json") as f:
+                meta = json.load(f)
+            entries = pl.read_parquet(f"{uri}/entries.parquet")
+            bands = pl.read_parquet(f"{uri}/bands.parquet")
+
+        logger.info(f"Loaded fuzzy index with {entries.height} keys from {uri}")
+        return cls(entries, bands, meta)
@@ -1,12 +1,46 @@
 import io
-from google.cloud import storage
+import json
+from typing import Any, Dict, Optional
+from lib.resources.registry import get_gcs_client
 import polars as pl
 
 
-def download_parquet_as_dataframe(gcs_uri: str) -> pl.DataFrame:
+def split_gcs_uri(gcs_uri: str) -> tuple[str, str]:
     bucket_name, blob_path = gcs_uri.replace("gs://", "").split("/", 1)
+    return bucket_name, blob_path
+
+
+def is_dataset_uri(gcs_uri: str) -> bool:
+    return gcs_uri.endswith("/")
+
+
+def list_parquet_parts(gcs_uri: str) -> list[str]:
+    bucket_name, prefix = split_gcs_uri(gcs_uri)
+    blobs = get_gcs_client().list_blobs(bucket_name, prefix=prefix)
+    return sorted(
+        f"gs://{bucket_name}/{blob.name}"
+        for blob in blobs
+        if blob.name.endswith(".parquet")
+    )
+
+
+def download_parquet_as_dataframe(gcs_uri: str) -> pl.DataFrame:
+    """
+    Read a single parquet blob, or every ``*.parquet`` part under ``gcs_uri``
+    when it is a dataset prefix (ends with ``/``).
+    """
+    if is_dataset_uri(gcs_uri):
+        parts = list_parquet_parts(gcs_uri)
+        if not parts:
+            return pl.DataFrame()
+        return pl.concat(
+            [download_parquet_as_dataframe(part) for part in parts],
+            how="vertical_relaxed",
+        )
+
+    bucket_name, blob_path = split_gcs_uri(gcs_uri)
     buf = io.BytesIO()
-    storage.Client().bucket(bucket_name).blob(blob_path).download_to_file(buf)
+    get_gcs_client().bucket(bucket_name).blob(blob_path).download_to_file(buf)
     buf.seek(0)
     return pl.read_parquet(buf)
 
@@ -15,7 +49,30 @@ def upload_dataframe_as_parquet(df: pl.DataFrame, gcs_uri: str) -> None:
     buf = io.BytesIO()
     df.write_parquet(buf)
     buf.seek(0)
-    bucket_name, blob_path = gcs_uri.replace("gs://", "").split("/", 1)
-    client = storage.Client()
+    bucket_name, blob_path = split_gcs_uri(gcs_uri)
+    client = get_gcs_client()
     blob = client.bucket(bucket_name).blob(blob_path)
     blob.upload_from_file(buf, content_type="application/octet-stream")
+
+
+def upload_local_file(local_path: str, gcs_uri: str) -> None:
+    bucket_name, blob_path = split_gcs_uri(gcs_uri)
+    client = get_gcs_client()
+    blob = client.bucket(bucket_name).blob(blob_path)
+    blob.upload_from_filename(local_path, content_type="application/octet-stream")
+
+
+def download_json(gcs_uri: str) -> Optional[Dict[str, Any]]:
+    bucket_name, blob_path = split_gcs_uri(gcs_uri)
+    blob = get_gcs_client().bucket(bucket_name).blob(blob_path)
+    if not blob.exists():
+        return None
+    return json.loads(blob.download_as_bytes())
+
+
+def upload_json(payload: Dict[str, Any], gcs_uri: str) -> None:
+    bucket_name, blob_path = split_gcs_uri(gcs_uri)
+    blob = get_gcs_client().bucket(bucket_name).blob(blob_path)
+    blob.upload_from_string(
+        json.dumps(payload, default=str), content_type="application/json"
+    )
@@ -1,11 +1,75 @@
 import polars as pl
 import logging
+from typing import Optional, Tuple, Union
+from lib.enrichment_pipeline_helpers.batch_manifest import write_sharded_batches
 from lib.enrichment_pipeline_helpers.gcs_utils import upload_dataframe_as_parquet
 
-
 logger = logging.getLogger("grouper")
 
 
+def group_rows(
+    df: pl.DataFrame, group_by_cols: list[str], agg_cols: list[str]
+) -> pl.DataFrame:
+    list_cols = [col for col in agg_cols if df.schema[col] == pl.List]
+    if not list_cols:
+        return df.group_by(group_by_cols, maintain_order=True).agg(agg_cols)
+
+    if df.select(group_by_cols).is_unique().all():
+        logger.info("Input is already grouped, using it as is")
+        return df.select(group_by_cols + agg_cols)
+
+    return (
+        df.explode(list_cols).group_by(group_by_cols, maintain_order=True).agg(agg_cols)
+    )
+
+
+def assign_budget_batches(
+    costs: list[int], budget: int, max_items: Optional[int] = None
+) -> list[int]:
+    """
+    Greedily pack items in order into batches whose summed cost stays within
+    ``budget`` (an item larger than the budget gets a batch of its own).
+    """
+    batch_ids = []
+    batch, used, count = 0, 0, 0
+
+    for cost in costs:
+        if count and (used + cost > budget or (max_items and count >= max_items)):
+            batch, used, count = batch + 1, 0, 0
+        used += cost
+        count += 1
+        batch_ids.append(batch)
+
+    return batch_ids
+
+
+def split_into_batches(
+    grouped: pl.DataFrame,
+    batch_size: int,
+    token_budget: Optional[int] = None,
+    cost_expr: Optional[pl.Expr] = None,
+) -> list[pl.DataFrame]:
+    if token_budget is None or cost_expr is None:
+        return [
+            grouped.slice(i, batch_size) for i in range(0, grouped.height, batch_size)
+        ]
+
+    costs = grouped.select(cost_expr.alias("cost")).get_column("cost")
+    batch_ids = assign_budget_batches(costs.to_list(), token_budget, batch_size)
+    batched = grouped.with_columns(
+        [pl.Series("batch_id", batch_ids), costs.alias("cost")]
+    )
+
+    batches = batched.partition_by("batch_id", maintain_order=True)
+    for batch in batches:
+        logger.info(
+            f"Batch {batch['batch_id'][0]}: {batch.height} rows, "
+            f"predicted cost {batch['cost'].sum()} / {token_budget}"
+        )
+
+    return [batch.drop(["batch_id", "cost"]) for batch in batches]
+
+
 def group_and_batch(
     df: pl.DataFrame,
     group_by_cols: list[str],
@@ -14,16 +78,29 @@ def group_and_batch(
     timestamp: str,
     batch_size: int,
     prefix: str = "batch",
-) -> list[str]:
+    token_budget: Optional[int] = None,
+    cost_expr: Optional[pl.Expr] = None,
+    manifest_shards: Optional[int] = None,
+) -> Tuple[Optional[str], list[Union[str, int]]]:
+    """
+    Group ``df`` and write it out in batches. Returns ``(None, paths)`` for one
+    parquet file per batch, or ``(manifest_uri, indices)`` with
+    ``manifest_shards``.
+    """
     logger.info(f"Grouping by {group_by_cols}, aggregating {agg_cols}")
 
-    grouped = df.group_by(group_by_cols, maintain_order=True).agg(agg_cols)
+    grouped = group_rows(df, group_by_cols, agg_cols)
 
     output_paths = []
 
-    for i in range(0, grouped.height, batch_size):
-        batch = grouped.slice(i, batch_size)
-        filename = f"{prefix}_{timestamp}_{i // batch_size:03}.parquet"
+    batches = split_into_batches(grouped, batch_size, token_budget, cost_expr)
+    if manifest_shards:
+        return write_sharded_batches(
+            batches, output_dir, timestamp, prefix=prefix, shards=manifest_shards
+        )
+
+    for i, batch in enumerate(batches):
+        filename = f"{prefix}_{timestamp}_{i:03}.parquet"
         blob_path = f"{output_dir.rstrip('/')}/{prefix}/{timestamp}/{filename}"
 
         upload_dataframe_as_parquet(df=batch, gcs_uri=blob_path)
@@ -31,4 +108,4 @@ def group_and_batch(
         output_paths.append(blob_path)
 
     logger.info(f"Wrote {len(output_paths)} parquet batches to GCS")
-    return output_paths
+    return None, output_paths
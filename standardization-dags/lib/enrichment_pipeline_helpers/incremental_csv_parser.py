@@ -0,0 +1,81 @@
+import csv
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalCsvParser:
+    """
+    Parse a CSV response as it is streamed in. ``feed`` returns the rows
+    completed by each chunk, so only the unfinished last line is buffered.
+    Markdown code fences and blank lines are skipped; rows with too few
+    fields are counted as malformed and dropped.
+    """
+
+    def __init__(self, expected_columns: Optional[List[str]] = None):
+        self.expected_columns = expected_columns
+        self.header = None
+        self.buffer = ""
+        self.rows = 0
+        self.malformed = 0
+
+    def _parse_line(self, line: str) -> Optional[Dict[str, str]]:
+        line = line.strip()
+        if not line or line.startswith("```"):
+            return None
+
+        fields = [field.strip() for field in next(csv.reader([line]))]
+
+        if self.header is None:
+            self.header = fields
+            if self.expected_columns:
+                missing = set(self.expected_columns) - set(self.header)
+                if missing:
+                    logger.error(
+                        f"Missing expected columns in LLM CSV response: {missing}"
+                    )
+                    raise ValueError(f"Missing expected columns: {missing}")
+            return None
+
+        if len(fields) < len(self.header):
+            self.malformed += 1
+            return None
+
+        self.rows += 1
+        return {column: value or None for column, value in zip(self.header, fields)}
+
+    def feed(self, chunk: str) -> List[Dict[str, str]]:
+        self.buffer += chunk
+        *lines, self.buffer = self.buffer.split("\n")
+
+        rows = []
+        pending = ""
+        for line in lines:
+            line = pending + line
+            # A quoted field may contain a newline; wait for its closing quote.
+            if line.count('"') % 2:
+                pending = line + "\n"
+                continue
+            pending = ""
+            row = self._parse_line(line)
+            if row is not None:
+                rows.append(row)
+
+        self.buffer = pending + self.buffer
+        return rows
+
+    def close(self, truncated: bool = False) -> List[Dict[str, str]]:
+        """
+        Flush the buffered last line. When the stream was cut off the last
+        line is incomplete by definition and is discarded instead.
+        """
+        line, self.buffer = self.buffer, ""
+        if truncated:
+            if line.strip():
+                self.malformed += 1
+                logger.warning(f"Dropping truncated last line: {line[:200]!r}")
+            return []
+
+        row = self._parse_line(line)
+        return [row] if row is not None else []
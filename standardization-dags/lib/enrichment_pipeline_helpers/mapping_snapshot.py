@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+import polars as pl
+from lib.resources.registry import get_gcs_client
+from lib.enrichment_pipeline_helpers.gcs_utils import (
+    download_json,
+    split_gcs_uri,
+    upload_json,
+    upload_local_file,
+)
+from lib.enrichment_pipeline_helpers.watermark import sql_literal
+
+logger = logging.getLogger("mapping_snapshot")
+
+
+class MappingSnapshot:
+    """
+    Versioned Arrow IPC snapshot of a lookup table (key -> value) kept on a
+    local volume and mirrored to blob storage. ``refresh`` only pulls rows
+    whose ``cursor_column`` is past the snapshot's high-water mark and
+    returns the merged table memory-mapped from disk.
+
+    Rows updated in place keep their cursor value and are only picked up by
+    the full rebuild that runs every ``full_refresh_every`` refreshes.
+    """
+
+    def __init__(
+        self,
+        db_uri: str,
+        table: str,
+        key_column: str,
+        value_column: str,
+        cursor_column: str = "id",
+        local_dir: str = "/tmp/enrichment_cache",
+        remote_uri: Optional[str] = None,
+        full_refresh_every: int = 24,
+    ):
+        self.db_uri = db_uri
+        self.table = table
+        self.key_column = key_column
+        self.value_column = value_column
+        self.cursor_column = cursor_column
+        self.local_dir = local_dir
+        self.remote_uri = remote_uri.rstrip("/") if remote_uri else None
+        self.full_refresh_every = full_refresh_every
+
+    @property
+    def _meta_name(self) -> str:
+        return f"{self.table}_snapshot.json"
+
+    def _data_name(self, version: int) -> str:
+        return f"{self.table}_v{version:06}.arrow"
+
+    def _local(self, name: str) -> str:
+        return os.path.join(self.local_dir, name)
+
+    def _load_local_meta(self) -> Optional[Dict[str, Any]]:
+        path = self._local(self._meta_name)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            meta = json.load(f)
+        if not os.path.exists(self._local(meta["file"])):
+            return None
+        return meta
+
+    def _load_meta(self) -> Optional[Dict[str, Any]]:
+        meta = self._load_local_meta()
+        if not self.remote_uri:
+            return meta
+
+        remote_meta = download_json(f"{self.remote_uri}/{self._meta_name}")
+        if remote_meta and (not meta or remote_meta["version"] > meta["version"]):
+            logger.info(f"Pulling snapshot v{remote_meta['version']} from blob storage")
+            bucket_name, blob_path = split_gcs_uri(
+                f"{self.remote_uri}/{remote_meta['file']}"
+            )
+            get_gcs_client().bucket(bucket_name).blob(blob_path).download_to_filename(
+                self._local(remote_meta["file"])
+            )
+            self._write_local_meta(remote_meta)
+            return remote_meta
+
+        return meta
+
+    def _write_local_meta(self, meta: Dict[str, Any]) -> None:
+        with open(self._local(self._meta_name), "w") as f:
+            json.dump(meta, f, default=str)
+
+    def _read(self, meta: Dict[str, Any]) -> pl.DataFrame:
+        # Uncompressed IPC files are memory-mapped by read_ipc.
+        return pl.read_ipc(self._local(meta["file"]))
+
+    def _query(self, since: Optional[Any]) -> pl.DataFrame:
+        query = (
+            f"SELECT {self.key_column}, {self.value_column}, {self.cursor_column} "
+            f"FROM {self.table}"
+        )
+        if since is not None:
+            query = f"{query} WHERE {self.cursor_column} > {sql_literal(since)}"
+        return pl.read_database_uri(query=query, uri=self.db_uri)
+
+    def refresh(self) -> pl.DataFrame:
+        os.makedirs(self.local_dir, exist_ok=True)
+        meta = self._load_meta()
+
+        full_rebuild = (
+            meta is None or meta["incremental_refreshes"] >= self.full_refresh_every
+        )
+        if full_rebuild:
+            logger.info(f"Building full snapshot of {self.table}")
+            merged = self._query(since=None)
+            delta_rows = merged.height
+        else:
+            delta = self._query(since=meta["max_cursor"])
+            delta_rows = delta.height
+            if delta.is_empty():
+                logger.info(f"Snapshot v{meta['version']} of {self.table} is current")
+                return self._read(meta)
+
+            current = self._read(meta)
+            merged = pl.concat([current, delta], how="vertical_relaxed").unique(
+                subset=[self.key_column], keep="last", maintain_order=True
+            )
+
+        version = (meta["version"] + 1) if meta else 1
+        new_meta = {
+            "version": version,
+            "file": self._data_name(version),
+            "max_cursor": merged.get_column(self.cursor_column).max(),
+            "row_count": merged.height,
+            "incremental_refreshes": (
+                0 if full_rebuild else meta["incremental_refreshes"] + 1
+            ),
+        }
+
+        merged.write_ipc(self._local(new_meta["file"]), compression="uncompressed")
+        self._write_local_meta(new_meta)
+        if meta and meta["file"] != new_meta["file"]:
+            stale = self._local(meta["file"])
+            if os.path.exists(stale):
+                os.remove(stale)
+
+        if self.remote_uri:
+            upload_local_file(
+                self._local(new_meta["file"]), f"{self.remote_uri}/{new_meta['file']}"
+            )
+            upload_json(new_meta, f"{self.remote_uri}/{self._meta_name}")
+
+        logger.info(
+            f"Snapshot of {self.table} at v{version}: {merged.height} rows "
+            f"({delta_rows} fetched from the database)"
+        )
+        return self._read(new_meta)
@@ -0,0 +1,98 @@
+import logging
+import os
+import socket
+import tempfile
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("metrics_exporters")
+
+# Summary fields pushed to the metrics backend; everything else in a batch or
+# run summary stays in the parquet files only.
+EXPORTED_FIELDS = [
+    "calls",
+    "failed_calls",
+    "truncated_calls",
+    "retries",
+    "titles_in",
+    "titles_out",
+    "prompt_tokens",
+    "cached_tokens",
+    "output_tokens",
+    "latency_p95_seconds",
+    "wall_seconds",
+    "titles_per_minute",
+    "cost_usd",
+]
+
+
+def _numeric_fields(summary: Dict[str, Any]) -> Dict[str, float]:
+    return {
+        field: float(summary[field])
+        for field in EXPORTED_FIELDS
+        if summary.get(field) is not None
+    }
+
+
+class StatsdExporter:
+    """Sends summaries as StatsD gauges over UDP (fire and forget)."""
+
+    def __init__(self, host: str, port: int = 8125, prefix: str = "enrichment"):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def export(self, scope: str, summary: Dict[str, Any], labels: Dict[str, str]):
+        lines = [
+            f"{self.prefix}.{scope}.{field}:{value}|g"
+            for field, value in _numeric_fields(summary).items()
+        ]
+        try:
+            self.sock.sendto("\n".join(lines).encode("utf-8"), self.address)
+        except OSError as e:
+            logger.warning(f"Failed to send metrics to StatsD {self.address}: {e}")
+
+
+class PrometheusTextfileExporter:
+    """
+    Writes ``{prefix}_{scope}.prom`` into a node_exporter textfile collector
+    directory, replacing the file atomically so scrapes never see partial
+    output.
+    """
+
+    def __init__(self, textfile_dir: str, prefix: str = "enrichment"):
+        self.textfile_dir = textfile_dir
+        self.prefix = prefix
+
+    def export(self, scope: str, summary: Dict[str, Any], labels: Dict[str, str]):
+        label_str = ",".join(f'{key}="{value}"' for key, value in labels.items())
+        lines = []
+        for field, value in _numeric_fields(summary).items():
+            name = f"{self.prefix}_{scope}_{field}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{{{label_str}}} {value}")
+
+        os.makedirs(self.textfile_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.textfile_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(
+            tmp_path, os.path.join(self.textfile_dir, f"{self.prefix}_{scope}.prom")
+        )
+
+
+def create_metrics_exporter(metrics_config: Dict[str, Any]) -> Optional[Any]:
+    exporter = metrics_config.get("exporter", "none")
+    prefix = metrics_config.get("prefix", "enrichment")
+
+    if exporter == "none":
+        return None
+    if exporter == "statsd":
+        return StatsdExporter(
+            metrics_config.get("statsd_host", "localhost"),
+            metrics_config.get("statsd_port", 8125),
+            prefix,
+        )
+    if exporter == "prometheus":
+        return PrometheusTextfileExporter(metrics_config["textfile_dir"], prefix)
+
+    raise ValueError(f"Unknown metrics exporter: {exporter}")
@@ -0,0 +1,28 @@
+import polars as pl
+from io import StringIO
+from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_llm_json_response(
+    text: str, schema: Dict[str, pl.DataType], sample_char_count: int = 500
+) -> pl.DataFrame:
+    """
+    Decode a JSON array of flat objects straight into a frame with ``schema``
+    (unknown keys are ignored, missing ones are null). A truncated array is
+    cut back to its last complete object.
+    """
+    text = text.strip()
+    try:
+        return pl.read_json(StringIO(text), schema=schema)
+    except Exception as e:
+        last_object_end = text.rfind("}")
+        if not text.startswith("[") or last_object_end == -1:
+            logger.error(f"Failed to parse LLM JSON response: {str(e)}")
+            logger.warning(f"Sample LLM response: {text[:sample_char_count]}")
+            raise
+
+        logger.warning(f"Keeping complete objects of a cut-off JSON response: {e}")
+        return pl.read_json(StringIO(text[: last_object_end + 1] + "]"), schema=schema)
@@ -0,0 +1,27 @@
+import io
+import logging
+from typing import Dict, Optional
+import polars as pl
+
+logger = logging.getLogger("postgres_utils")
+
+
+def copy_dataframe_to_table(cursor, df: pl.DataFrame, table: str) -> int:
+    """Stream ``df`` into ``table`` (columns matched by name) with COPY FROM STDIN."""
+    buf = io.BytesIO()
+    df.write_csv(buf, include_header=False)
+    buf.seek(0)
+
+    columns = ", ".join(df.columns)
+    cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+    return df.height
+
+
+def copy_query_to_dataframe(
+    cursor, query: str, schema_overrides: Optional[Dict[str, pl.DataType]] = None
+) -> pl.DataFrame:
+    """Read the result of ``query`` with COPY TO STDOUT into a DataFrame."""
+    buf = io.BytesIO()
+    cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", buf)
+    buf.seek(0)
+    return pl.read_csv(buf, schema_overrides=schema_overrides)
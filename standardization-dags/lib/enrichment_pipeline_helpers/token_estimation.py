@@ -0,0 +1,33 @@
+import math
+import polars as pl
+
+DEFAULT_CHARS_PER_TOKEN = 4.0
+DEFAULT_OUTPUT_OVERHEAD_TOKENS = 16
+DEFAULT_CODED_OUTPUT_TOKENS = 6
+
+
+def estimate_text_tokens(
+    text: str, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN
+) -> int:
+    return math.ceil(len(text) / chars_per_token)
+
+
+def estimate_tokens_expr(
+    expr: pl.Expr, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN
+) -> pl.Expr:
+    return (expr.str.len_chars() / chars_per_token).ceil().cast(pl.Int64)
+
+
+def estimate_output_tokens_expr(
+    expr: pl.Expr,
+    chars_per_token: float = DEFAULT_CHARS_PER_TOKEN,
+    overhead_tokens: int = DEFAULT_OUTPUT_OVERHEAD_TOKENS,
+    echoes_title: bool = True,
+) -> pl.Expr:
+    """
+    Output cost of one title in a CSV response: a fixed-size row of labels
+    or codes (``overhead_tokens``), plus the title when the row echoes it.
+    """
+    if not echoes_title:
+        return pl.repeat(overhead_tokens, pl.len(), dtype=pl.Int64)
+    return estimate_tokens_expr(expr, chars_per_token) + overhead_tokens
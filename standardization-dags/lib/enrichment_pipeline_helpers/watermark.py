@@ -0,0 +1,151 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence
+import polars as pl
+from lib.enrichment_pipeline_helpers.gcs_utils import download_json, upload_json
+
+logger = logging.getLogger("extraction_watermark")
+
+
+def sql_literal(value: Any) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class ExtractionWatermark:
+    """
+    High-water mark of an extraction cursor column, persisted as a small JSON
+    state file. ``observe`` is fed every frame read from the database,
+    ``stage`` records the largest cursor value seen as pending, and
+    ``commit`` makes it the mark for the next run once the rows extracted
+    by that run have been loaded.
+
+    Rows a run could not load hold the mark back so they are extracted
+    again, at most ``max_attempts`` times per id; after that the mark moves
+    past them and they are logged as given up.
+    """
+
+    def __init__(self, state_uri: str, column: str = "id", max_attempts: int = 3):
+        self.state_uri = state_uri
+        self.pending_uri = f"{state_uri.removesuffix('.json')}.pending.json"
+        self.column = column
+        self.max_attempts = max_attempts
+        self.value: Optional[Any] = None
+        self._observed: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[Any]:
+        state = download_json(self.state_uri)
+        if not state:
+            logger.info(
+                f"No watermark found at {self.state_uri}, starting from scratch"
+            )
+            return None
+
+        if state.get("column") != self.column:
+            logger.warning(
+                f"Watermark at {self.state_uri} tracks '{state.get('column')}', "
+                f"not '{self.column}'. Ignoring it."
+            )
+            return None
+
+        self.value = state.get("value")
+        logger.info(f"Loaded watermark {self.column}={self.value}")
+        return self.value
+
+    def filter_sql(self) -> str:
+        if self.value is None:
+            return "TRUE"
+        return f"{self.column} > {sql_literal(self.value)}"
+
+    def observe(self, df: pl.DataFrame) -> None:
+        if df.is_empty() or self.column not in df.columns:
+            return
+
+        column = df.get_column(self.column)
+        if column.dtype == pl.List:
+            column = column.list.max()
+
+        page_max = column.max()
+        if page_max is None:
+            return
+
+        with self._lock:
+            if self._observed is None or page_max > self._observed:
+                self._observed = page_max
+
+    def stage(self, run_id: str) -> None:
+        if self._observed is None:
+            logger.info("No rows observed, keeping the existing watermark")
+            return
+
+        upload_json(
+            {
+                "column": self.column,
+                "value": self._observed,
+                "previous_value": self.value,
+                "run_id": run_id,
+                "staged_at": datetime.now(timezone.utc).isoformat(),
+            },
+            self.pending_uri,
+        )
+        logger.info(f"Staged watermark {self.column}={self._observed} for run {run_id}")
+
+    def _count_attempts(self, unloaded_ids: Sequence[int]) -> Dict[str, int]:
+        state = download_json(self.state_uri) or {}
+        previous = state.get("unloaded_attempts", {})
+        return {str(id_): previous.get(str(id_), 0) + 1 for id_ in unloaded_ids}
+
+    def commit(self, run_id: str, unloaded_ids: Sequence[int] = ()) -> None:
+        """
+        Promote the mark staged by ``run_id``. ``unloaded_ids`` are the ids
+        that run extracted but did not load; with an ``id`` cursor the mark
+        stays below the lowest one still under ``max_attempts`` so the next
+        run selects those rows again.
+        """
+        pending = download_json(self.pending_uri)
+        if not pending or pending.get("run_id") != run_id:
+            logger.info(f"No watermark staged by run {run_id}, nothing to commit")
+            return
+
+        value = pending["value"]
+        attempts = {}
+        if unloaded_ids and self.column == "id":
+            attempts = self._count_attempts(unloaded_ids)
+            retried = [
+                id_ for id_ in unloaded_ids if attempts[str(id_)] < self.max_attempts
+            ]
+            given_up = sorted(
+                id_ for id_ in unloaded_ids if attempts[str(id_)] >= self.max_attempts
+            )
+            if given_up:
+                logger.warning(
+                    f"Giving up on {len(given_up)} id(s) left unloaded by "
+                    f"{self.max_attempts} runs, e.g. {given_up[:10]}"
+                )
+            if retried:
+                value = min(value, min(retried) - 1)
+        elif unloaded_ids:
+            logger.warning(
+                f"{len(unloaded_ids)} row(s) from id {min(unloaded_ids)} were not "
+                f"loaded but the cursor is '{self.column}'; they are only selected "
+                "again once edited"
+            )
+
+        upload_json(
+            {
+                **pending,
+                "value": value,
+                "unloaded_attempts": attempts,
+                "committed_at": datetime.now(timezone.utc).isoformat(),
+            },
+            self.state_uri,
+        )
+        logger.info(
+            f"Advanced watermark {self.column}: {pending['previous_value']} -> {value}"
+        )
+        self.value = value
@@ -0,0 +1,59 @@
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Protocol, Type
+
+# Usage and finish reason of the most recent call made in the current thread or
+# asyncio task, so concurrent callers each see their own call.
+_last_call: ContextVar[Dict[str, Any]] = ContextVar("llm_last_call", default={})
+
+
+def record_call_info(usage_metadata: Any, finish_reason: Any = None) -> None:
+    _last_call.set(
+        {
+            "prompt_tokens": getattr(usage_metadata, "prompt_token_count", None),
+            "cached_tokens": getattr(
+                usage_metadata, "cached_content_token_count", None
+            ),
+            "output_tokens": getattr(usage_metadata, "candidates_token_count", None),
+            "finish_reason": getattr(finish_reason, "name", finish_reason),
+        }
+    )
+
+
+def current_call_info() -> Dict[str, Any]:
+    return _last_call.get()
+
+
+def pop_call_info() -> Dict[str, Any]:
+    info = _last_call.get()
+    _last_call.set({})
+    return info
+
+
+class LLMClient(Protocol):
+    """
+    Interface the enrichment code relies on. ``cacheable_prefix``, when
+    given, is prepended to ``prompt``; backends that support context caching
+    serve it from a provider-side cache. Stream methods raise
+    ``TruncatedResponseError`` after the last chunk of a response that was
+    cut off.
+    """
+
+    model: str
+    generation_config: Dict[str, Any]
+    last_usage_metadata: Any
+
+    def process(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> str: ...
+
+    async def aprocess(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> str: ...
+
+    def process_stream(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> Iterator[str]: ...
+
+    def aprocess_stream(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> AsyncIterator[str]: ...
@@ -0,0 +1,34 @@
+from typing import Any, Callable, Dict, Optional
+
+from lib.llm_clients.base import LLMClient
+from lib.llm_clients.fake_client import FakeLLMClient
+from lib.llm_clients.gemini_client import GeminiClient
+from lib.llm_clients.record_replay_client import RecordReplayClient
+
+
+def create_llm_client(
+    config: Dict[str, Any], responder: Optional[Callable[[str], str]] = None
+) -> LLMClient:
+    """
+    Build the backend named by ``config["backend"]``: "gemini" (default),
+    "fake" (answers from ``responder``), "record" (Gemini, saving every
+    response) or "replay" (saved responses only).
+    """
+    backend = config.get("backend", "gemini")
+
+    if backend == "gemini":
+        return GeminiClient(config)
+    if backend == "fake":
+        return FakeLLMClient(config, responder=responder)
+    if backend in ("record", "replay"):
+        uri = config.get("record_replay", {}).get("uri")
+        if not uri:
+            raise ValueError(f"LLM backend '{backend}' needs record_replay.uri")
+        return RecordReplayClient(
+            config,
+            uri=uri,
+            mode=backend,
+            inner=GeminiClient(config) if backend == "record" else None,
+        )
+
+    raise ValueError(f"Unknown LLM backend: {backend}")
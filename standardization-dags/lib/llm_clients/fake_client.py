@@ -0,0 +1,30 @@
+from typing import Any, Callable, Dict, Optional
+
+from lib.llm_clients.fake_provider import FakeGenaiProvider
+from lib.llm_clients.gemini_client import GeminiClient
+
+
+class FakeLLMClient(GeminiClient):
+    """
+    Deterministic offline backend: the production GeminiClient in front of a
+    ``FakeGenaiProvider``, so prompt caching, finish reasons and usage
+    recording run the same code as against the API. Answers come from
+    ``responder(prompt)``; latency, failures and truncation are drawn as
+    configured under ``fake`` (see ``FakeGenaiProvider``).
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any] = None,
+        responder: Optional[Callable[[str], str]] = None,
+    ):
+        config = config or {}
+        fake_config = config.get("fake", {})
+        super().__init__(
+            {**config, "model": config.get("model", "fake")},
+            model_client=FakeGenaiProvider(
+                responder,
+                chunk_size=fake_config.get("chunk_size", 256),
+                fake_config=fake_config,
+            ),
+        )
@@ -0,0 +1,208 @@
+import asyncio
+import csv
+import hashlib
+import io
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def _as_json(text: str) -> str:
+    """CSV answer re-encoded as the JSON array a response schema would give."""
+    rows = [
+        {
+            key: int(value) if value.isdigit() else value
+            for key, value in row.items()
+            if key is not None and value is not None
+        }
+        for row in csv.DictReader(io.StringIO(text.strip()))
+    ]
+    return json.dumps(rows)
+
+
+class FakeLLMError(Exception):
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeGenaiProvider:
+    """
+    In-memory stand-in for ``genai.Client`` covering the calls GeminiClient
+    makes (generate_content, streaming, async, context caches). Every request
+    is recorded in ``requests`` with the cached prefix it referenced and the
+    suffix it sent, so prompt splitting can be checked without the API.
+
+    Answers come from ``responder(prompt)``; latency, failures and truncation
+    (``fake_config``) are drawn from a generator seeded with the prompt hash
+    and how often that prompt was seen, so a run replays the same way every
+    time while retries of one prompt can still succeed.
+    """
+
+    def __init__(
+        self,
+        responder: Optional[Callable[[str], str]] = None,
+        min_cache_tokens: int = 0,
+        chunk_size: int = 64,
+        fake_config: Optional[Dict[str, Any]] = None,
+    ):
+        fake_config = fake_config or {}
+        self.responder = responder or (lambda prompt: "")
+        self.min_cache_tokens = min_cache_tokens
+        self.chunk_size = chunk_size
+        self.latency_seconds = fake_config.get("latency_seconds", 0.0)
+        self.latency_jitter = fake_config.get("latency_jitter", 0.0)
+        self.rate_limit_rate = fake_config.get("rate_limit_rate", 0.0)
+        self.error_rate = fake_config.get("error_rate", 0.0)
+        self.truncation_rate = fake_config.get("truncation_rate", 0.0)
+        self.seed = fake_config.get("seed", 0)
+        self.requests: List[Dict[str, Any]] = []
+        self.cached_prefixes: Dict[str, str] = {}
+        self._cache_entries: Dict[str, types.CachedContent] = {}
+        self._cache_ids = itertools.count(1)
+        self._calls = Counter()
+        self._lock = threading.Lock()
+
+        self.models = SimpleNamespace(
+            generate_content=self._generate_content,
+            generate_content_stream=self._generate_content_stream,
+        )
+        self.caches = SimpleNamespace(create=self._create_cache, list=self._list_caches)
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(
+                generate_content=self._agenerate_content,
+                generate_content_stream=self._agenerate_content_stream,
+            )
+        )
+
+    def _create_cache(
+        self, model: str, config: types.CreateCachedContentConfig
+    ) -> types.CachedContent:
+        prefix = "".join(config.contents)
+        if _estimate_tokens(prefix) < self.min_cache_tokens:
+            raise ValueError("Cached content is below the minimum token count")
+
+        name = f"cachedContents/fake-{next(self._cache_ids)}"
+        ttl_seconds = int(config.ttl.rstrip("s"))
+        cache = types.CachedContent(
+            name=name,
+            display_name=config.display_name,
+            model=f"models/{model}",
+            expire_time=datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds),
+        )
+        self._cache_entries[name] = cache
+        self.cached_prefixes[name] = prefix
+        return cache
+
+    def _list_caches(self) -> List[types.CachedContent]:
+        return list(self._cache_entries.values())
+
+    def _record(self, contents: str, config: types.GenerateContentConfig) -> str:
+        cache_name = config.cached_content if config else None
+        prefix = self.cached_prefixes.get(cache_name, "") if cache_name else ""
+        self.requests.append(
+            {"cached_content": cache_name, "prefix": prefix, "suffix": contents}
+        )
+        return prefix + contents
+
+    def _plan(
+        self, contents: str, config: types.GenerateContentConfig
+    ) -> Tuple[float, str, Any, str]:
+        """Latency, full prompt, finish reason and text of one request."""
+        prompt = self._record(contents, config)
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._calls[digest]
+            self._calls[digest] += 1
+        rng = random.Random(f"{self.seed}:{digest}:{attempt}")
+
+        latency = max(
+            0.0, self.latency_seconds + rng.uniform(-1, 1) * self.latency_jitter
+        )
+        draw = rng.random()
+        if draw < self.rate_limit_rate:
+            raise FakeLLMError("429 RESOURCE_EXHAUSTED (fake)", code=429)
+        if draw < self.rate_limit_rate + self.error_rate:
+            raise FakeLLMError("500 INTERNAL (fake)", code=500)
+
+        text = self.responder(prompt)
+        if config is not None and config.response_schema is not None and text:
+            text = _as_json(text)
+
+        finish_reason = types.FinishReason.STOP
+        if draw < self.rate_limit_rate + self.error_rate + self.truncation_rate:
+            finish_reason = types.FinishReason.MAX_TOKENS
+            text = text[: rng.randrange(len(text))] if text else text
+        return latency, prompt, finish_reason, text
+
+    def _response(self, prompt: str, text: str, prefix: str, finish_reason: Any) -> Any:
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=_estimate_tokens(prompt),
+                cached_content_token_count=_estimate_tokens(prefix) or None,
+                candidates_token_count=_estimate_tokens(text),
+            ),
+            candidates=[SimpleNamespace(finish_reason=finish_reason)],
+        )
+
+    def _stream(
+        self, prompt: str, text: str, prefix: str, finish_reason: Any
+    ) -> List[Any]:
+        chunks = [
+            text[i : i + self.chunk_size] for i in range(0, len(text), self.chunk_size)
+        ]
+        responses = []
+        for i, chunk in enumerate(chunks or [""]):
+            response = self._response(prompt, chunk, prefix, finish_reason)
+            if i < len(chunks) - 1:
+                response.candidates = [SimpleNamespace(finish_reason=None)]
+                response.usage_metadata = None
+            responses.append(response)
+        return responses
+
+    def _generate_content(
+        self, model: str, contents: str, config: types.GenerateContentConfig = None
+    ) -> Any:
+        latency, prompt, finish_reason, text = self._plan(contents, config)
+        time.sleep(latency)
+        return self._response(prompt, text, prompt[: -len(contents)], finish_reason)
+
+    def _generate_content_stream(
+        self, model: str, contents: str, config: types.GenerateContentConfig = None
+    ):
+        latency, prompt, finish_reason, text = self._plan(contents, config)
+        time.sleep(latency)
+        yield from self._stream(prompt, text, prompt[: -len(contents)], finish_reason)
+
+    async def _agenerate_content(
+        self, model: str, contents: str, config: types.GenerateContentConfig = None
+    ) -> Any:
+        latency, prompt, finish_reason, text = self._plan(contents, config)
+        await asyncio.sleep(latency)
+        return self._response(prompt, text, prompt[: -len(contents)], finish_reason)
+
+    async def _agenerate_content_stream(
+        self, model: str, contents: str, config: types.GenerateContentConfig = None
+    ):
+        latency, prompt, finish_reason, text = self._plan(contents, config)
+        await asyncio.sleep(latency)
+        chunks = self._stream(prompt, text, prompt[: -len(contents)], finish_reason)
+
+        async def iterate():
+            for chunk in chunks:
+                yield chunk
+
+        return iterate()
@@ -1,51 +1,208 @@
+import asyncio
+import hashlib
 import logging
 import os
-from typing import Dict, Any, Type
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Any, Iterator, Optional, Tuple, Type
 from google import genai
 from google.api_core.exceptions import GoogleAPIError
 from google.genai import types
+from lib.llm_clients.base import record_call_info
 
 logger = logging.getLogger("gemini_client")
 
 
+class TruncatedResponseError(Exception):
+    """
+    Raised when generation did not finish with STOP: after the last chunk of a
+    stream, or with the partial ``text`` of a non-streamed response.
+    """
+
+    def __init__(self, finish_reason: Any, text: str = ""):
+        super().__init__(f"Response stopped early: {finish_reason}")
+        self.finish_reason = finish_reason
+        self.text = text
+
+
+def _finish_reason(chunk: Any) -> Any:
+    if chunk.candidates and chunk.candidates[0].finish_reason:
+        return chunk.candidates[0].finish_reason
+    return None
+
+
+def _record_usage(usage_metadata: Any, finish_reason: Any) -> None:
+    record_call_info(usage_metadata, finish_reason)
+
+    cached_tokens = getattr(usage_metadata, "cached_content_token_count", None)
+    if cached_tokens:
+        logger.info(
+            f"Prompt tokens: {usage_metadata.prompt_token_count}, "
+            f"{cached_tokens} billed as cached"
+        )
+
+
 class GeminiClient:
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self, config: Dict[str, Any] = None, model_client: Any = None):
         self.generation_config = config.get("generation_config", {})
         self.model = config.get("model", "gemini-2.5-flash-preview-04-17")
+        self.prompt_cache_ttl = config.get("prompt_cache", {}).get("ttl_seconds", 3600)
+        self.last_usage_metadata = None
+        self._prompt_caches: Dict[str, Tuple[Optional[str], datetime]] = {}
+        self._prompt_cache_lock = threading.Lock()
 
         logger.info(f"Initialized Gemini client with model: {self.model}")
 
+        if model_client is not None:
+            self.model_client = model_client
+            return
+
         api_key = os.environ.get("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
 
         self.model_client = genai.Client(api_key=api_key)
 
-    def process(self, prompt: str, schema: Type = None) -> str:
-        try:
-            generation_config = types.GenerateContentConfig(
-                temperature=self.generation_config.get("temperature", 0.2),
-                top_p=self.generation_config.get("top_p", 0.95),
-                top_k=self.generation_config.get("top_k", 40),
-                max_output_tokens=self.generation_config.get(
-                    "max_output_tokens", 65536
-                ),
-                response_mime_type=self.generation_config.get(
-                    "response_mime_type", "text/plain"
-                ),
-            )
+    def _find_prompt_cache(self, display_name: str) -> Optional[types.CachedContent]:
+        min_expiry = datetime.now(timezone.utc) + timedelta(minutes=5)
+        for cache in self.model_client.caches.list():
+            if (
+                cache.display_name == display_name
+                and cache.model.endswith(self.model)
+                and cache.expire_time > min_expiry
+            ):
+                return cache
+        return None
 
-            if self.generation_config.get("thinking_budget", None) is not None:
-                generation_config.thinking_config = types.ThinkingConfig(
-                    thinking_budget=self.generation_config.get("thinking_budget")
+    def _prompt_cache_name(self, prefix: str) -> Optional[str]:
+        """
+        Name of a provider-side context cache holding ``prefix``, created on
+        first use and shared with other workers through a display name derived
+        from the model and prefix. Returns None when caching is unavailable
+        (e.g. the prefix is below the provider's minimum size), in which case
+        callers send the full prompt.
+        """
+        digest = hashlib.sha256(f"{self.model}\x00{prefix}".encode("utf-8"))
+        display_name = f"prompt-prefix-{digest.hexdigest()[:32]}"
+
+        with self._prompt_cache_lock:
+            now = datetime.now(timezone.utc)
+            cached = self._prompt_caches.get(display_name)
+            if cached and cached[1] > now + timedelta(minutes=5):
+                return cached[0]
+
+            try:
+                cache = self._find_prompt_cache(display_name)
+                if cache is None:
+                    cache = self.model_client.caches.create(
+                        model=self.model,
+                        config=types.CreateCachedContentConfig(
+                            display_name=display_name,
+                            contents=[prefix],
+                            ttl=f"{self.prompt_cache_ttl}s",
+                        ),
+                    )
+                    logger.info(f"Created prompt cache {cache.name} ({display_name})")
+                self._prompt_caches[display_name] = (cache.name, cache.expire_time)
+            except Exception as e:
+                logger.warning(f"Prompt caching unavailable, sending full prompt: {e}")
+                self._prompt_caches[display_name] = (
+                    None,
+                    now + timedelta(seconds=self.prompt_cache_ttl),
                 )
 
+            return self._prompt_caches[display_name][0]
+
+    def _request_contents(
+        self, prompt: str, cacheable_prefix: Optional[str]
+    ) -> Tuple[str, Optional[str]]:
+        if not cacheable_prefix:
+            return prompt, None
+
+        cache_name = self._prompt_cache_name(cacheable_prefix)
+        if cache_name is None:
+            return cacheable_prefix + prompt, None
+        return prompt, cache_name
+
+    def _build_generation_config(
+        self, cached_content: Optional[str] = None, schema: Type = None
+    ) -> types.GenerateContentConfig:
+        generation_config = types.GenerateContentConfig(
+            temperature=self.generation_config.get("temperature", 0.2),
+            top_p=self.generation_config.get("top_p", 0.95),
+            top_k=self.generation_config.get("top_k", 40),
+            max_output_tokens=self.generation_config.get("max_output_tokens", 65536),
+            response_mime_type=self.generation_config.get(
+                "response_mime_type", "text/plain"
+            ),
+        )
+
+        if self.generation_config.get("thinking_budget", None) is not None:
+            generation_config.thinking_config = types.ThinkingConfig(
+                thinking_budget=self.generation_config.get("thinking_budget")
+            )
+
+        if cached_content:
+            generation_config.cached_content = cached_content
+
+        if schema is not None:
+            generation_config.response_mime_type = "application/json"
+            generation_config.response_schema = schema
+
+        return generation_config
+
+    def process(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> str:
+        """
+        Generate a response for ``prompt``. When ``cacheable_prefix`` is given
+        the request is ``cacheable_prefix + prompt`` with the prefix served
+        from a provider context cache. A ``schema`` (e.g. ``list[Model]``)
+        requests JSON output constrained to it. Raises
+        ``TruncatedResponseError`` carrying the partial text when generation
+        ended for any reason other than STOP (e.g. MAX_TOKENS).
+        """
+        try:
+            contents, cache_name = self._request_contents(prompt, cacheable_prefix)
             response = self.model_client.models.generate_content(
-                model=self.model, contents=prompt, config=generation_config
+                model=self.model,
+                contents=contents,
+                config=self._build_generation_config(cache_name, schema),
+            )
+
+            self.last_usage_metadata = response.usage_metadata
+            finish_reason = _finish_reason(response)
+            _record_usage(response.usage_metadata, finish_reason)
+            logger.debug(f"Generated response: {response.text}")
+
+        except GoogleAPIError as e:
+            logger.error(f"Gemini API error: {str(e)}")
+            raise e
+        except Exception as e:
+            logger.error(f"Error processing prompt: {str(e)}")
+            raise e
+
+        if finish_reason != types.FinishReason.STOP:
+            raise TruncatedResponseError(finish_reason, response.text or "")
+        return response.text
+
+    async def aprocess(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> str:
+        try:
+            contents, cache_name = await asyncio.to_thread(
+                self._request_contents, prompt, cacheable_prefix
+            )
+            response = await self.model_client.aio.models.generate_content(
+                model=self.model,
+                contents=contents,
+                config=self._build_generation_config(cache_name, schema),
             )
+            self.last_usage_metadata = response.usage_metadata
+            finish_reason = _finish_reason(response)
+            _record_usage(response.usage_metadata, finish_reason)
 
-            logger.info(f"Generated response: {response.text}")
-            return response.text
+            logger.debug(f"Generated response: {response.text}")
 
         except GoogleAPIError as e:
             logger.error(f"Gemini API error: {str(e)}")
@@ -53,3 +210,68 @@ class GeminiClient:
         except Exception as e:
             logger.error(f"Error processing prompt: {str(e)}")
             raise e
+
+        if finish_reason != types.FinishReason.STOP:
+            raise TruncatedResponseError(finish_reason, response.text or "")
+        return response.text
+
+    def process_stream(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Yield response text chunks as they are generated. Raises
+        ``TruncatedResponseError`` after the last chunk when generation ended
+        for any reason other than STOP (e.g. MAX_TOKENS).
+        """
+        finish_reason = None
+        usage_metadata = None
+        try:
+            contents, cache_name = self._request_contents(prompt, cacheable_prefix)
+            for chunk in self.model_client.models.generate_content_stream(
+                model=self.model,
+                contents=contents,
+                config=self._build_generation_config(cache_name, schema),
+            ):
+                if chunk.usage_metadata:
+                    self.last_usage_metadata = usage_metadata = chunk.usage_metadata
+                finish_reason = _finish_reason(chunk) or finish_reason
+                if chunk.text:
+                    yield chunk.text
+
+        except GoogleAPIError as e:
+            logger.error(f"Gemini API error: {str(e)}")
+            raise e
+
+        _record_usage(usage_metadata, finish_reason)
+        if finish_reason != types.FinishReason.STOP:
+            raise TruncatedResponseError(finish_reason)
+
+    async def aprocess_stream(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        finish_reason = None
+        usage_metadata = None
+        try:
+            contents, cache_name = await asyncio.to_thread(
+                self._request_contents, prompt, cacheable_prefix
+            )
+            stream = await self.model_client.aio.models.generate_content_stream(
+                model=self.model,
+                contents=contents,
+                config=self._build_generation_config(cache_name, schema),
+            )
+            async for chunk in stream:
+                if chunk.usage_metadata:
+                    self.last_usage_metadata = usage_metadata = chunk.usage_metadata
+                finish_reason = _finish_reason(chunk) or finish_reason
+                if chunk.text:
+                    yield chunk.text
+
+        except GoogleAPIError as e:
+            logger.error(f"Gemini API error: {str(e)}")
+            raise e
+
+        _record_usage(usage_metadata, finish_reason)
+
+        if finish_reason != types.FinishReason.STOP:
+            raise TruncatedResponseError(finish_reason)
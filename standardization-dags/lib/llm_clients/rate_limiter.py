@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("llm_rate_limiter")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Whether ``error`` carries HTTP 429 / RESOURCE_EXHAUSTED in its status
+    fields (google-genai and google-api-core errors set ``code``, HTTP client
+    errors ``status_code`` or ``response.status_code``). The message is not
+    searched, as "429" can appear in unrelated errors.
+    """
+    for code in (
+        getattr(error, "code", None),
+        getattr(error, "status_code", None),
+        getattr(getattr(error, "response", None), "status_code", None),
+    ):
+        if code == 429:
+            return True
+    return getattr(error, "status", None) == "RESOURCE_EXHAUSTED"
+
+
+class AIMDRateLimiter:
+    """
+    Concurrency limiter for LLM requests with additive-increase /
+    multiplicative-decrease: each success widens the window by
+    ``increase / limit`` (about one slot per round of requests), each
+    rate-limit error shrinks it by ``decrease_factor`` and any other failure
+    leaves it as is.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        min_in_flight: int = 1,
+        initial_in_flight: int = None,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+    ):
+        self.max_in_flight = max_in_flight
+        self.min_in_flight = min_in_flight
+        self.limit = float(initial_in_flight or max_in_flight)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, outcome: str = "succeeded") -> None:
+        """Free a slot; ``outcome`` is "succeeded", "throttled" or "failed"."""
+        async with self._condition:
+            self.in_flight -= 1
+            if outcome == "throttled":
+                self.limit = max(
+                    float(self.min_in_flight), self.limit * self.decrease_factor
+                )
+                logger.warning(f"Rate limited, in-flight window now {int(self.limit)}")
+            elif outcome == "succeeded":
+                self.limit = min(
+                    float(self.max_in_flight), self.limit + self.increase / self.limit
+                )
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for one request, sizing the window by how it ended."""
+        await self.acquire()
+        outcome = "failed"
+        try:
+            yield
+            outcome = "succeeded"
+        except Exception as e:
+            if is_rate_limit_error(e):
+                outcome = "throttled"
+            raise
+        finally:
+            await self.release(outcome)
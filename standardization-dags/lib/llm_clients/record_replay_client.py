@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Type
+
+from lib.enrichment_pipeline_helpers.gcs_utils import download_json, upload_json
+from lib.llm_clients.base import LLMClient, current_call_info, record_call_info
+from lib.llm_clients.gemini_client import TruncatedResponseError
+
+logger = logging.getLogger("record_replay_llm_client")
+
+# Recorded usage metadata field -> call info key it is taken from.
+USAGE_FIELDS = {
+    "prompt_token_count": "prompt_tokens",
+    "candidates_token_count": "output_tokens",
+    "cached_content_token_count": "cached_tokens",
+}
+
+
+class RecordingNotFoundError(LookupError):
+    pass
+
+
+class RecordReplayClient:
+    """
+    In ``record`` mode, forwards requests to ``inner`` and stores each
+    response under ``{uri}/{sha256(model, generation config, prompt)}.json``
+    (a local directory or gs:// prefix). In ``replay`` mode, serves those
+    recordings without network access and raises ``RecordingNotFoundError``
+    for prompts that were never recorded.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        uri: str,
+        mode: str = "replay",
+        inner: Optional[LLMClient] = None,
+        chunk_size: int = 256,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("Record mode needs a backend to record from")
+
+        self.model = config.get("model", "gemini-2.5-flash-preview-04-17")
+        self.generation_config = config.get("generation_config", {})
+        self.uri = uri.rstrip("/")
+        self.mode = mode
+        self.inner = inner
+        self.chunk_size = chunk_size
+        self.last_usage_metadata = None
+
+        logger.info(f"Initialized {mode} LLM client at {self.uri}")
+
+    def _recording_uri(self, prompt: str) -> str:
+        payload = json.dumps(
+            [self.model, self.generation_config, prompt], sort_keys=True, default=str
+        )
+        return f"{self.uri}/{hashlib.sha256(payload.encode('utf-8')).hexdigest()}.json"
+
+    def _read(self, prompt: str) -> Dict[str, Any]:
+        recording_uri = self._recording_uri(prompt)
+        if recording_uri.startswith("gs://"):
+            recording = download_json(recording_uri)
+        elif os.path.exists(recording_uri):
+            with open(recording_uri) as f:
+                recording = json.load(f)
+        else:
+            recording = None
+
+        if recording is None:
+            raise RecordingNotFoundError(f"No recorded response at {recording_uri}")
+        return recording
+
+    def _use(self, recording: Dict[str, Any]) -> Dict[str, Any]:
+        # Kept out of _read: the call info is a context variable, and async
+        # callers run _read in a worker thread whose context is a copy.
+        self.last_usage_metadata = SimpleNamespace(**recording["usage"])
+        record_call_info(
+            self.last_usage_metadata,
+            "MAX_TOKENS" if recording["truncated"] else "STOP",
+        )
+        return recording
+
+    def _load(self, prompt: str) -> Dict[str, Any]:
+        return self._use(self._read(prompt))
+
+    async def _aload(self, prompt: str) -> Dict[str, Any]:
+        return self._use(await asyncio.to_thread(self._read, prompt))
+
+    def _save(self, prompt: str, text: str, truncated: bool) -> None:
+        # Usage of the call just made in this thread or task (asyncio.to_thread
+        # runs this in a copy of the task's context); the inner client's
+        # last_usage_metadata may belong to a concurrent call.
+        call_info = current_call_info()
+        recording = {
+            "text": text,
+            "truncated": truncated,
+            "usage": {field: call_info.get(key) for field, key in USAGE_FIELDS.items()},
+        }
+        self.last_usage_metadata = SimpleNamespace(**recording["usage"])
+
+        recording_uri = self._recording_uri(prompt)
+        if recording_uri.startswith("gs://"):
+            upload_json(recording, recording_uri)
+        else:
+            os.makedirs(os.path.dirname(recording_uri), exist_ok=True)
+            with open(recording_uri, "w") as f:
+                json.dump(recording, f)
+
+    def _replay_text(self, recording: Dict[str, Any]) -> str:
+        if recording["truncated"]:
+            raise TruncatedResponseError("recorded truncation", recording["text"])
+        return recording["text"]
+
+    def _chunks(self, text: str) -> Iterator[str]:
+        for i in range(0, len(text), self.chunk_size):
+            yield text[i : i + self.chunk_size]
+
+    def process(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> str:
+        full_prompt = (cacheable_prefix or "") + prompt
+        if self.mode == "replay":
+            return self._replay_text(self._load(full_prompt))
+
+        try:
+            text = self.inner.process(prompt, schema, cacheable_prefix=cacheable_prefix)
+        except TruncatedResponseError as e:
+            self._save(full_prompt, e.text, truncated=True)
+            raise
+        self._save(full_prompt, text, truncated=False)
+        return text
+
+    async def aprocess(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> str:
+        full_prompt = (cacheable_prefix or "") + prompt
+        if self.mode == "replay":
+            return self._replay_text(await self._aload(full_prompt))
+
+        try:
+            text = await self.inner.aprocess(
+                prompt, schema, cacheable_prefix=cacheable_prefix
+            )
+        except TruncatedResponseError as e:
+            await asyncio.to_thread(self._save, full_prompt, e.text, truncated=True)
+            raise
+        await asyncio.to_thread(self._save, full_prompt, text, truncated=False)
+        return text
+
+    def process_stream(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> Iterator[str]:
+        full_prompt = (cacheable_prefix or "") + prompt
+        if self.mode == "replay":
+            recording = self._load(full_prompt)
+            yield from self._chunks(recording["text"])
+            if recording["truncated"]:
+                raise TruncatedResponseError("recorded truncation")
+            return
+
+        chunks = []
+        try:
+            for chunk in self.inner.process_stream(
+                prompt, schema, cacheable_prefix=cacheable_prefix
+            ):
+                chunks.append(chunk)
+                yield chunk
+        except TruncatedResponseError:
+            self._save(full_prompt, "".join(chunks), truncated=True)
+            raise
+        self._save(full_prompt, "".join(chunks), truncated=False)
+
+    async def aprocess_stream(
+        self, prompt: str, schema: Type = None, cacheable_prefix: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        full_prompt = (cacheable_prefix or "") + prompt
+        if self.mode == "replay":
+            recording = await self._aload(full_prompt)
+            for chunk in self._chunks(recording["text"]):
+                yield chunk
+            if recording["truncated"]:
+                raise TruncatedResponseError("recorded truncation")
+            return
+
+        chunks = []
+        try:
+            async for chunk in self.inner.aprocess_stream(
+                prompt, schema, cacheable_prefix=cacheable_prefix
+            ):
+                chunks.append(chunk)
+                yield chunk
+        except TruncatedResponseError:
+            await asyncio.to_thread(
+                self._save, full_prompt, "".join(chunks), truncated=True
+            )
+            raise
+        await asyncio.to_thread(
+            self._save, full_prompt, "".join(chunks), truncated=False
+        )
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+from google.api_core.exceptions import NotFound
+from lib.resources.registry import get_gcs_client
+from lib.enrichment_pipeline_helpers.gcs_utils import split_gcs_uri
+
+logger = logging.getLogger("llm_response_cache")
+
+
+def build_cache_namespace(
+    prompt_fingerprint: str, model: str, generation_config: Dict[str, Any]
+) -> str:
+    payload = json.dumps(
+        {
+            "prompt": prompt_fingerprint,
+            "model": model,
+            "generation_config": generation_config,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_cache_key(namespace: str, item: str) -> str:
+    return hashlib.sha256(f"{namespace}\x00{item}".encode("utf-8")).hexdigest()
+
+
+class LocalDiskResponseCache:
+    """
+    Per-item LLM response cache stored as small JSON files on a local volume,
+    with TTL expiry on read and oldest-first eviction above ``max_bytes``.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: int, max_bytes: int):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        now = time.time()
+        for key in keys:
+            path = self._path(key)
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            if now - entry["cached_at"] > self.ttl_seconds:
+                os.remove(path)
+                continue
+            found[key] = entry["value"]
+        return found
+
+    def put_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        now = time.time()
+        for key, value in items.items():
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"cached_at": now, "value": value}, f)
+            os.replace(tmp_path, path)
+
+    def evict(self) -> None:
+        files = []
+        now = time.time()
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                if now - stat.st_mtime > self.ttl_seconds:
+                    os.remove(path)
+                else:
+                    files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+
+        logger.info(
+            f"Local response cache holds {total} bytes after evicting {removed}"
+        )
+
+
+class BlobResponseCache:
+    """
+    Same contract as ``LocalDiskResponseCache`` backed by one blob per item
+    under a GCS prefix. Reads and writes are fanned out over a thread pool.
+    """
+
+    def __init__(self, uri: str, ttl_seconds: int, max_bytes: int, workers: int = 16):
+        self.bucket_name, prefix = split_gcs_uri(uri.rstrip("/") + "/")
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.bucket = get_gcs_client().bucket(self.bucket_name)
+
+    def _blob(self, key: str):
+        return self.bucket.blob(f"{self.prefix}{key[:2]}/{key}.json")
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            entry = json.loads(self._blob(key).download_as_bytes())
+        except NotFound:
+            return None
+        if time.time() - entry["cached_at"] > self.ttl_seconds:
+            return None
+        return entry["value"]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(keys)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            values = list(executor.map(self._get, keys))
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def put_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        now = time.time()
+
+        def put(item):
+            key, value = item
+            self._blob(key).upload_from_string(
+                json.dumps({"cached_at": now, "value": value}),
+                content_type="application/json",
+            )
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(put, items.items()))
+
+    def evict(self) -> None:
+        now = time.time()
+        blobs = []
+        for blob in self.bucket.client.list_blobs(self.bucket_name, prefix=self.prefix):
+            if now - blob.updated.timestamp() > self.ttl_seconds:
+                blob.delete()
+            else:
+                blobs.append(blob)
+
+        total = sum(blob.size for blob in blobs)
+        removed = 0
+        for blob in sorted(blobs, key=lambda b: b.updated):
+            if total <= self.max_bytes:
+                break
+            blob.delete()
+            total -= blob.size
+            removed += 1
+
+        logger.info(f"Blob response cache holds {total} bytes after evicting {removed}")
+
+
+def create_response_cache(
+    cache_config: Dict[str, Any], default_uri: Optional[str] = None
+):
+    backend = cache_config.get("backend", "none")
+    ttl_seconds = cache_config.get("ttl_seconds", 30 * 24 * 3600)
+    max_bytes = cache_config.get("max_bytes", 512 * 1024 * 1024)
+
+    if backend == "none":
+        return None
+    if backend == "local":
+        return LocalDiskResponseCache(
+            cache_config.get("local_dir", "/tmp/enrichment_cache/llm_responses"),
+            ttl_seconds,
+            max_bytes,
+        )
+    if backend == "gcs":
+        uri = cache_config.get("uri") or default_uri
+        if not uri:
+            raise ValueError("LLM response cache backend 'gcs' needs a uri")
+        return BlobResponseCache(uri, ttl_seconds, max_bytes)
+
+    raise ValueError(f"Unknown LLM response cache backend: {backend}")
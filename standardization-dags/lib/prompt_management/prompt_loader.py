@@ -1,7 +1,7 @@
 import importlib
 import logging
 from string import Template
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +18,18 @@ def load_prompt(prompt_type: str, version: str) -> Optional[str]:
         return None
 
 
+def load_prompt_attribute(
+    prompt_type: str, version: str, name: str, default: Any = None
+) -> Any:
+    try:
+        module = importlib.import_module(get_prompt_path(prompt_type, version))
+    except ImportError as e:
+        logger.error(f"Failed to load prompt {prompt_type} version {version}: {str(e)}")
+        return default
+
+    return getattr(module, name, default)
+
+
 def load_prompt_with_params(
     prompt_type: str, version: str, params: Dict[str, Any]
 ) -> Optional[str]:
@@ -37,5 +49,35 @@ def load_prompt_with_params(
         return None
 
 
+def load_prompt_parts(
+    prompt_type: str, version: str, params: Dict[str, Any], variable_param: str
+) -> Optional[Tuple[str, str]]:
+    """
+    Format a prompt split into a static prefix (everything before
+    ``$variable_param``) and the suffix that changes per request, so the
+    prefix can be cached by the provider.
+    """
+    prompt = load_prompt(prompt_type, version)
+
+    if prompt is None:
+        return None
+
+    split_at = prompt.find(f"${variable_param}")
+    if split_at == -1:
+        split_at = 0
+
+    try:
+        return (
+            Template(prompt[:split_at]).substitute(params),
+            Template(prompt[split_at:]).substitute(params),
+        )
+    except KeyError as e:
+        logger.error(f"Missing parameter in prompt formatting: {str(e)}")
+        return None
+    except ValueError as e:
+        logger.error(f"Error in template formatting: {str(e)}")
+        return None
+
+
 def get_prompt_path(path: str, version: str) -> str:
     return f"{path}.{version}"
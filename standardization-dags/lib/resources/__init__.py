@@ -0,0 +1,3 @@
+"""
+Process-wide shared clients and connection pools.
+"""
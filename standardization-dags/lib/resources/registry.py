@@ -0,0 +1,196 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import requests
+from google.cloud import storage
+from psycopg2.pool import ThreadedConnectionPool
+
+logger = logging.getLogger("resource_registry")
+
+# Defaults, overridden from the [resources] config section by
+# configure_resources().
+_settings = {
+    "gcs_http_pool_size": 32,
+    "gcs_http_retries": 3,
+    "pg_pool_min_connections": 1,
+    "pg_pool_max_connections": 8,
+    "pg_health_check_seconds": 30,
+}
+
+_lock = threading.RLock()
+_pid = os.getpid()
+_gcs_client: Optional[storage.Client] = None
+_llm_clients: Dict[str, Any] = {}
+_pg_pools: Dict[str, "_BlockingConnectionPool"] = {}
+
+
+def configure_resources(resources_config: Dict[str, Any]) -> None:
+    """Apply pool sizes before the first client is created."""
+    with _lock:
+        _settings.update(
+            {key: value for key, value in resources_config.items() if key in _settings}
+        )
+
+
+def _reset_after_fork() -> None:
+    """
+    Clients and sockets inherited from a parent process are not safe to use,
+    so a forked worker starts with an empty registry.
+    """
+    global _pid, _gcs_client
+    if os.getpid() == _pid:
+        return
+    _pid = os.getpid()
+    _gcs_client = None
+    _llm_clients.clear()
+    _pg_pools.clear()
+
+
+def get_gcs_client() -> storage.Client:
+    """Shared GCS client whose HTTP session keeps a pool of open connections."""
+    global _gcs_client
+    with _lock:
+        _reset_after_fork()
+        if _gcs_client is None:
+            client = storage.Client()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=_settings["gcs_http_pool_size"],
+                pool_maxsize=_settings["gcs_http_pool_size"],
+                max_retries=_settings["gcs_http_retries"],
+            )
+            client._http.mount("https://", adapter)
+            _gcs_client = client
+            logger.info(
+                f"Created GCS client (HTTP pool size {_settings['gcs_http_pool_size']})"
+            )
+        return _gcs_client
+
+
+def get_llm_client(
+    config: Dict[str, Any], responder: Optional[Callable[[str], str]] = None
+) -> Any:
+    """
+    Shared LLM client for ``config``: one per distinct config (and fake
+    responder), so prompt caches and HTTP sessions survive across batches.
+    """
+    from lib.llm_clients.factory import create_llm_client
+
+    key = json.dumps(config, sort_keys=True, default=str) + f"|{id(responder)}"
+    with _lock:
+        _reset_after_fork()
+        if key not in _llm_clients:
+            _llm_clients[key] = create_llm_client(config, responder=responder)
+        return _llm_clients[key]
+
+
+class _BlockingConnectionPool:
+    """
+    ThreadedConnectionPool that waits for a free connection instead of
+    raising when all are checked out, and checks connections that sat idle
+    longer than ``health_check_seconds`` before handing them out.
+    """
+
+    def __init__(self, db_uri: str, min_connections: int, max_connections: int):
+        self.pool = ThreadedConnectionPool(min_connections, max_connections, db_uri)
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.health_check_seconds = _settings["pg_health_check_seconds"]
+        self._last_used: Dict[int, float] = {}
+
+    def _is_healthy(self, conn: Any) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if (
+            last_used is None
+            or time.monotonic() - last_used < self.health_check_seconds
+        ):
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding broken pooled connection: {e}")
+            return False
+
+    def getconn(self) -> Any:
+        self.slots.acquire()
+        try:
+            conn = self.pool.getconn()
+            while not self._is_healthy(conn):
+                self._last_used.pop(id(conn), None)
+                self.pool.putconn(conn, close=True)
+                conn = self.pool.getconn()
+            return conn
+        except Exception:
+            self.slots.release()
+            raise
+
+    def putconn(self, conn: Any, close: bool = False) -> None:
+        # Keyed by id(), so entries of closed connections must go before the
+        # id can be reused by a new connection.
+        close = close or bool(conn.closed)
+        if close:
+            self._last_used.pop(id(conn), None)
+        else:
+            self._last_used[id(conn)] = time.monotonic()
+        try:
+            self.pool.putconn(conn, close=close)
+        finally:
+            self.slots.release()
+
+    def closeall(self) -> None:
+        self.pool.closeall()
+        self._last_used.clear()
+
+
+def _get_pg_pool(db_uri: str) -> _BlockingConnectionPool:
+    with _lock:
+        _reset_after_fork()
+        if db_uri not in _pg_pools:
+            _pg_pools[db_uri] = _BlockingConnectionPool(
+                db_uri,
+                _settings["pg_pool_min_connections"],
+                _settings["pg_pool_max_connections"],
+            )
+            logger.info(
+                "Created Postgres connection pool "
+                f"(max {_settings['pg_pool_max_connections']} connections)"
+            )
+        return _pg_pools[db_uri]
+
+
+@contextmanager
+def pg_connection(db_uri: str) -> Iterator[Any]:
+    """
+    Pooled replacement for ``with psycopg2.connect(db_uri) as conn``: commits
+    when the block succeeds, rolls back when it raises, then returns the
+    connection to the pool.
+    """
+    pool = _get_pg_pool(db_uri)
+    conn = pool.getconn()
+    try:
+        with conn:
+            yield conn
+    finally:
+        pool.putconn(conn)
+
+
+def close_all() -> None:
+    with _lock:
+        if os.getpid() != _pid:
+            return
+        for pool in _pg_pools.values():
+            pool.closeall()
+        _pg_pools.clear()
+        _llm_clients.clear()
+
+
+atexit.register(close_all)
@@ -0,0 +1,89 @@
+import polars as pl
+import pytest
+
+from lib.enrichment_pipeline_helpers.fuzzy_index import FuzzyTitleIndex
+from job_enrichment_pipeline.utils.normalize_utils import (
+    canonical_title_expr,
+    title_level_expr,
+)
+
+COLUMNS = {
+    "key_column": "canonical_title",
+    "value_column": "standardized_job_id",
+    "block_column": "title_level",
+}
+
+
+def keyed(titles: list[str], ids: list[int] = None) -> pl.DataFrame:
+    df = pl.DataFrame({"job_title": titles})
+    if ids is not None:
+        df = df.with_columns(pl.Series("standardized_job_id", ids))
+    return df.with_columns(
+        canonical_title_expr(pl.col("job_title")).alias("canonical_title")
+    ).with_columns(title_level_expr(pl.col("canonical_title")).alias("title_level"))
+
+
+def link(index: FuzzyTitleIndex, titles: list[str]) -> dict[str, int]:
+    queries = keyed(titles)
+    links = index.query(
+        queries.get_column("canonical_title"),
+        threshold=0.85,
+        blocks=queries.get_column("title_level"),
+    )
+    by_key = dict(zip(links.get_column("key"), links.get_column("value")))
+    return {
+        title: by_key[key]
+        for title, key in zip(titles, queries.get_column("canonical_title"))
+        if key in by_key
+    }
+
+
+@pytest.fixture(scope="module")
+def index() -> FuzzyTitleIndex:
+    return FuzzyTitleIndex.build(
+        keyed(
+            ["software engineer ii", "account executive", "senior data analyst"],
+            [1, 2, 3],
+        ),
+        **COLUMNS,
+    )
+
+
+@pytest.mark.parametrize(
+    "title",
+    ["software engineer i", "software engineer iii", "account executive ii"],
+)
+def test_titles_differing_only_in_level_are_not_linked(index, title):
+    assert link(index, [title]) == {}
+
+
+def test_titles_with_the_same_level_are_linked(index):
+    assert link(
+        index, ["engineer ii, software", "sr. data analyst", "account exec"]
+    ) == {
+        "engineer ii, software": 1,
+        "sr. data analyst": 3,
+        "account exec": 2,
+    }
+
+
+def test_update_adds_new_keys_and_drops_conflicting_ones(index):
+    grown = FuzzyTitleIndex(index.entries, index.bands, dict(index.meta))
+    assert grown.update(
+        keyed(
+            [
+                "software engineer ii",
+                "account executive",
+                "account executive",
+                "senior data analyst",
+                "software engineer iii",
+            ],
+            [1, 2, 4, 3, 5],
+        ),
+        **COLUMNS,
+    )
+
+    assert link(grown, ["software engineer iii", "account executive"]) == {
+        "software engineer iii": 5
+    }
+    assert grown.entries.get_column("row").to_list() == list(range(4))
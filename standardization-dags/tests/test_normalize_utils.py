@@ -0,0 +1,73 @@
+import random
+import unicodedata
+
+import polars as pl
+import pytest
+
+from job_enrichment_pipeline.utils.normalize_utils import (
+    normalize_title,
+    normalize_title_expr,
+)
+
+WHITESPACE = "\n\r\t\x0b\x0c\x1c\x1d\x1e\x1f\x85\xa0\u2002\u2009\u200a\u2028\u3000 "
+PUNCTUATION = "\"',.-/&()`\u00b4\u2019\u201c\u201d"
+LETTERS = "abcXYZ019\u00e9\u00c9\u00df\u0130\u0131\u03a3\u03c3\u03c2\u01c5\ufb01\u0149\u0390\u00c5\u00c7\u0132\u0414\u01f0\u1e9e"
+
+
+def assigned(char: str) -> bool:
+    return unicodedata.category(char) not in ("Cn", "Cs")
+
+
+def random_title(rng: random.Random) -> str:
+    pools = [WHITESPACE, PUNCTUATION, LETTERS]
+    chars = []
+    for _ in range(rng.randint(0, 30)):
+        if rng.random() < 0.1:
+            char = chr(rng.randint(0x20, 0x2FFFF))
+            if assigned(char):
+                chars.append(char)
+        else:
+            chars.append(rng.choice(rng.choice(pools)))
+    return "".join(chars)
+
+
+@pytest.fixture(scope="module")
+def corpus() -> list[str]:
+    rng = random.Random(0)
+    return [random_title(rng) for _ in range(50_000)] + [
+        "",
+        "  ",
+        '"Senior, Engineer"',
+        "'Manager'\n",
+        "Sr.\tData\x1cAnalyst",
+    ]
+
+
+def test_normalize_title_expr_matches_normalize_title(corpus):
+    vectorized = (
+        pl.DataFrame({"title": corpus})
+        .select(normalize_title_expr(pl.col("title")))
+        .get_column("title")
+        .to_list()
+    )
+
+    mismatches = [
+        (title, expected, actual)
+        for title, expected, actual in zip(
+            corpus, map(normalize_title, corpus), vectorized
+        )
+        if expected != actual
+    ]
+    assert mismatches == []
+
+
+def test_lowercase_only_differs_on_code_points_python_does_not_know():
+    # Python's case tables follow unicodedata.unidata_version while polars
+    # ships its own, usually newer, Unicode data. Letters added in between
+    # (e.g. U+1C89 CYRILLIC CAPITAL LETTER TJE, Unicode 16) are unassigned for
+    # Python, so str.lower leaves them while polars lowercases them.
+    chars = [chr(i) for i in range(0x20, 0x30000) if not 0xD800 <= i <= 0xDFFF]
+    lowered = pl.Series(chars).str.to_lowercase().to_list()
+
+    differing = [char for char, lower in zip(chars, lowered) if char.lower() != lower]
+    assert [char for char in differing if assigned(char)] == []
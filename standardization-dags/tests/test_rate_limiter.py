@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from lib.llm_clients.rate_limiter import AIMDRateLimiter
+
+
+class RateLimited(Exception):
+    code = 429
+
+
+class ServerError(Exception):
+    code = 500
+
+
+async def run_in_slot(limiter: AIMDRateLimiter, error: Exception = None) -> None:
+    async with limiter.slot():
+        if error:
+            raise error
+
+
+@pytest.mark.parametrize(
+    "error, expected_limit",
+    [(None, 4.25), (RateLimited(), 2.0), (ServerError(), 4.0)],
+)
+def test_window_only_grows_on_success(error, expected_limit):
+    limiter = AIMDRateLimiter(max_in_flight=8, initial_in_flight=4)
+
+    if error:
+        with pytest.raises(type(error)):
+            asyncio.run(run_in_slot(limiter, error))
+    else:
+        asyncio.run(run_in_slot(limiter))
+
+    assert limiter.limit == expected_limit
+    assert limiter.in_flight == 0
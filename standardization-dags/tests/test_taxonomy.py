@@ -0,0 +1,58 @@
+import polars as pl
+import pytest
+
+from job_enrichment_pipeline.schema.taxonomy import (
+    ALLOWED_LABELS,
+    LABEL_ALIASES,
+    fold_label_expr,
+    label_repair_map,
+    repair_labels,
+)
+
+
+@pytest.mark.parametrize("column", list(ALLOWED_LABELS))
+def test_canonical_labels_repair_to_themselves_in_any_case(column):
+    labels = ALLOWED_LABELS[column]
+    for variant in (str.lower, str.upper):
+        folded = (
+            pl.DataFrame({"label": [variant(label) for label in labels]})
+            .select(fold_label_expr(pl.col("label")))
+            .get_column("label")
+        )
+        assert [label_repair_map(column)[key] for key in folded] == list(labels)
+
+
+@pytest.mark.parametrize("column", list(ALLOWED_LABELS))
+def test_aliases_do_not_shadow_canonical_labels(column):
+    folded_labels = set(
+        pl.DataFrame({"label": list(ALLOWED_LABELS[column])})
+        .select(fold_label_expr(pl.col("label")))
+        .get_column("label")
+    )
+    folded_aliases = set(
+        pl.DataFrame({"label": list(LABEL_ALIASES[column])})
+        .select(fold_label_expr(pl.col("label")))
+        .get_column("label")
+    )
+    assert folded_aliases & folded_labels == set()
+
+
+def test_label_case_does_not_change_the_repair():
+    df = pl.DataFrame(
+        {
+            "seniority_level": ["Senior", "senior"],
+            "department": ["Information Technology", "information technology"],
+            "function": ["Software Engineering", "software engineering"],
+        }
+    )
+
+    valid, invalid = repair_labels(df)
+
+    assert invalid.is_empty()
+    assert valid.unique().to_dicts() == [
+        {
+            "seniority_level": "Senior",
+            "department": "Information Technology",
+            "function": "Software Engineering",
+        }
+    ]